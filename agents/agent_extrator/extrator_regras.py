@@ -0,0 +1,253 @@
+"""
+Extração determinística de DANFEs (layout padrão da NF-e) sem chamar o LLM.
+
+Usa as linhas de texto do PyMuPDF com suas coordenadas: nos quadros da DANFE o
+rótulo ("DATA DA EMISSÃO", "CNPJ/CPF"...) fica em cima e o valor logo abaixo.
+Retorna o mesmo JSON do AgentExtrator e uma nota de confiança (0 a 1); abaixo do
+limiar o agente recorre ao Gemini.
+"""
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+import fitz
+
+LIMIAR_CONFIANCA = float(os.getenv("EXTRATOR_LIMIAR_CONFIANCA", "0.9"))
+MAX_PAGINAS = 5
+
+RE_CNPJ = re.compile(r'\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}')
+RE_CPF_CNPJ = re.compile(r'\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}|\d{3}\.?\d{3}\.?\d{3}-?\d{2}')
+RE_DATA = re.compile(r'\d{2}/\d{2}/\d{4}')
+RE_VALOR = re.compile(r'\d{1,3}(?:\.\d{3})*,\d{2}')
+RE_NUMERO_NF = re.compile(r'N[º°o]\.?\s*:?\s*(\d{1,3}(?:\.\d{3})+|\d{1,9})')
+RE_RECEBEMOS = re.compile(r'RECEBEMOS DE\s+(.+?)\s+OS PRODUTOS', re.IGNORECASE | re.DOTALL)
+RE_DUPLICATA = re.compile(r'(\d{2}/\d{2}/\d{4})\s*(?:R\$)?\s*(\d{1,3}(?:\.\d{3})*,\d{2})')
+
+# Palavras-chave (sem acento, minúsculas) para classificar a despesa sem o LLM
+PALAVRAS_CATEGORIA = {
+    'INSUMOS AGRÍCOLAS': ('adubo', 'fertiliz', 'semente', 'defensiv', 'herbicid', 'fungicid', 'inseticid',
+                          'glifosato', 'calcario', 'ureia', 'racao', 'vacina'),
+    'MANUTENÇÃO E OPERAÇÃO': ('diesel', 'gasolina', 'combustiv', 'oleo', 'lubrific', 'pneu', 'filtro', 'peca',
+                              'rolamento', 'correia', 'graxa', 'bateria', 'manutenc'),
+    'RECURSOS HUMANOS': ('uniforme', 'treinamento', 'bota', 'luva', 'epi '),
+    'SERVIÇOS OPERACIONAIS': ('frete', 'transporte', 'colheita', 'pulverizacao', 'servico'),
+    'INFRAESTRUTURA E UTILIDADES': ('energia', 'agua', 'cimento', 'tijolo', 'telha', 'construc', 'cabo', 'tubo'),
+    'ADMINISTRATIVAS': ('papel', 'toner', 'caneta', 'escritorio', 'software', 'computador', 'impressora'),
+    'SEGUROS E PROTEÇÃO': ('seguro', 'apolice', 'extintor', 'alarme'),
+    'IMPOSTOS E TAXAS': ('imposto', 'taxa', 'tributo'),
+    'INVESTIMENTOS': ('trator', 'colheitadeira', 'implemento', 'maquina', 'plantadeira', 'veiculo'),
+}
+
+
+def _normalizar(texto):
+    sem_acento = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return sem_acento.lower()
+
+
+# Valores que casam com a regex mas não são válidos (ex: 31/02/2024) viram None: o campo
+# conta como ausente, a confiança cai e a nota vai para o Gemini em vez de derrubar a extração
+def _valor_float(texto):
+    try:
+        return float(texto.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def _data_iso(texto):
+    try:
+        return datetime.strptime(texto, '%d/%m/%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+class _Linha:
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'texto', 'normalizado')
+
+    def __init__(self, bbox, texto):
+        self.x0, self.y0, self.x1, self.y1 = bbox
+        self.texto = texto.strip()
+        self.normalizado = _normalizar(self.texto)
+
+
+def _linhas_da_pagina(page, deslocamento_y):
+    """Linhas do PyMuPDF com coordenadas; páginas seguintes são 'empilhadas' no eixo y."""
+    linhas = []
+    for bloco in page.get_text("dict")["blocks"]:
+        for linha in bloco.get("lines", []):
+            texto = "".join(span["text"] for span in linha["spans"])
+            if texto.strip():
+                x0, y0, x1, y1 = linha["bbox"]
+                linhas.append(_Linha((x0, y0 + deslocamento_y, x1, y1 + deslocamento_y), texto))
+    return linhas
+
+
+class LayoutDanfe:
+    def __init__(self, linhas):
+        self.linhas = sorted(linhas, key=lambda l: (round(l.y0), l.x0))
+        self.texto = "\n".join(l.texto for l in self.linhas)
+
+    def rotulo(self, padrao, depois_de=None, antes_de=None):
+        """Primeira linha cujo texto (sem acento) casa com o padrão, opcionalmente dentro de uma faixa de y."""
+        regex = re.compile(padrao)
+        for linha in self.linhas:
+            if depois_de is not None and linha.y0 < depois_de:
+                continue
+            if antes_de is not None and linha.y0 >= antes_de:
+                continue
+            if regex.search(linha.normalizado):
+                return linha
+        return None
+
+    def valor_abaixo(self, rotulo, padrao_valor=None, distancia_max=18):
+        """Linha logo abaixo do rótulo, com sobreposição horizontal (mesmo quadro da DANFE)."""
+        if rotulo is None:
+            return None
+        candidatos = []
+        for linha in self.linhas:
+            if linha is rotulo or linha.y0 < rotulo.y1 - 2 or linha.y0 > rotulo.y1 + distancia_max:
+                continue
+            if linha.x1 < rotulo.x0 - 2 or linha.x0 > rotulo.x1 + 40:
+                continue
+            if padrao_valor is not None:
+                achado = padrao_valor.search(linha.texto)
+                if not achado:
+                    continue
+                candidatos.append((linha.y0, abs(linha.x0 - rotulo.x0), achado.group(0)))
+            else:
+                candidatos.append((linha.y0, abs(linha.x0 - rotulo.x0), linha.texto))
+        if not candidatos:
+            return None
+        return min(candidatos)[2]
+
+    def linhas_entre(self, y_inicio, y_fim):
+        return [l for l in self.linhas if y_inicio <= l.y0 < y_fim]
+
+
+def _classificar(produtos):
+    texto = " ".join(_normalizar(p) for p in produtos) + " "
+    return [categoria for categoria, palavras in PALAVRAS_CATEGORIA.items() if any(p in texto for p in palavras)]
+
+
+def _extrair_produtos(layout):
+    cabecalho = layout.rotulo(r'descricao d[oa]s? (produto|servico)')
+    if cabecalho is None:
+        return []
+    fim = layout.rotulo(r'dados adicionais|calculo do issqn|informacoes complementares', depois_de=cabecalho.y1)
+    y_fim = fim.y0 if fim else float('inf')
+
+    # A coluna de descrição vai do início do rótulo até a próxima coluna da mesma faixa
+    colunas_seguintes = [l.x0 for l in layout.linhas
+                         if abs(l.y0 - cabecalho.y0) < 4 and l.x0 > cabecalho.x1 - 2]
+    x_fim = min(colunas_seguintes) if colunas_seguintes else float('inf')
+
+    produtos = []
+    for linha in layout.linhas_entre(cabecalho.y1, y_fim):
+        if linha.x0 < cabecalho.x0 - 15 or linha.x0 >= x_fim:
+            continue
+        if re.fullmatch(r'[\d.,/\s%-]+', linha.texto) or 'descricao' in linha.normalizado:
+            continue
+        produtos.append(linha.texto)
+    return produtos
+
+
+def _extrair_parcelas(layout, data_emissao, valor_total):
+    rotulo_fatura = layout.rotulo(r'^fatura|duplicata')
+    parcelas = []
+    duplicatas = []
+    if rotulo_fatura is not None:
+        fim = layout.rotulo(r'calculo do imposto', depois_de=rotulo_fatura.y1)
+        trecho = "\n".join(l.texto for l in layout.linhas_entre(rotulo_fatura.y0, fim.y0 if fim else float('inf')))
+        duplicatas = RE_DUPLICATA.findall(trecho)
+        for data, valor in duplicatas:
+            vencimento, valor_parcela = _data_iso(data), _valor_float(valor)
+            # Parcela ilegível fica de fora: a soma não bate com o total e a confiança cai
+            if vencimento is not None and valor_parcela is not None:
+                parcelas.append({'data_vencimento': vencimento, 'valor_total': valor_parcela})
+
+    if not duplicatas and valor_total is not None and data_emissao:
+        # Nota sem duplicatas: pagamento à vista, uma parcela com o total
+        parcelas.append({'data_vencimento': data_emissao, 'valor_total': valor_total})
+    return parcelas
+
+
+def extrair_danfe(pdf_stream):
+    """
+    Tenta extrair os campos da NF-e pelas posições do texto na DANFE.
+    Retorna (dados, confianca); `dados` segue o mesmo schema do prompt do AgentExtrator.
+    """
+    linhas = []
+    with fitz.open(stream=pdf_stream, filetype="pdf") as pdf_document:
+        deslocamento = 0
+        for indice, page in enumerate(pdf_document):
+            if indice >= MAX_PAGINAS:
+                break
+            linhas.extend(_linhas_da_pagina(page, deslocamento))
+            deslocamento += page.rect.height
+
+    if not linhas:
+        return None, 0.0
+
+    layout = LayoutDanfe(linhas)
+    rotulo_destinatario = layout.rotulo(r'destinatario')
+    y_destinatario = rotulo_destinatario.y0 if rotulo_destinatario else None
+
+    # --- Emitente (fornecedor): canhoto "RECEBEMOS DE ..." ou primeira linha do quadro do emitente ---
+    razao_social = None
+    achado = RE_RECEBEMOS.search(layout.texto)
+    if achado:
+        razao_social = " ".join(achado.group(1).split())
+    else:
+        razao_social = layout.valor_abaixo(layout.rotulo(r'identificacao do emitente'))
+
+    cabecalho = layout.linhas_entre(0, y_destinatario) if y_destinatario else layout.linhas
+    cnpjs_cabecalho = [m.group(0) for l in cabecalho for m in [RE_CNPJ.search(l.texto)] if m]
+    cnpj_fornecedor = cnpjs_cabecalho[0] if cnpjs_cabecalho else None
+
+    # --- Número da nota e emissão ---
+    numero_nf = None
+    achado = RE_NUMERO_NF.search(layout.texto)
+    if achado:
+        numero_nf = achado.group(1).replace('.', '').lstrip('0') or '0'
+
+    data_emissao = layout.valor_abaixo(layout.rotulo(r'data d[ae] emissao'), RE_DATA)
+    data_emissao = _data_iso(data_emissao) if data_emissao else None
+
+    # --- Destinatário (faturado) ---
+    nome_faturado = doc_faturado = None
+    if y_destinatario is not None:
+        nome_faturado = layout.valor_abaixo(layout.rotulo(r'nome\s*/\s*razao social', depois_de=y_destinatario))
+        doc_faturado = layout.valor_abaixo(layout.rotulo(r'cnpj\s*/\s*cpf', depois_de=y_destinatario), RE_CPF_CNPJ)
+
+    # --- Totais, parcelas e produtos ---
+    valor_total = layout.valor_abaixo(layout.rotulo(r'valor total da nota'), RE_VALOR)
+    valor_total = _valor_float(valor_total) if valor_total else None
+
+    parcelas = _extrair_parcelas(layout, data_emissao, valor_total)
+    produtos = _extrair_produtos(layout)
+    classificacoes = _classificar(produtos)
+
+    dados = {
+        "fornecedor": {"razao_social": razao_social, "fantasia": None, "cnpj": cnpj_fornecedor},
+        "faturado": {"nome_completo": nome_faturado, "cpf/cnpj": doc_faturado},
+        "numero_nota_fiscal": numero_nf,
+        "data_emissao": data_emissao,
+        "descricao_produtos": produtos,
+        "parcelas": parcelas,
+        "classificacoes_despesa": classificacoes,
+    }
+
+    soma_parcelas = sum(p['valor_total'] for p in parcelas)
+    verificacoes = [
+        bool(razao_social),
+        bool(cnpj_fornecedor),
+        bool(nome_faturado),
+        bool(doc_faturado),
+        bool(numero_nf),
+        bool(data_emissao),
+        bool(produtos),
+        bool(classificacoes),
+        bool(parcelas) and (valor_total is None or abs(soma_parcelas - valor_total) < 0.05),
+    ]
+    confianca = sum(verificacoes) / len(verificacoes)
+    return dados, confianca
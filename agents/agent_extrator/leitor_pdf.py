@@ -0,0 +1,89 @@
+import os
+import re
+import fitz
+
+# Aproximação usada para o orçamento: ~4 caracteres por token
+CARACTERES_POR_TOKEN = 4
+ORCAMENTO_TOKENS_PADRAO = int(os.getenv("EXTRATOR_ORCAMENTO_TOKENS", "8000"))
+MARCADOR_TRUNCADO = "\n[... restante do documento omitido ...]\n"
+
+# Seções de uma DANFE das quais o agente extrai os campos do JSON
+SECOES_NFE = {
+    'cabecalho': re.compile(r'DANFE|CHAVE DE ACESSO|CNPJ', re.IGNORECASE),
+    'itens': re.compile(r'DADOS DOS? PRODUTOS?|DESCRI[CÇ][AÃ]O DO PRODUTO', re.IGNORECASE),
+    'totais': re.compile(r'VALOR TOTAL DA NOTA|C[AÁ]LCULO DO IMPOSTO', re.IGNORECASE),
+    'fatura': re.compile(r'FATURA|DUPLICATA|VENCIMENTO', re.IGNORECASE),
+}
+
+_ESPACOS_REPETIDOS = re.compile(r'[ \t]+')
+_LINHAS_VAZIAS = re.compile(r'\n\s*\n+')
+
+
+def iterar_paginas(pdf_document):
+    """Gera o texto de cada página sob demanda; páginas não lidas nunca são extraídas."""
+    for page in pdf_document:
+        yield page.get_text()
+
+
+def condensar(texto):
+    """Remove espaços e linhas em branco repetidos (comuns em tabelas de anexos)."""
+    texto = _ESPACOS_REPETIDOS.sub(' ', texto)
+    return _LINHAS_VAZIAS.sub('\n', texto).strip()
+
+
+def montar_texto_nfe(paginas, orcamento_tokens=None):
+    """
+    Consome o iterável de textos de página em ordem e monta o texto para o prompt em
+    uma única junção. Para de consumir assim que todas as seções da NF-e foram
+    encontradas ou quando o orçamento de tokens acaba. Retorna (texto, info).
+    """
+    orcamento_tokens = orcamento_tokens or ORCAMENTO_TOKENS_PADRAO
+    limite_caracteres = orcamento_tokens * CARACTERES_POR_TOKEN
+
+    partes = []
+    total_caracteres = 0
+    secoes_encontradas = set()
+    paginas_lidas = 0
+    truncado = False
+
+    for texto_pagina in paginas:
+        paginas_lidas += 1
+        texto_pagina = condensar(texto_pagina)
+        if not texto_pagina:
+            continue
+
+        # Cabeçalho, itens, totais e fatura já cobertos: só segue lendo enquanto a
+        # tabela de produtos continuar; a primeira página fora dela costuma ser anexo
+        if len(secoes_encontradas) == len(SECOES_NFE) and not SECOES_NFE['itens'].search(texto_pagina):
+            truncado = True
+            break
+
+        restante = limite_caracteres - total_caracteres
+        if len(texto_pagina) > restante:
+            texto_pagina = texto_pagina[:restante]
+            truncado = True
+
+        partes.append(texto_pagina)
+        total_caracteres += len(texto_pagina)
+        secoes_encontradas.update(nome for nome, padrao in SECOES_NFE.items() if padrao.search(texto_pagina))
+
+        if truncado:
+            break
+
+    texto = "\n".join(partes)
+    if truncado:
+        texto += MARCADOR_TRUNCADO
+
+    info = {
+        'paginas_lidas': paginas_lidas,
+        'secoes': sorted(secoes_encontradas),
+        'truncado': truncado,
+        'tokens_estimados': len(texto) // CARACTERES_POR_TOKEN,
+    }
+    return texto, info
+
+
+def extrair_texto_nfe(pdf_stream, orcamento_tokens=None):
+    """Leitura sequencial e preguiçosa: páginas após o ponto de parada nunca são extraídas."""
+    with fitz.open(stream=pdf_stream, filetype="pdf") as pdf_document:
+        return montar_texto_nfe(iterar_paginas(pdf_document), orcamento_tokens)
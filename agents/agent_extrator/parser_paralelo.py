@@ -0,0 +1,70 @@
+"""
+Leitura de PDFs grandes em um pool de processos.
+
+As páginas são divididas em intervalos contíguos, cada processo abre o arquivo pelo
+caminho (nada de bytes trafegando entre processos) e extrai o texto do seu intervalo.
+Os intervalos são consumidos em ordem por montar_texto_nfe, que pode parar cedo;
+os intervalos ainda não iniciados são cancelados.
+
+Processos daemon (filhos do pool prefork do Celery) não podem criar processos: nesse
+caso a leitura é sequencial. A fila 'pdf' deve rodar com `-P threads` ou `-P solo`.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+from .leitor_pdf import montar_texto_nfe, iterar_paginas
+
+PROCESSOS = int(os.getenv("PDF_PROCESSOS", str(os.cpu_count() or 1)))
+PAGINAS_MIN_PARALELO = int(os.getenv("PDF_PAGINAS_MIN_PARALELO", "8"))
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _obter_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PROCESSOS)
+        return _executor
+
+
+def _pode_usar_processos():
+    return PROCESSOS > 1 and not multiprocessing.current_process().daemon
+
+
+def _extrair_intervalo(caminho, inicio, fim):
+    with fitz.open(caminho) as pdf_document:
+        return [pdf_document[i].get_text() for i in range(inicio, fim)]
+
+
+def _intervalos(total_paginas, partes):
+    tamanho = -(-total_paginas // partes)
+    return [(inicio, min(inicio + tamanho, total_paginas)) for inicio in range(0, total_paginas, tamanho)]
+
+
+def extrair_texto_paralelo(caminho, orcamento_tokens=None):
+    """Mesmo retorno de extrair_texto_nfe, lendo as páginas em vários núcleos quando vale a pena."""
+    caminho = str(caminho)
+    with fitz.open(caminho) as pdf_document:
+        total_paginas = pdf_document.page_count
+        if total_paginas < PAGINAS_MIN_PARALELO or not _pode_usar_processos():
+            return montar_texto_nfe(iterar_paginas(pdf_document), orcamento_tokens)
+
+    executor = _obter_executor()
+    futuros = [executor.submit(_extrair_intervalo, caminho, inicio, fim)
+               for inicio, fim in _intervalos(total_paginas, PROCESSOS)]
+
+    def paginas_em_ordem():
+        for futuro in futuros:
+            yield from futuro.result()
+
+    try:
+        return montar_texto_nfe(paginas_em_ordem(), orcamento_tokens)
+    finally:
+        for futuro in futuros:
+            futuro.cancel()
@@ -1,28 +1,56 @@
 import os
-import fitz
-import google.generativeai as genai
 import json
 from dotenv import load_dotenv
 
+from agents.llm_client import obter_cliente
+from .leitor_pdf import extrair_texto_nfe
+from .extrator_regras import extrair_danfe, LIMIAR_CONFIANCA
+
 load_dotenv()
 
 
 class AgentExtrator:
-    def __init__(self, api_key=None):
+    MODELO = 'gemini-2.5-flash'
+    # Incrementar sempre que o prompt mudar: invalida o cache de extrações
+    VERSAO_PROMPT = 2
+
+    def __init__(self, api_key=None, orcamento_tokens=None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("A chave da API do Gemini é obrigatória.")
 
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = obter_cliente(self.api_key, self.MODELO)
+        self.orcamento_tokens = orcamento_tokens
+        self.info_leitura = None
+        self.origem = None
+        self.confianca_regras = None
+
+    def extrair_por_regras(self, pdf_stream):
+        """Caminho rápido: DANFE em layout padrão é lida sem ida e volta à API."""
+        try:
+            dados, self.confianca_regras = extrair_danfe(pdf_stream)
+        except Exception as e:
+            print(f"Extração por regras falhou, usando o Gemini: {e}")
+            return None
+        return dados if self.confianca_regras >= LIMIAR_CONFIANCA else None
 
     def executar(self, pdf_stream):
+        dados = self.extrair_por_regras(pdf_stream)
+        if dados is not None:
+            self.origem = 'regras'
+            return dados
+
+        # Leitura página a página, interrompida quando as seções da NF-e já foram cobertas
         try:
-            pdf_document = fitz.open(stream=pdf_stream, filetype="pdf")
-            pdf_text = ""
-            for page in pdf_document:
-                pdf_text += page.get_text()
+            pdf_text, self.info_leitura = extrair_texto_nfe(pdf_stream, self.orcamento_tokens)
+        except Exception as e:
+            raise Exception(f"Erro na execução do agente: {e}")
+        return self.extrair_com_llm(pdf_text)
 
+    def extrair_com_llm(self, pdf_text):
+        """Extrai o JSON a partir do texto já lido do PDF (ex: pelo parser paralelo)."""
+        self.origem = 'llm'
+        try:
             if not pdf_text.strip():
                 raise Exception("Não foi possível extrair texto do PDF. O arquivo pode estar vazio ou ser uma imagem.")
 
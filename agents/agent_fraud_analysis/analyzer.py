@@ -1,12 +1,17 @@
 import os
 import json
-import google.generativeai as genai
 from dotenv import load_dotenv
 from datetime import datetime
 
+from agents.llm_client import obter_cliente
+
 load_dotenv()
 
 class AgentFraudCompliance:
+    MODELO = 'gemini-2.5-flash'
+    # Incrementar sempre que o prompt mudar: invalida o cache de extrações
+    VERSAO_PROMPT = 1
+    PREFIXO_ERRO = "Erro na análise automática"
 
     def __init__(self, extracted_data, api_key=None):
         # Prioriza a chave passada (da sessão), senão tenta o .env (backup)
@@ -21,10 +26,10 @@ class AgentFraudCompliance:
         if not self.api_key:
             raise ValueError("Chave da API do Gemini não configurada. Por favor, configure no menu.")
 
-        genai.configure(api_key=self.api_key)
         # Usamos o modelo Flash para ser rápido e barato
-        model = genai.GenerativeModel(
-            'gemini-2.5-flash', 
+        model = obter_cliente(
+            self.api_key,
+            self.MODELO,
             generation_config={"response_mime_type": "application/json"}
         )
 
@@ -65,6 +70,6 @@ class AgentFraudCompliance:
         except Exception as e:
             return {
                 "risk_score": 0,
-                "summary": f"Erro na análise automática: {str(e)}",
+                "summary": f"{self.PREFIXO_ERRO}: {str(e)}",
                 "red_flags": []
             }
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Cache em camadas dos agentes de RAG, para perguntas repetidas.
+
+  - embeddings: pergunta normalizada -> vetor da pergunta (não depende dos dados)
+  - sql: (agente, pergunta normalizada, versão do esquema) -> SQL gerado
+  - respostas: (SQL, versão dos dados, data de hoje) -> resposta final
+
+A versão dos dados vem da tabela "VersaoDados", incrementada pelos repositórios na
+mesma transação de cada escrita em movimentos, pessoas e classificações: depois de uma
+escrita, as respostas antigas não são mais encontradas e saem pelo LRU ou pelo TTL.
+A data entra na chave porque perguntas como "este mês" usam CURRENT_DATE.
+Os caches são por processo (como o índice de embeddings), com capacidade e TTL
+configuráveis por variável de ambiente.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import date
+
+from django.db import connection
+
+from extrator.repositories.base_repository import VERSAO_DADOS_FINANCEIROS
+
+
+class CacheLRU:
+    """Dicionário com capacidade máxima (descarta o menos usado) e validade por entrada."""
+
+    def __init__(self, capacidade, ttl_segundos):
+        self.capacidade = capacidade
+        self.ttl_segundos = ttl_segundos
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self._itens[chave]
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + self.ttl_segundos)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+def _config(nome, padrao):
+    return int(os.getenv(nome, str(padrao)))
+
+
+cache_embeddings = CacheLRU(_config('RAG_CACHE_CAPACIDADE', 1000), _config('RAG_CACHE_TTL_EMBEDDING', 24 * 3600))
+cache_sql = CacheLRU(_config('RAG_CACHE_CAPACIDADE', 1000), _config('RAG_CACHE_TTL_SQL', 24 * 3600))
+cache_respostas = CacheLRU(_config('RAG_CACHE_CAPACIDADE', 1000), _config('RAG_CACHE_TTL_RESPOSTA', 3600))
+
+
+def normalizar_pergunta(pergunta):
+    """Caixa, acentos, espaços e pontuação final não mudam o sentido da pergunta."""
+    texto = unicodedata.normalize('NFKD', pergunta.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', texto).strip(' ?!.')
+
+
+def versao_esquema(*partes):
+    """Hash do que entra no prompt do SQL além da pergunta (esquema, exemplos, regras)."""
+    return hashlib.sha256('\n'.join(partes).encode('utf-8')).hexdigest()[:16]
+
+
+def versao_dados():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT versao FROM "VersaoDados" WHERE nome = %s', [VERSAO_DADOS_FINANCEIROS])
+        linha = cursor.fetchone()
+    return linha[0] if linha else 0
+
+
+def chave_resposta(sql_query):
+    return (sql_query, versao_dados(), date.today().isoformat())
+
+
+def limpar_caches():
+    for cache in (cache_embeddings, cache_sql, cache_respostas):
+        cache.limpar()
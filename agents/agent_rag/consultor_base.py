@@ -0,0 +1,83 @@
+import json
+
+from .cache_rag import cache_sql, cache_respostas, chave_resposta, normalizar_pergunta
+
+
+class ConsultorRAGBase:
+    """
+    Fluxo comum dos agentes de consulta: pergunta -> SQL -> resultado -> resposta, com os
+    caches de cache_rag. Cada agente define _gerar_sql, _executar_query_segura,
+    _prompt_resposta, o atributo `versao_esquema` e VERSAO_PROMPT.
+    """
+    # Incrementar ao mudar o prompt do SQL: invalida o SQL em cache
+    VERSAO_PROMPT = 1
+
+    def _preparar_resposta(self, pergunta_usuario):
+        """
+        Etapas 1 e 2. Retorna (resposta em cache, None, None) ou (None, prompt da resposta
+        final, chave em que guardar a resposta; None quando ela não deve ir para o cache).
+        """
+        # --- Etapa 1: Gerar o SQL (ou reaproveitar o de uma pergunta igual) ---
+        chave_sql = (type(self).__name__, normalizar_pergunta(pergunta_usuario), self.versao_esquema)
+        sql_query = cache_sql.obter(chave_sql)
+        if sql_query is None:
+            sql_query = self._gerar_sql(pergunta_usuario)
+
+        # Mesmo SQL sobre os mesmos dados: a resposta final já está pronta
+        chave = chave_resposta(sql_query)
+        resposta = cache_respostas.obter(chave)
+        if resposta is not None:
+            # Só respostas de consultas válidas vão para o cache: o SQL também pode ficar
+            cache_sql.guardar(chave_sql, sql_query)
+            return resposta, None, None
+
+        # --- Etapa 2: Executar o SQL (ou pular) ---
+        if sql_query.upper() == 'INVALIDO':
+            sql_results = json.dumps({"erro": "A pergunta não parece ser uma consulta de banco de dados."})
+        else:
+            sql_results = self._executar_query_segura(sql_query)
+        consulta_ok = not sql_results.startswith("Erro ao executar a consulta")
+        if consulta_ok:
+            cache_sql.guardar(chave_sql, sql_query)
+
+        prompt_final = self._prompt_resposta(pergunta_usuario, sql_query, sql_results)
+        cacheavel = consulta_ok and sql_query.upper() != 'INVALIDO'
+        return None, prompt_final, chave if cacheavel else None
+
+    def executar(self, pergunta_usuario):
+        try:
+            resposta, prompt_final, chave = self._preparar_resposta(pergunta_usuario)
+            if resposta is not None:
+                return resposta
+
+            # --- Etapa 3: Gerar a Resposta Final ---
+            response_final = self.model.generate_content(prompt_final)
+            try:
+                resposta = response_final.text
+            except ValueError:
+                return "Desculpe, tive um problema ao processar a resposta final. Tente novamente."
+            if chave is not None:
+                cache_respostas.guardar(chave, resposta)
+            return resposta
+        except Exception as e:
+            return f"Desculpe, ocorreu um erro geral no processamento da sua pergunta: {e}"
+
+    def executar_stream(self, pergunta_usuario):
+        """Como executar, mas devolve a resposta final em pedaços, à medida que o modelo os gera."""
+        try:
+            resposta, prompt_final, chave = self._preparar_resposta(pergunta_usuario)
+            if resposta is not None:
+                yield resposta
+                return
+
+            # --- Etapa 3: Gerar a Resposta Final (streaming) ---
+            partes = []
+            for parte in self.model.generate_content_stream(prompt_final):
+                partes.append(parte)
+                yield parte
+            if not partes:
+                yield "Desculpe, tive um problema ao processar a resposta final. Tente novamente."
+            elif chave is not None:
+                cache_respostas.guardar(chave, ''.join(partes))
+        except Exception as e:
+            yield f"Desculpe, ocorreu um erro geral no processamento da sua pergunta: {e}"
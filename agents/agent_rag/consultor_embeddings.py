@@ -1,5 +1,4 @@
 import os
-import google.generativeai as genai
 import json
 import numpy as np
 from dotenv import load_dotenv
@@ -7,36 +6,39 @@ from django.db import connection
 import datetime
 import decimal
 
+from agents.llm_client import obter_cliente, MODELO_EMBEDDING
 from .corpus_exemplos import CORPUS_EXEMPLOS
+from .indice_embeddings import obter_indice
+from .indice_vetorial import IndiceExato
+from .cache_rag import cache_embeddings, normalizar_pergunta, versao_esquema
+from .consultor_base import ConsultorRAGBase
 
 load_dotenv()
 
-class AgentConsultorEmbeddings:
+class AgentConsultorEmbeddings(ConsultorRAGBase):
     def __init__(self, api_key=None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("A chave da API do Gemini é obrigatória.")
 
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = obter_cliente(self.api_key, 'gemini-2.5-flash')
         self.schema = self._get_db_schema()
 
         # --- LÓGICA RAG ---
         self.corpus_perguntas = [item['pergunta'] for item in CORPUS_EXEMPLOS]
         self.corpus_queries = [item['query'] for item in CORPUS_EXEMPLOS]
+        # Os exemplos entram no prompt do SQL: mudar o corpus também invalida o SQL em cache
+        self.versao_esquema = versao_esquema(str(self.VERSAO_PROMPT), self.schema, *self.corpus_perguntas, *self.corpus_queries)
         
-        print("Iniciando Agente Consultor EMBEDDINGS...")
         # Nota: A geração de embeddings pode falhar se a chave for inválida na inicialização
         # Mas permitimos instanciar para validação posterior se necessário
         try:
-            print("Gerando embeddings para o corpus de exemplos...")
-            self.corpus_embeddings = self._gerar_embeddings_corpus(self.corpus_perguntas)
-            
-            num_exemplos = self.corpus_embeddings.shape[0] if len(self.corpus_embeddings.shape) > 1 else (len(self.corpus_embeddings) if self.corpus_embeddings.size > 0 else 0)
-            print(f"Corpus de Embeddings carregado. {num_exemplos} exemplos processados.")
+            # Índice em disco, carregado uma vez por processo; só textos novos vão para a API
+            self.indice = obter_indice(self.corpus_perguntas, self._gerar_embeddings_corpus,
+                                       type(self.model.transporte).__name__, MODELO_EMBEDDING)
         except Exception as e:
             print(f"Erro ao inicializar embeddings (verifique a API Key): {e}")
-            self.corpus_embeddings = np.array([])
+            self.indice = IndiceExato(np.zeros((0, 0), dtype=np.float32))
 
 
     def _get_db_schema(self):
@@ -71,59 +73,80 @@ class AgentConsultorEmbeddings:
         Tabela "MovimentoContas_has_Classificacao":
           - "MovimentoContas_idMovimentoContas" (int): Chave estrangeira para Tabela "MovimentoContas"
           - "Classificacao_idClassificacao" (int): Chave estrangeira para Tabela "Classificacao"
+        Tabela "ResumoMovimentos" (totais pré-calculados; uma linha por mês, tipo, status e fornecedor/cliente):
+          - mes (date): Primeiro dia do mês de emissão (ex: '2024-10-01')
+          - tipo (string): PAGAR ou RECEBER (já em maiúsculas)
+          - status (string): PENDENTE, PAGO, CANCELADO (já em maiúsculas)
+          - pessoa_id (int): Chave estrangeira para Tabela "Pessoas" (o fornecedor ou cliente)
+          - pessoa (string): Razão Social do fornecedor ou cliente
+          - quantidade (int): Número de movimentos
+          - valor_total (decimal): Soma de valortotal dos movimentos
+        Tabela "ResumoClassificacoes" (totais pré-calculados; uma linha por mês, tipo, status e classificação):
+          - mes (date): Primeiro dia do mês de emissão
+          - tipo (string): PAGAR ou RECEBER (já em maiúsculas)
+          - status (string): PENDENTE, PAGO, CANCELADO (já em maiúsculas)
+          - classificacao_id (int): Chave estrangeira para Tabela "Classificacao"
+          - classificacao (string): Descrição da classificação
+          - quantidade (int): Número de movimentos
+          - valor_total (decimal): Soma de valortotal dos movimentos
+        Tabela "ResumoVencimentos" (totais pré-calculados; uma linha por mês de vencimento, tipo e status da parcela):
+          - mes (date): Primeiro dia do mês de vencimento
+          - tipo (string): PAGAR ou RECEBER (já em maiúsculas)
+          - statusparcela (string): PENDENTE, PAGO (já em maiúsculas)
+          - quantidade (int): Número de parcelas
+          - valor_parcelas (decimal): Soma de valorparcela
+          - valor_pago (decimal): Soma dos valores pagos
+          - valor_saldo (decimal): Soma dos saldos em aberto
         """
         return schema_info
 
     def _gerar_embeddings_corpus(self, textos):
-        try:
-            result = genai.embed_content(
-                model="models/embedding-001",
-                content=textos,
-                task_type="RETRIEVAL_QUERY"
-            )
-            
-            if isinstance(result, dict) and 'embedding' in result:
-                embeddings = result['embedding']
-                if isinstance(embeddings, list) and len(embeddings) > 0:
-                    if isinstance(embeddings[0], list):
-                        return np.array(embeddings)
-                    else:
-                        return np.array([embeddings])
+        # Sem try/except: uma falha aqui não pode ser gravada no índice como corpus vazio
+        result = self.model.embed_content(textos, task_type="RETRIEVAL_QUERY")
+
+        if isinstance(result, dict) and 'embedding' in result:
+            embeddings = result['embedding']
+            if isinstance(embeddings, list) and len(embeddings) > 0:
+                if isinstance(embeddings[0], list):
+                    return np.array(embeddings)
                 else:
-                    return np.array(embeddings) if isinstance(embeddings, list) else np.array([embeddings])
-            elif isinstance(result, list):
-                embeddings_list = [item['embedding'] if isinstance(item, dict) and 'embedding' in item else item for item in result]
-                return np.array(embeddings_list)
+                    return np.array([embeddings])
             else:
-                return np.array(result)
-        except Exception as e:
-            print(f"Erro ao gerar embeddings do corpus: {e}")
-            return np.array([])
+                return np.array(embeddings) if isinstance(embeddings, list) else np.array([embeddings])
+        elif isinstance(result, list):
+            embeddings_list = [item['embedding'] if isinstance(item, dict) and 'embedding' in item else item for item in result]
+            return np.array(embeddings_list)
+        else:
+            return np.array(result)
+
+    def _embedding_pergunta(self, pergunta_usuario):
+        result_usuario = self.model.embed_content(pergunta_usuario, task_type="RETRIEVAL_QUERY")
+        if isinstance(result_usuario, dict) and 'embedding' in result_usuario:
+            embedding_usuario = np.array(result_usuario['embedding'])
+        elif isinstance(result_usuario, list) and len(result_usuario) > 0:
+            embedding_usuario = np.array(result_usuario[0]['embedding'] if isinstance(result_usuario[0], dict) else result_usuario[0])
+        else:
+            embedding_usuario = np.array(result_usuario)
+
+        if embedding_usuario.ndim > 1:
+            embedding_usuario = embedding_usuario.flatten()
+        return embedding_usuario
 
     def _encontrar_exemplos_similares(self, pergunta_usuario, k=3):
-        if self.corpus_embeddings.size == 0:
+        if len(self.indice) == 0:
             return ""
         try:
-            result_usuario = genai.embed_content(
-                model="models/embedding-001",
-                content=pergunta_usuario,
-                task_type="RETRIEVAL_QUERY"
-            )
-            if isinstance(result_usuario, dict) and 'embedding' in result_usuario:
-                embedding_usuario = np.array(result_usuario['embedding'])
-            elif isinstance(result_usuario, list) and len(result_usuario) > 0:
-                embedding_usuario = np.array(result_usuario[0]['embedding'] if isinstance(result_usuario[0], dict) else result_usuario[0])
-            else:
-                embedding_usuario = np.array(result_usuario)
-            
-            if embedding_usuario.ndim > 1:
-                embedding_usuario = embedding_usuario.flatten()
-
-            similaridades = np.dot(self.corpus_embeddings, embedding_usuario)
-            top_k_indices = np.argsort(similaridades)[-k:]
-            
+            chave = (type(self.model.transporte).__name__, normalizar_pergunta(pergunta_usuario))
+            embedding_usuario = cache_embeddings.obter(chave)
+            if embedding_usuario is None:
+                embedding_usuario = self._embedding_pergunta(pergunta_usuario)
+                cache_embeddings.guardar(chave, embedding_usuario)
+
+            # Similaridade de cosseno; os k melhores já vêm do mais para o menos parecido
+            top_k_indices, _ = self.indice.buscar(embedding_usuario, k)
+
             exemplos_formatados = "\n\n--- EXEMPLOS RELEVANTES ENCONTRADOS ---\n"
-            for i in reversed(top_k_indices):
+            for i in top_k_indices:
                 exemplos_formatados += f"Exemplo de Pergunta: {self.corpus_perguntas[i]}\n"
                 exemplos_formatados += f"Exemplo de SQL: {self.corpus_queries[i]}\n---\n"
             return exemplos_formatados
@@ -155,79 +178,72 @@ class AgentConsultorEmbeddings:
         except Exception as e:
             return f"Erro ao executar a consulta: {e}"
 
-    def executar(self, pergunta_usuario):
+    def _gerar_sql(self, pergunta_usuario):
+        exemplos_relevantes = self._encontrar_exemplos_similares(pergunta_usuario)
+
+        prompt_sql = f"""
+        Você é um assistente especialista em SQL do PostgreSQL.
+        Seu trabalho é traduzir a pergunta do usuário em uma consulta SQL com base no esquema do banco de dados fornecido.
+        O usuário NÃO conhece o esquema, então use os nomes das tabelas e colunas do esquema.
+        Use aspas duplas (ex: "Pessoas") nas tabelas e colunas, pois elas são case-sensitive.
+
+        REGRAS CRÍTICAS:
+        1. Gere APENAS a consulta SQL.
+        2. NÃO inclua '```sql' ou qualquer outra formatação.
+        3. Se a pergunta NÃO tiver NENHUMA relação com o banco (ex: "oi", "bom dia"), retorne APENAS a palavra 'INVALIDO'.
+        4. **INSENSIBILIDADE DE CASO (MAIS IMPORTANTE):** Para TODAS as comparações de string (em cláusulas `WHERE` ou `JOIN`), 
+           use a função `UPPER()` em ambos os lados para garantir que a busca não seja sensível a maiúsculas/minúsculas.
+           Exemplo: `WHERE UPPER(T1.descricao) = UPPER('valor do usuário')`
+
+        --- REGRA DE SINÔNIMOS (IMPORTANTE) ---
+        - O usuário pode usar o termo "cliente". No banco, isso pode ser `tipo = 'CLIENTE'` ou `tipo = 'FATURADO'`.
+        - Se o usuário perguntar por "clientes", gere um SQL que procure por AMBOS: `... WHERE UPPER(tipo) IN ('CLIENTE', 'FATURADO') ...`
+        - Se o usuário perguntar especificamente por "faturado", procure apenas `UPPER(tipo) = 'FATURADO'`.
+        --- FIM DA REGRA DE SINÔNIMOS ---
+
+        --- TABELAS DE RESUMO ---
+        - Para totais, somas, contagens e médias por mês, tipo, status, classificação ou fornecedor/cliente,
+          consulte "ResumoMovimentos", "ResumoClassificacoes" ou "ResumoVencimentos" em vez de agregar
+          "MovimentoContas" e "ParcelasContas". Médias: SUM(valor_total) / SUM(quantidade).
+        - Use as tabelas originais quando a pergunta pedir movimentos, notas ou parcelas individuais.
+        --- FIM DAS TABELAS DE RESUMO ---
+
+        --- ESQUEMA DO BANCO ---
+        {self.schema}
+        --- FIM DO ESQUEMA ---
+
+        {exemplos_relevantes} 
+
+        PERGUNTA DO USUÁRIO: "{pergunta_usuario}"
+
+        SQL GERADO:
+        """
+        response_sql = self.model.generate_content(prompt_sql)
         try:
-            exemplos_relevantes = self._encontrar_exemplos_similares(pergunta_usuario)
-
-            # --- Etapa 1: Gerar o SQL ---
-            prompt_sql = f"""
-            Você é um assistente especialista em SQL do PostgreSQL.
-            Seu trabalho é traduzir a pergunta do usuário em uma consulta SQL com base no esquema do banco de dados fornecido.
-            O usuário NÃO conhece o esquema, então use os nomes das tabelas e colunas do esquema.
-            Use aspas duplas (ex: "Pessoas") nas tabelas e colunas, pois elas são case-sensitive.
-            
-            REGRAS CRÍTICAS:
-            1. Gere APENAS a consulta SQL.
-            2. NÃO inclua '```sql' ou qualquer outra formatação.
-            3. Se a pergunta NÃO tiver NENHUMA relação com o banco (ex: "oi", "bom dia"), retorne APENAS a palavra 'INVALIDO'.
-            4. **INSENSIBILIDADE DE CASO (MAIS IMPORTANTE):** Para TODAS as comparações de string (em cláusulas `WHERE` ou `JOIN`), 
-               use a função `UPPER()` em ambos os lados para garantir que a busca não seja sensível a maiúsculas/minúsculas.
-               Exemplo: `WHERE UPPER(T1.descricao) = UPPER('valor do usuário')`
-
-            --- REGRA DE SINÔNIMOS (IMPORTANTE) ---
-            - O usuário pode usar o termo "cliente". No banco, isso pode ser `tipo = 'CLIENTE'` ou `tipo = 'FATURADO'`.
-            - Se o usuário perguntar por "clientes", gere um SQL que procure por AMBOS: `... WHERE UPPER(tipo) IN ('CLIENTE', 'FATURADO') ...`
-            - Se o usuário perguntar especificamente por "faturado", procure apenas `UPPER(tipo) = 'FATURADO'`.
-            --- FIM DA REGRA DE SINÔNIMOS ---
-
-            --- ESQUEMA DO BANCO ---
-            {self.schema}
-            --- FIM DO ESQUEMA ---
-            
-            {exemplos_relevantes} 
-            
-            PERGUNTA DO USUÁRIO: "{pergunta_usuario}"
-
-            SQL GERADO:
-            """
-            response_sql = self.model.generate_content(prompt_sql)
-            try:
-                sql_query = response_sql.text.strip()
-            except ValueError:
-                sql_query = 'INVALIDO' 
-            if not sql_query:
-                sql_query = 'INVALIDO'
-            
-            # --- Etapa 2: Executar o SQL (ou pular) ---
-            if sql_query.upper() == 'INVALIDO':
-                sql_results = json.dumps({"erro": "A pergunta não parece ser uma consulta de banco de dados."})
-            else:
-                sql_results = self._executar_query_segura(sql_query)
-
-            # --- Etapa 3: Gerar a Resposta Final ---
-            prompt_final = f"""
-            Você é um assistente financeiro amigável.
-            A pergunta do usuário foi: "{pergunta_usuario}"
-            Para responder, eu executei (ou tentei executar) a consulta SQL:
-            `{sql_query}`
-            E obtive os seguintes resultados do banco (em formato JSON):
-            {sql_results}
-            Com base nesses resultados, elabore uma resposta clara e amigável em português para o usuário.
-            REGRAS DE RESPOSTA:
-            - Se o SQL for 'INVALIDO' ou o resultado contiver "A pergunta não parece ser uma consulta", 
-              explique amigavelmente que você é um assistente focado em dados financeiros (ex: "Olá! Sou um assistente focado em dados. Como posso ajudar com suas finanças?").
-            - Se os resultados forem uma lista vazia, diga que "Nenhum dado foi encontrado para essa consulta."
-            - Se for um erro (diferente de 'INVALIDO'), explique o erro de forma simples.
-            - Se for um número (ex: contagem), responda diretamente.
-            - Se for uma lista de itens, formate-os de maneira legível.
-
-            RESPOSTA AMIGÁVEL:
-            """
-            
-            response_final = self.model.generate_content(prompt_final)
-            try:
-                return response_final.text
-            except ValueError:
-                return "Desculpe, tive um problema ao processar a resposta final. Tente novamente."
-        except Exception as e:
-            return f"Desculpe, ocorreu um erro geral no processamento da sua pergunta: {e}"
\ No newline at end of file
+            sql_query = response_sql.text.strip()
+        except ValueError:
+            sql_query = 'INVALIDO' 
+        if not sql_query:
+            sql_query = 'INVALIDO'
+        return sql_query
+
+    def _prompt_resposta(self, pergunta_usuario, sql_query, sql_results):
+        """Prompt da Etapa 3 (Resposta Final), a partir do SQL e do seu resultado."""
+        return f"""
+        Você é um assistente financeiro amigável.
+        A pergunta do usuário foi: "{pergunta_usuario}"
+        Para responder, eu executei (ou tentei executar) a consulta SQL:
+        `{sql_query}`
+        E obtive os seguintes resultados do banco (em formato JSON):
+        {sql_results}
+        Com base nesses resultados, elabore uma resposta clara e amigável em português para o usuário.
+        REGRAS DE RESPOSTA:
+        - Se o SQL for 'INVALIDO' ou o resultado contiver "A pergunta não parece ser uma consulta", 
+          explique amigavelmente que você é um assistente focado em dados financeiros (ex: "Olá! Sou um assistente focado em dados. Como posso ajudar com suas finanças?").
+        - Se os resultados forem uma lista vazia, diga que "Nenhum dado foi encontrado para essa consulta."
+        - Se for um erro (diferente de 'INVALIDO'), explique o erro de forma simples.
+        - Se for um número (ex: contagem), responda diretamente.
+        - Se for uma lista de itens, formate-os de maneira legível.
+
+        RESPOSTA AMIGÁVEL:
+        """
@@ -1,22 +1,25 @@
 import os
-import google.generativeai as genai
 import json
 import datetime
 import decimal
 from dotenv import load_dotenv
 from django.db import connection 
 
+from agents.llm_client import obter_cliente
+from .cache_rag import versao_esquema
+from .consultor_base import ConsultorRAGBase
+
 load_dotenv()
 
-class AgentConsultorSimples:
+class AgentConsultorSimples(ConsultorRAGBase):
     def __init__(self, api_key=None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("A chave da API do Gemini é obrigatória.")
 
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = obter_cliente(self.api_key, 'gemini-2.5-flash')
         self.schema = self._get_db_schema()
+        self.versao_esquema = versao_esquema(str(self.VERSAO_PROMPT), self.schema)
 
     def _get_db_schema(self):
         """
@@ -59,6 +62,32 @@ class AgentConsultorSimples:
         Tabela "MovimentoContas_has_Classificacao":
           - "MovimentoContas_idMovimentoContas" (int): Chave estrangeira para Tabela "MovimentoContas"
           - "Classificacao_idClassificacao" (int): Chave estrangeira para Tabela "Classificacao"
+        Tabela "ResumoMovimentos" (totais pré-calculados; uma linha por mês, tipo, status e fornecedor/cliente):
+          - mes (date): Primeiro dia do mês de emissão (ex: '2024-10-01')
+          - tipo (string): PAGAR ou RECEBER (já em maiúsculas)
+          - status (string): PENDENTE, PAGO, CANCELADO (já em maiúsculas)
+          - pessoa_id (int): Chave estrangeira para Tabela "Pessoas" (o fornecedor ou cliente)
+          - pessoa (string): Razão Social do fornecedor ou cliente
+          - quantidade (int): Número de movimentos
+          - valor_total (decimal): Soma de valortotal dos movimentos
+
+        Tabela "ResumoClassificacoes" (totais pré-calculados; uma linha por mês, tipo, status e classificação):
+          - mes (date): Primeiro dia do mês de emissão
+          - tipo (string): PAGAR ou RECEBER (já em maiúsculas)
+          - status (string): PENDENTE, PAGO, CANCELADO (já em maiúsculas)
+          - classificacao_id (int): Chave estrangeira para Tabela "Classificacao"
+          - classificacao (string): Descrição da classificação
+          - quantidade (int): Número de movimentos
+          - valor_total (decimal): Soma de valortotal dos movimentos
+
+        Tabela "ResumoVencimentos" (totais pré-calculados; uma linha por mês de vencimento, tipo e status da parcela):
+          - mes (date): Primeiro dia do mês de vencimento
+          - tipo (string): PAGAR ou RECEBER (já em maiúsculas)
+          - statusparcela (string): PENDENTE, PAGO (já em maiúsculas)
+          - quantidade (int): Número de parcelas
+          - valor_parcelas (decimal): Soma de valorparcela
+          - valor_pago (decimal): Soma dos valores pagos
+          - valor_saldo (decimal): Soma dos saldos em aberto
         """
         return schema_info
 
@@ -95,89 +124,79 @@ class AgentConsultorSimples:
             except Exception as e:
                 return f"Erro ao executar a consulta: {e}"
 
-    def executar(self, pergunta_usuario):
-        try:
-            # --- Etapa 1: Gerar o SQL ---
-            prompt_sql = f"""
-            Você é um assistente especialista em SQL do PostgreSQL.
-            Seu trabalho é traduzir a pergunta do usuário em uma consulta SQL com base no esquema do banco de dados fornecido.
-            O usuário NÃO conhece o esquema, então use os nomes das tabelas e colunas do esquema.
-            Use aspas duplas (ex: "Pessoas") nas tabelas e colunas, pois elas são case-sensitive.
-            
-            REGRAS CRÍTICAS:
-            1. Gere APENAS a consulta SQL.
-            2. NÃO inclua '```sql' ou qualquer outra formatação.
-            3. Priorize consultas que respondam diretamente à pergunta.
-            4. Se a pergunta for sobre "hoje", "este mês", use as funções do PostgreSQL como NOW() ou CURRENT_DATE.
-            5. Se a pergunta NÃO tiver NENHUMA relação com o banco de dados (ex: "oi", "bom dia", "quem é você?"), 
-               retorne APENAS a palavra 'INVALIDO'.
-            6. **INSENSIBILIDADE DE CASO (MAIS IMPORTANTE):** Para TODAS as comparações de string (em cláusulas `WHERE`), 
-               use a função `UPPER()` em ambos os lados para garantir que a busca não seja sensível a maiúsculas/minúsculas.
-               Exemplo: `WHERE UPPER(coluna) = UPPER('valor do usuário')`
-
-            --- REGRA DE SINÔNIMOS (IMPORTANTE) ---
-            - O usuário pode usar o termo "cliente". No banco, isso pode ser `tipo = 'CLIENTE'` ou `tipo = 'FATURADO'`.
-            - Se o usuário perguntar por "clientes", gere um SQL que procure por AMBOS: `... WHERE UPPER(tipo) IN ('CLIENTE', 'FATURADO') ...`
-            - Se o usuário perguntar especificamente por "faturado", procure apenas `UPPER(tipo) = 'FATURADO'`.
-            --- FIM DA REGRA DE SINÔNIMOS ---
-
-            --- ESQUEMA DO BANCO ---
-            {self.schema}
-            --- FIM DO ESQUEMA ---
-
-            PERGUNTA DO USUÁRIO: "{pergunta_usuario}"
-
-            SQL GERADO:
-            """
-
-            response_sql = self.model.generate_content(prompt_sql)
-
-            try:
-                sql_query = response_sql.text.strip()
-            except ValueError:
-                sql_query = 'INVALIDO' 
-                
-            if not sql_query:
-                sql_query = 'INVALIDO'
-
-
-            # --- Etapa 2: Executar o SQL (ou pular) ---
-            if sql_query.upper() == 'INVALIDO':
-                sql_results = json.dumps({"erro": "A pergunta não parece ser uma consulta de banco de dados."})
-            else:
-                sql_results = self._executar_query_segura(sql_query)
-
-            # --- Etapa 3: Gerar a Resposta Final ---
-            prompt_final = f"""
-            Você é um assistente financeiro amigável.
-            A pergunta do usuário foi: "{pergunta_usuario}"
-            
-            Para responder, eu executei (ou tentei executar) a consulta SQL:
-            `{sql_query}`
-            
-            E obtive os seguintes resultados do banco (em formato JSON):
-            {sql_results}
+    def _gerar_sql(self, pergunta_usuario):
+        prompt_sql = f"""
+        Você é um assistente especialista em SQL do PostgreSQL.
+        Seu trabalho é traduzir a pergunta do usuário em uma consulta SQL com base no esquema do banco de dados fornecido.
+        O usuário NÃO conhece o esquema, então use os nomes das tabelas e colunas do esquema.
+        Use aspas duplas (ex: "Pessoas") nas tabelas e colunas, pois elas são case-sensitive.
+
+        REGRAS CRÍTICAS:
+        1. Gere APENAS a consulta SQL.
+        2. NÃO inclua '```sql' ou qualquer outra formatação.
+        3. Priorize consultas que respondam diretamente à pergunta.
+        4. Se a pergunta for sobre "hoje", "este mês", use as funções do PostgreSQL como NOW() ou CURRENT_DATE.
+        5. Se a pergunta NÃO tiver NENHUMA relação com o banco de dados (ex: "oi", "bom dia", "quem é você?"), 
+           retorne APENAS a palavra 'INVALIDO'.
+        6. **INSENSIBILIDADE DE CASO (MAIS IMPORTANTE):** Para TODAS as comparações de string (em cláusulas `WHERE`), 
+           use a função `UPPER()` em ambos os lados para garantir que a busca não seja sensível a maiúsculas/minúsculas.
+           Exemplo: `WHERE UPPER(coluna) = UPPER('valor do usuário')`
+
+        --- REGRA DE SINÔNIMOS (IMPORTANTE) ---
+        - O usuário pode usar o termo "cliente". No banco, isso pode ser `tipo = 'CLIENTE'` ou `tipo = 'FATURADO'`.
+        - Se o usuário perguntar por "clientes", gere um SQL que procure por AMBOS: `... WHERE UPPER(tipo) IN ('CLIENTE', 'FATURADO') ...`
+        - Se o usuário perguntar especificamente por "faturado", procure apenas `UPPER(tipo) = 'FATURADO'`.
+        --- FIM DA REGRA DE SINÔNIMOS ---
+
+        --- TABELAS DE RESUMO ---
+        - Para totais, somas, contagens e médias por mês, tipo, status, classificação ou fornecedor/cliente,
+          consulte "ResumoMovimentos", "ResumoClassificacoes" ou "ResumoVencimentos" em vez de agregar
+          "MovimentoContas" e "ParcelasContas". Médias: SUM(valor_total) / SUM(quantidade).
+        - Use as tabelas originais quando a pergunta pedir movimentos, notas ou parcelas individuais.
+        --- FIM DAS TABELAS DE RESUMO ---
+
+        --- ESQUEMA DO BANCO ---
+        {self.schema}
+        --- FIM DO ESQUEMA ---
+
+        PERGUNTA DO USUÁRIO: "{pergunta_usuario}"
+
+        SQL GERADO:
+        """
 
-            Com base nesses resultados, elabore uma resposta clara e amigável em português para o usuário.
-            
-            --- NOVAS REGRAS DE RESPOSTA ---
-            - Se o SQL for 'INVALIDO' ou o resultado contiver "A pergunta não parece ser uma consulta", 
-              explique amigavelmente que você é um assistente focado em dados financeiros e não entendeu a pergunta 
-              (ex: "Olá! Sou um assistente focado em dados. Como posso ajudar com suas finanças?").
-            - Se os resultados forem uma lista vazia, diga que "Nenhum dado foi encontrado para essa consulta."
-            - Se for um erro (diferente de 'INVALIDO'), explique o erro de forma simples (ex: "Tive um problema ao consultar o banco de dados.").
-            - Se for um número (ex: contagem), responda diretamente (ex: "Foram encontrados 5 fornecedores.").
-            - Se for uma lista de itens, formate-os de maneira legível.
-
-            RESPOSTA AMIGÁVEL:
-            """
-            
-            response_final = self.model.generate_content(prompt_final)
-            
-            try:
-                return response_final.text
-            except ValueError:
-                return "Desculpe, tive um problema ao processar a resposta final. Tente novamente."
+        response_sql = self.model.generate_content(prompt_sql)
 
-        except Exception as e:
-            return f"Desculpe, ocorreu um erro geral no processamento da sua pergunta: {e}"
\ No newline at end of file
+        try:
+            sql_query = response_sql.text.strip()
+        except ValueError:
+            sql_query = 'INVALIDO' 
+
+        if not sql_query:
+            sql_query = 'INVALIDO'
+        return sql_query
+
+    def _prompt_resposta(self, pergunta_usuario, sql_query, sql_results):
+        """Prompt da Etapa 3 (Resposta Final), a partir do SQL e do seu resultado."""
+        return f"""
+        Você é um assistente financeiro amigável.
+        A pergunta do usuário foi: "{pergunta_usuario}"
+        
+        Para responder, eu executei (ou tentei executar) a consulta SQL:
+        `{sql_query}`
+        
+        E obtive os seguintes resultados do banco (em formato JSON):
+        {sql_results}
+
+        Com base nesses resultados, elabore uma resposta clara e amigável em português para o usuário.
+        
+        --- NOVAS REGRAS DE RESPOSTA ---
+        - Se o SQL for 'INVALIDO' ou o resultado contiver "A pergunta não parece ser uma consulta", 
+          explique amigavelmente que você é um assistente focado em dados financeiros e não entendeu a pergunta 
+          (ex: "Olá! Sou um assistente focado em dados. Como posso ajudar com suas finanças?").
+        - Se os resultados forem uma lista vazia, diga que "Nenhum dado foi encontrado para essa consulta."
+        - Se for um erro (diferente de 'INVALIDO'), explique o erro de forma simples (ex: "Tive um problema ao consultar o banco de dados.").
+        - Se for um número (ex: contagem), responda diretamente (ex: "Foram encontrados 5 fornecedores.").
+        - Se for uma lista de itens, formate-os de maneira legível.
+
+        RESPOSTA AMIGÁVEL:
+        """
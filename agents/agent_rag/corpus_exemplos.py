@@ -15,11 +15,11 @@ CORPUS_EXEMPLOS = [
     },
     {
         "pergunta": "Qual o valor total de todas as contas a pagar que estão pendentes?",
-        "query": """SELECT SUM(valortotal) FROM "MovimentoContas" WHERE UPPER(tipo) = 'PAGAR' AND UPPER(status) = 'PENDENTE';"""
+        "query": """SELECT SUM(valor_total) FROM "ResumoMovimentos" WHERE tipo = 'PAGAR' AND status = 'PENDENTE';"""
     },
     {
         "pergunta": "Quanto eu tenho para receber no total?",
-        "query": """SELECT SUM(valortotal) FROM "MovimentoContas" WHERE UPPER(tipo) = 'RECEBER';"""
+        "query": """SELECT SUM(valor_total) FROM "ResumoMovimentos" WHERE tipo = 'RECEBER';"""
     },
     {
         "pergunta": "Quais são as classificações de despesa disponíveis?",
@@ -55,7 +55,7 @@ CORPUS_EXEMPLOS = [
     },
     {
         "pergunta": "Qual o valor médio dos movimentos a pagar?",
-        "query": """SELECT AVG(valortotal) FROM "MovimentoContas" WHERE UPPER(tipo) = 'PAGAR';"""
+        "query": """SELECT SUM(valor_total) / SUM(quantidade) FROM "ResumoMovimentos" WHERE tipo = 'PAGAR';"""
     },
     {
         "pergunta": "Quais as parcelas do movimento da nota 'NF-456'?",
@@ -84,5 +84,17 @@ CORPUS_EXEMPLOS = [
     {
         "pergunta": "Qual o maior valor de parcela única registrado?",
         "query": """SELECT MAX(valorparcela) FROM "ParcelasContas";"""
+    },
+    {
+        "pergunta": "Quanto foi gasto por classificação de despesa em outubro de 2024?",
+        "query": """SELECT classificacao, SUM(valor_total) AS total FROM "ResumoClassificacoes" WHERE tipo = 'PAGAR' AND mes = '2024-10-01' GROUP BY classificacao ORDER BY total DESC;"""
+    },
+    {
+        "pergunta": "Quanto eu paguei ao fornecedor 'Nome Exato da Pessoa' em 2024?",
+        "query": """SELECT SUM(valor_total) FROM "ResumoMovimentos" WHERE tipo = 'PAGAR' AND status = 'PAGO' AND UPPER(pessoa) = UPPER('Nome Exato da Pessoa') AND mes BETWEEN '2024-01-01' AND '2024-12-01';"""
+    },
+    {
+        "pergunta": "Qual o saldo a pagar que vence em cada mês?",
+        "query": """SELECT mes, SUM(valor_saldo) AS saldo FROM "ResumoVencimentos" WHERE tipo = 'PAGAR' AND statusparcela = 'PENDENTE' GROUP BY mes ORDER BY mes;"""
     }
-]
\ No newline at end of file
+]
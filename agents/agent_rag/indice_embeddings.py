@@ -0,0 +1,124 @@
+"""
+Índice persistente dos embeddings do corpus de exemplos do RAG.
+
+Os vetores ficam em disco como .npy (float32, normalizados), um arquivo por versão do
+corpus, com nome igual ao hash do conteúdo; ao lado, um manifesto .json com o hash de
+cada texto, na ordem das linhas. Ao mudar o corpus, só os textos novos ou alterados vão para a API
+de embeddings; os demais são copiados das versões anteriores. A matriz é carregada com
+mmap uma vez por processo, dentro de um índice vetorial (indice_vetorial.criar_indice)
+compartilhado entre as instâncias do agente.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .indice_vetorial import criar_indice, normalizar
+
+DIRETORIO_PADRAO = Path(__file__).resolve().parents[2] / 'media' / 'indices_rag'
+# Versões antigas mantidas no disco (servem de fonte para reaproveitar vetores)
+VERSOES_MANTIDAS = 3
+# Muda quando o conteúdo dos arquivos muda (2: vetores normalizados); vai no nome da pasta
+FORMATO = 2
+
+_indices = {}
+_lock = threading.Lock()
+
+
+def _diretorio(transporte, modelo):
+    base = Path(os.getenv('RAG_INDICE_DIR', str(DIRETORIO_PADRAO)))
+    # Transporte e modelo geram espaços vetoriais diferentes: cada par tem sua pasta
+    return base / re.sub(r'[^A-Za-z0-9_.-]', '_', f'{transporte}-{modelo}-v{FORMATO}')
+
+
+def hash_texto(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def hash_corpus(hashes_textos):
+    return hashlib.sha256('\n'.join(hashes_textos).encode()).hexdigest()
+
+
+def _vetores_conhecidos(diretorio):
+    """{hash do texto: vetor} de todas as versões gravadas, das mais novas para as mais antigas."""
+    conhecidos = {}
+    manifestos = sorted(diretorio.glob('*.json'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for manifesto in manifestos:
+        matriz_path = manifesto.with_suffix('.npy')
+        if not matriz_path.exists():
+            continue
+        hashes = json.loads(manifesto.read_text())
+        matriz = np.load(matriz_path, mmap_mode='r')
+        for linha, h in enumerate(hashes):
+            conhecidos.setdefault(h, matriz[linha])
+    return conhecidos
+
+
+def _gravar_atomico(caminho, escrever):
+    fd, caminho_tmp = tempfile.mkstemp(dir=caminho.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as arquivo:
+            escrever(arquivo)
+        os.replace(caminho_tmp, caminho)
+    except BaseException:
+        os.unlink(caminho_tmp)
+        raise
+
+
+def _remover_versoes_antigas(diretorio):
+    manifestos = sorted(diretorio.glob('*.json'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for manifesto in manifestos[VERSOES_MANTIDAS:]:
+        manifesto.with_suffix('.npy').unlink(missing_ok=True)
+        manifesto.unlink(missing_ok=True)
+
+
+def construir_indice(textos, gerar_embeddings, transporte, modelo):
+    """
+    Grava (se preciso) e carrega o índice de `textos`. `gerar_embeddings(lista)` é chamado
+    só com os textos que ainda não têm vetor e deve devolver uma matriz (n, dimensão).
+    Retorna (matriz memory-mapped, quantidade de textos enviados para a API).
+    """
+    diretorio = _diretorio(transporte, modelo)
+    hashes = [hash_texto(t) for t in textos]
+    caminho = diretorio / f'{hash_corpus(hashes)}.npy'
+    if caminho.exists():
+        return np.load(caminho, mmap_mode='r'), 0
+
+    diretorio.mkdir(parents=True, exist_ok=True)
+    conhecidos = _vetores_conhecidos(diretorio)
+    faltando = [i for i, h in enumerate(hashes) if h not in conhecidos]
+    if faltando:
+        novos = np.asarray(gerar_embeddings([textos[i] for i in faltando]), dtype=np.float32)
+        if novos.ndim != 2 or novos.shape[0] != len(faltando):
+            raise ValueError(f'Esperados {len(faltando)} embeddings, recebido array com forma {novos.shape}')
+        conhecidos.update(zip((hashes[i] for i in faltando), novos))
+
+    matriz = normalizar(np.stack([conhecidos[h] for h in hashes]))
+    _gravar_atomico(caminho, lambda arquivo: np.save(arquivo, matriz))
+    # O manifesto vai por último: sem ele, a matriz não é usada como fonte de vetores
+    _gravar_atomico(caminho.with_suffix('.json'), lambda arquivo: arquivo.write(json.dumps(hashes).encode()))
+    _remover_versoes_antigas(diretorio)
+    return np.load(caminho, mmap_mode='r'), len(faltando)
+
+
+def obter_indice(textos, gerar_embeddings, transporte, modelo):
+    """Índice vetorial de `textos`, montado uma única vez por processo (veja construir_indice)."""
+    chave = (transporte, modelo, hash_corpus([hash_texto(t) for t in textos]))
+    with _lock:
+        indice = _indices.get(chave)
+        if indice is None:
+            matriz, _ = construir_indice(textos, gerar_embeddings, transporte, modelo)
+            indice = criar_indice(matriz, normalizados=True)
+            _indices[chave] = indice
+        return indice
+
+
+def limpar_cache():
+    """Descarta os índices carregados no processo (o disco não é alterado)."""
+    with _lock:
+        _indices.clear()
@@ -0,0 +1,118 @@
+"""
+Índices vetoriais para a busca dos exemplos mais parecidos com a pergunta (similaridade
+de cosseno).
+
+Os vetores são guardados normalizados e em float32, de modo que o cosseno vira um
+produto escalar. IndiceExato compara a consulta com todos os vetores e separa os k
+melhores com argpartition (O(n)), sem ordenar o corpus inteiro. IndiceIVF agrupa os
+vetores com k-means esférico e, na busca, compara só com as `sondas` listas cujos
+centróides são mais próximos da consulta: troca um pouco de recall por latência em
+corpora grandes. criar_indice escolhe entre os dois pelo tamanho do corpus.
+"""
+import numpy as np
+
+# A partir deste tamanho criar_indice usa o IVF
+LIMITE_BUSCA_EXATA = 20000
+SONDAS_PADRAO = 8
+ITERACOES_KMEANS = 10
+# Vetores por lista usados no treino do k-means (amostra, não o corpus inteiro)
+AMOSTRA_POR_LISTA = 64
+
+
+def normalizar(vetores):
+    """Cópia em float32 com norma 1 por linha (linhas nulas continuam nulas)."""
+    vetores = np.asarray(vetores, dtype=np.float32)
+    normas = np.linalg.norm(vetores, axis=-1, keepdims=True)
+    return vetores / np.where(normas == 0, 1, normas)
+
+
+def _top_k(scores, k):
+    """Índices dos k maiores scores, do maior para o menor."""
+    k = min(k, scores.shape[0])
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    candidatos = np.argpartition(scores, -k)[-k:]
+    return candidatos[np.argsort(scores[candidatos])[::-1]]
+
+
+class IndiceExato:
+
+    def __init__(self, vetores, normalizados=False):
+        # Já normalizados (ex: o .npy do indice_embeddings), são usados sem cópia
+        self.vetores = vetores if normalizados else normalizar(vetores)
+
+    def __len__(self):
+        return self.vetores.shape[0] if self.vetores.ndim == 2 else 0
+
+    def buscar(self, consulta, k):
+        """(índices, similaridades) dos k vetores mais parecidos com `consulta`."""
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        scores = self.vetores @ normalizar(consulta).ravel()
+        indices = _top_k(scores, k)
+        return indices, scores[indices]
+
+
+class IndiceIVF:
+    """Índice de arquivo invertido (IVF): busca aproximada em `sondas` das `listas` partições."""
+
+    def __init__(self, vetores, listas=None, sondas=SONDAS_PADRAO, normalizados=False, seed=0):
+        vetores = vetores if normalizados else normalizar(vetores)
+        self.sondas = sondas
+        n = vetores.shape[0] if vetores.ndim == 2 else 0
+        listas = min(listas or max(1, int(np.sqrt(n))), max(n, 1))
+        self.centroides = self._treinar(vetores, listas, np.random.default_rng(seed))
+
+        atribuicoes = self._lista_mais_proxima(vetores)
+        # Vetores reordenados por lista: a lista l ocupa as posições inicios[l]:inicios[l + 1]
+        # e `ids` leva cada posição de volta ao índice original no corpus
+        self.ids = np.argsort(atribuicoes, kind='stable')
+        self.inicios = np.searchsorted(atribuicoes[self.ids], np.arange(listas + 1))
+        self.vetores = np.ascontiguousarray(vetores[self.ids])
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    def _lista_mais_proxima(self, vetores, lote=8192):
+        return np.concatenate([
+            np.argmax(vetores[i:i + lote] @ self.centroides.T, axis=1)
+            for i in range(0, vetores.shape[0], lote)
+        ]) if vetores.shape[0] else np.zeros(0, dtype=np.int64)
+
+    def _treinar(self, vetores, listas, aleatorio):
+        """k-means esférico (centróides normalizados) sobre uma amostra do corpus."""
+        n = vetores.shape[0] if vetores.ndim == 2 else 0
+        if n == 0:
+            return np.zeros((0, vetores.shape[-1] if vetores.ndim == 2 else 0), dtype=np.float32)
+        amostra = vetores[np.sort(aleatorio.choice(n, min(n, listas * AMOSTRA_POR_LISTA), replace=False))]
+        self.centroides = amostra[aleatorio.choice(amostra.shape[0], listas, replace=False)].copy()
+        for _ in range(ITERACOES_KMEANS):
+            atribuicoes = self._lista_mais_proxima(amostra)
+            contagens = np.bincount(atribuicoes, minlength=listas)
+            inicios = np.concatenate([[0], np.cumsum(contagens)[:-1]])
+            ordem = np.argsort(atribuicoes, kind='stable')
+            somas = np.add.reduceat(amostra[ordem], np.minimum(inicios, amostra.shape[0] - 1), axis=0)
+            vazias = contagens == 0
+            # Lista sem vetores recebe um ponto aleatório da amostra para não morrer
+            somas[vazias] = amostra[aleatorio.choice(amostra.shape[0], int(vazias.sum()))]
+            self.centroides = normalizar(somas)
+        return self.centroides
+
+    def buscar(self, consulta, k, sondas=None):
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        consulta = normalizar(consulta).ravel()
+        listas = _top_k(self.centroides @ consulta, sondas or self.sondas)
+        trechos = [np.arange(self.inicios[l], self.inicios[l + 1]) for l in listas]
+        posicoes = np.concatenate(trechos)
+        scores = self.vetores[posicoes] @ consulta
+        melhores = _top_k(scores, k)
+        return self.ids[posicoes[melhores]], scores[melhores]
+
+
+def criar_indice(vetores, normalizados=False, limite_exato=LIMITE_BUSCA_EXATA, **opcoes_ivf):
+    """IndiceExato para corpora pequenos (a busca exata já é rápida); IndiceIVF acima de `limite_exato`."""
+    n = vetores.shape[0] if np.ndim(vetores) == 2 else 0
+    if n < limite_exato:
+        return IndiceExato(vetores, normalizados)
+    return IndiceIVF(vetores, normalizados=normalizados, **opcoes_ivf)
@@ -0,0 +1,204 @@
+"""
+Camada compartilhada de acesso ao LLM.
+
+Substitui as chamadas a `genai.configure` (estado global do processo) por um registro
+de clientes por chave de API: cada chave ganha um único GenerativeServiceClient, cujo
+canal gRPC é reaproveitado entre requisições e é seguro para uso concorrente.
+Dois usuários com chaves diferentes no mesmo worker não interferem mais um no outro.
+
+O transporte é plugável (variável de ambiente LLM_TRANSPORT): 'gemini' (padrão) ou
+'fake', um backend local determinístico para testes e benchmarks sem rede.
+Com LLM_TRANSPORT=fake, gerar() devolve sempre "{}"; para outras respostas, registre uma
+fábrica com responder, ex: registrar_transporte('fake', lambda k: TransporteFake(k, responder=f)).
+
+Os registros guardam no máximo LLM_MAX_TRANSPORTES transportes (um canal gRPC cada) e
+LLM_MAX_CLIENTES clientes; os menos usados são descartados.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import google.ai.generativelanguage as glm
+import google.generativeai as genai
+import numpy as np
+
+MODELO_EMBEDDING = "models/embedding-001"
+
+
+class TransporteGemini:
+    def __init__(self, api_key):
+        self._client = glm.GenerativeServiceClient(client_options={'api_key': api_key})
+
+    def _modelo(self, modelo, generation_config):
+        model = genai.GenerativeModel(modelo, generation_config=generation_config)
+        # Injeta o cliente da chave em vez do cliente global do genai.configure
+        model._client = self._client
+        return model
+
+    def gerar(self, modelo, prompt, generation_config=None):
+        return self._modelo(modelo, generation_config).generate_content(prompt)
+
+    def gerar_stream(self, modelo, prompt, generation_config=None):
+        for chunk in self._modelo(modelo, generation_config).generate_content(prompt, stream=True):
+            try:
+                texto = chunk.text
+            except ValueError:
+                # Pedaço sem texto (ex: só metadados de segurança ou de fim da geração)
+                continue
+            if texto:
+                yield texto
+
+    def embed(self, modelo, conteudo, task_type):
+        return genai.embed_content(model=modelo, content=conteudo, task_type=task_type, client=self._client)
+
+
+class RespostaFake:
+    def __init__(self, text):
+        self.text = text
+
+
+class TransporteFake:
+    """
+    Backend local que não acessa a rede. `responder(prompt)` define o texto devolvido
+    (sem responder, sempre "{}") e `latencia` (segundos) simula o tempo de ida e volta da API.
+    """
+    DIMENSAO_EMBEDDING = 768
+
+    def __init__(self, api_key=None, responder=None, latencia=0.0):
+        self.responder = responder
+        self.latencia = latencia
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def _registrar_chamada(self):
+        with self._lock:
+            self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def gerar(self, modelo, prompt, generation_config=None):
+        self._registrar_chamada()
+        return RespostaFake(self.responder(prompt) if self.responder else "{}")
+
+    def gerar_stream(self, modelo, prompt, generation_config=None):
+        """Devolve o mesmo texto de gerar(), palavra a palavra; a latência vem antes do primeiro pedaço."""
+        texto = self.gerar(modelo, prompt, generation_config).text
+        yield from re.findall(r'\s*\S+\s*', texto)
+
+    def _vetor(self, texto):
+        semente = int.from_bytes(hashlib.sha256(texto.encode('utf-8')).digest()[:4], 'big')
+        return np.random.default_rng(semente).standard_normal(self.DIMENSAO_EMBEDDING).tolist()
+
+    def embed(self, modelo, conteudo, task_type):
+        self._registrar_chamada()
+        if isinstance(conteudo, str):
+            return {'embedding': self._vetor(conteudo)}
+        return {'embedding': [self._vetor(texto) for texto in conteudo]}
+
+
+class ClienteLLM:
+    """Cliente ligado a uma chave e a um modelo; expõe a mesma interface usada pelos agentes."""
+
+    def __init__(self, transporte, modelo, generation_config=None):
+        self.transporte = transporte
+        self.modelo = modelo
+        self.generation_config = generation_config
+
+    def generate_content(self, prompt):
+        return self.transporte.gerar(self.modelo, prompt, self.generation_config)
+
+    def generate_content_stream(self, prompt):
+        """Gera os pedaços de texto da resposta conforme o modelo os produz."""
+        gerar_stream = getattr(self.transporte, 'gerar_stream', None)
+        if gerar_stream is None:
+            # Transporte registrado sem streaming: a resposta inteira vira um único pedaço
+            yield self.generate_content(prompt).text
+            return
+        yield from gerar_stream(self.modelo, prompt, self.generation_config)
+
+    def embed_content(self, conteudo, task_type="RETRIEVAL_QUERY", modelo=MODELO_EMBEDDING):
+        return self.transporte.embed(modelo, conteudo, task_type)
+
+
+_FABRICAS_TRANSPORTE = {
+    'gemini': TransporteGemini,
+    'fake': TransporteFake,
+}
+MAX_TRANSPORTES = int(os.getenv("LLM_MAX_TRANSPORTES", "32"))
+MAX_CLIENTES = int(os.getenv("LLM_MAX_CLIENTES", "128"))
+# Registros LRU (sempre acessados sob _lock): uma chave de API por usuário não pode
+# manter canais abertos para sempre
+_transportes = OrderedDict()
+_clientes = OrderedDict()
+_lock = threading.Lock()
+
+
+def registrar_transporte(nome, fabrica):
+    """
+    Registra um novo backend. `fabrica(api_key)` deve retornar um objeto com gerar() e embed();
+    gerar_stream() é opcional.
+    """
+    with _lock:
+        _FABRICAS_TRANSPORTE[nome] = fabrica
+        _transportes.clear()
+        _clientes.clear()
+
+
+def limpar_registro():
+    """Descarta os clientes criados (ex: entre testes ou após trocar LLM_TRANSPORT)."""
+    with _lock:
+        _transportes.clear()
+        _clientes.clear()
+
+
+def _nome_transporte():
+    return os.getenv("LLM_TRANSPORT", "gemini")
+
+
+def _descartar_excedentes():
+    """Remove os itens menos usados além da capacidade. Chamar com _lock."""
+    while len(_transportes) > MAX_TRANSPORTES:
+        chave_transporte, _ = _transportes.popitem(last=False)
+        # Os clientes do transporte descartado também saem, para o canal ser liberado
+        for chave in [c for c in _clientes if c[:2] == chave_transporte]:
+            del _clientes[chave]
+    while len(_clientes) > MAX_CLIENTES:
+        _clientes.popitem(last=False)
+
+
+def obter_transporte(api_key):
+    nome = _nome_transporte()
+    chave = (nome, api_key)
+    with _lock:
+        transporte = _transportes.get(chave)
+        if transporte is None:
+            if nome not in _FABRICAS_TRANSPORTE:
+                raise ValueError(f"Transporte de LLM desconhecido: {nome}")
+            transporte = _FABRICAS_TRANSPORTE[nome](api_key)
+            _transportes[chave] = transporte
+            _descartar_excedentes()
+        else:
+            _transportes.move_to_end(chave)
+        return transporte
+
+
+def obter_cliente(api_key, modelo, generation_config=None):
+    """Retorna o cliente compartilhado do processo para (transporte, chave, modelo, config)."""
+    chave = (_nome_transporte(), api_key, modelo, json.dumps(generation_config, sort_keys=True))
+    with _lock:
+        cliente = _clientes.get(chave)
+        if cliente is not None:
+            _clientes.move_to_end(chave)
+            if chave[:2] in _transportes:
+                _transportes.move_to_end(chave[:2])
+            return cliente
+
+    cliente = ClienteLLM(obter_transporte(api_key), modelo, generation_config)
+    with _lock:
+        cliente = _clientes.setdefault(chave, cliente)
+        _descartar_excedentes()
+        return cliente
@@ -27,13 +27,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    'extrator.middleware.WhiteNoiseAssincronoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'extrator.middleware.InstrumentacaoConsultasMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -77,10 +78,41 @@ TIME_ZONE = 'America/Sao_Paulo'
 USE_I18N = True
 USE_TZ = True
 STATIC_URL = 'static/'
+
+# Armazenamento local (endereçado por hash) dos PDFs enviados, lido pelo worker do Celery
+BLOB_STORAGE_DIR = os.getenv('BLOB_STORAGE_DIR', str(BASE_DIR / 'media' / 'blobs'))
+# Também grava os PDFs no banco, para workers em outra máquina (sem o disco do servidor web)
+BLOB_STORAGE_BANCO = os.getenv('BLOB_STORAGE_BANCO', '0') == '1'
+# Tempo que uma extração concluída fica disponível para confirmação do lançamento
+EXTRACAO_PENDENTE_TTL_HORAS = int(os.getenv('EXTRACAO_PENDENTE_TTL_HORAS', '24'))
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Instrumentação das consultas dos repositórios (extrator/instrumentacao.py)
+CONSULTA_LENTA_MS = float(os.getenv('CONSULTA_LENTA_MS', '200'))
+CONSULTAS_POR_REQUISICAO_ALERTA = int(os.getenv('CONSULTAS_POR_REQUISICAO_ALERTA', '50'))
+CONSULTA_REPETIDA_ALERTA = int(os.getenv('CONSULTA_REPETIDA_ALERTA', '5'))
+# Desligue atrás de um pgbouncer em modo transaction, que não mantém prepared statements
+REPOSITORIO_PREPARED_STATEMENTS = os.getenv('REPOSITORIO_PREPARED_STATEMENTS', '1') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'extrator.consultas': {'handlers': ['console'], 'level': os.getenv('CONSULTAS_LOG_LEVEL', 'WARNING')},
+    },
+}
+
 CELERY_BROKER_URL = 'redis://redis:6379/0'
 CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
\ No newline at end of file
+CELERY_RESULT_SERIALIZER = 'json'
+
+# Leitura de PDF (CPU) e chamadas ao LLM (rede) em filas separadas, escaladas de forma independente.
+# O chat de RAG tem fila própria: perguntas não esperam atrás de um lote de PDFs
+CELERY_TASK_ROUTES = {
+    'extrator.tasks.parsear_pdf_task': {'queue': 'pdf'},
+    'extrator.tasks.processar_pdf_task': {'queue': 'llm'},
+    'extrator.tasks.consultar_rag_task': {'queue': 'rag'},
+}
\ No newline at end of file
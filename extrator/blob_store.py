@@ -0,0 +1,148 @@
+"""
+Armazenamento dos PDFs enviados, endereçado pelo SHA-256 do conteúdo.
+
+Os arquivos ficam no disco local (BLOB_STORAGE_DIR), lidos pelo worker via mmap. Quando
+o web e os workers não compartilham o disco (serviços separados, como no render.yaml),
+BLOB_STORAGE_BANCO também grava cada PDF na tabela "BlobPdf"; o worker baixa o arquivo
+para o seu disco na primeira leitura e daí em diante usa a cópia local.
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .repositories.blob_repository import BlobRepository
+
+TAMANHO_CHUNK = 1024 * 1024
+
+
+def _diretorio_base():
+    return Path(settings.BLOB_STORAGE_DIR)
+
+
+def caminho_blob(referencia):
+    """Caminho do blob no disco. Usa os 2 primeiros caracteres do hash como subpasta."""
+    if len(referencia) != 64 or any(c not in '0123456789abcdef' for c in referencia):
+        raise ValueError(f"Referência de blob inválida: {referencia}")
+    return _diretorio_base() / referencia[:2] / f"{referencia}.pdf"
+
+
+def salvar_blob(arquivo):
+    """
+    Grava o upload uma única vez no armazenamento endereçado por conteúdo.
+    Aceita bytes, um arquivo do Django (UploadedFile) ou qualquer objeto com read()
+    (ex: entrada de um ZIP) e retorna a referência (SHA-256).
+    Se o mesmo conteúdo já existir, nada é regravado.
+    """
+    diretorio = _diretorio_base()
+    diretorio.mkdir(parents=True, exist_ok=True)
+    sha = hashlib.sha256()
+
+    # Escreve em um arquivo temporário no mesmo volume para permitir o rename atômico
+    fd, caminho_tmp = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            if isinstance(arquivo, (bytes, bytearray, memoryview)):
+                sha.update(arquivo)
+                destino.write(arquivo)
+            else:
+                chunks = arquivo.chunks() if hasattr(arquivo, 'chunks') else iter(lambda: arquivo.read(TAMANHO_CHUNK), b'')
+                for chunk in chunks:
+                    sha.update(chunk)
+                    destino.write(chunk)
+
+        referencia = sha.hexdigest()
+        caminho = caminho_blob(referencia)
+        if caminho.exists():
+            os.remove(caminho_tmp)
+            os.utime(caminho)
+        else:
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(caminho_tmp, caminho)
+
+        if settings.BLOB_STORAGE_BANCO:
+            repo = BlobRepository()
+            if not repo.exists(referencia):
+                repo.save(referencia, caminho.read_bytes())
+        return referencia
+    except Exception:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+        raise
+
+
+def garantir_local(referencia):
+    """
+    Caminho do blob no disco local. Se ele não estiver aqui e BLOB_STORAGE_BANCO estiver
+    ativo, baixa do banco (gravação atômica, como em salvar_blob).
+    """
+    caminho = caminho_blob(referencia)
+    if caminho.exists() or not settings.BLOB_STORAGE_BANCO:
+        return caminho
+
+    conteudo = BlobRepository().find(referencia)
+    if conteudo is None:
+        return caminho
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=caminho.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            destino.write(conteudo)
+        os.replace(caminho_tmp, caminho)
+    except Exception:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+        raise
+    return caminho
+
+
+@contextmanager
+def abrir_blob(referencia):
+    """
+    Abre o blob mapeado em memória (mmap), sem copiar o conteúdo para o processo.
+    O memoryview retornado pode ser passado direto para fitz.open(stream=...).
+    Quem usar deve fechar o documento fitz antes de sair do bloco.
+    """
+    caminho = garantir_local(referencia)
+    if not caminho.exists():
+        raise FileNotFoundError(f"Blob não encontrado: {referencia}")
+
+    with open(caminho, 'rb') as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        visao = memoryview(mapa)
+        try:
+            yield visao
+        finally:
+            visao.release()
+            mapa.close()
+
+
+def remover_blobs_antigos(max_idade_horas=24):
+    """
+    Remove blobs não acessados há mais de `max_idade_horas` (no banco, criados há mais
+    que isso). Retorna quantos foram apagados.
+    """
+    removidos = 0
+    if settings.BLOB_STORAGE_BANCO:
+        removidos += BlobRepository().delete_older_than(timezone.now() - timedelta(hours=max_idade_horas))
+
+    diretorio = _diretorio_base()
+    if not diretorio.exists():
+        return removidos
+
+    limite = time.time() - max_idade_horas * 3600
+    for caminho in diretorio.glob('*/*.pdf'):
+        try:
+            if caminho.stat().st_mtime < limite:
+                caminho.unlink()
+                removidos += 1
+        except FileNotFoundError:
+            continue
+    return removidos
@@ -0,0 +1,124 @@
+"""
+Eventos de progresso das tarefas do Celery via Server-Sent Events.
+
+O backend Redis do Celery publica cada update_state no canal 'celery-task-meta-<id>'.
+Em vez de o navegador consultar task_status_view a cada poucos segundos, a view de
+eventos assina esses canais e repassa as mudanças assim que acontecem.
+Precisa ser servida por ASGI (core/asgi.py); em WSGI o stream seria bufferizado.
+
+stream_resposta_tarefa acompanha uma tarefa do chat de RAG da mesma forma, mas repassa
+só o texto novo da resposta parcial, um evento 'token' por atualização.
+"""
+import json
+import time
+
+import redis.asyncio as redis_async
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
+from django.conf import settings
+
+from core.celery import app as celery_app
+
+ESTADOS_FINAIS = ('SUCCESS', 'FAILURE', 'REVOKED')
+INTERVALO_HEARTBEAT = 15
+DURACAO_MAXIMA = 15 * 60
+
+
+def _evento(task_id, state, info):
+    """Mesmo formato de task_status_view, sem o resultado completo."""
+    dados = {'task_id': task_id, 'state': state, 'status': '', 'error_message': None, 'timings': None}
+    info = info if isinstance(info, dict) else {}
+
+    if state == 'PENDING':
+        dados['status'] = 'A tarefa está na fila para ser processada...'
+    elif state == 'PROGRESS':
+        dados['status'] = info.get('status', 'Processando...')
+        dados['timings'] = info.get('timings')
+        dados['resposta'] = info.get('resposta')
+    elif state == 'SUCCESS':
+        dados['timings'] = info.get('timings')
+        dados['resposta'] = info.get('resposta')
+    elif state == 'FAILURE':
+        dados['status'] = 'Ocorreu um erro no processamento.'
+        dados['error_message'] = info.get('exc_message', 'Erro desconhecido.')
+    return dados
+
+
+def formatar_sse(dados, evento='state'):
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+def _estado_atual(task_id):
+    task_result = AsyncResult(task_id)
+    info = task_result.info
+    if isinstance(info, Exception):
+        info = {'exc_message': str(info)}
+    return _evento(task_id, task_result.state, info)
+
+
+async def _estados_tarefas(task_ids):
+    """
+    Estado de cada tarefa (no formato de _evento) a cada mudança, até todas terminarem.
+    Gera None a cada INTERVALO_HEARTBEAT sem novidades.
+    """
+    canais = {celery_app.backend.get_key_for_task(task_id).decode(): task_id for task_id in task_ids}
+    pendentes = set(task_ids)
+
+    cliente = redis_async.from_url(settings.CELERY_RESULT_BACKEND)
+    pubsub = cliente.pubsub()
+    try:
+        # Assina antes de ler o estado atual, para não perder uma atualização no intervalo
+        await pubsub.subscribe(*canais)
+
+        for task_id in task_ids:
+            dados = await sync_to_async(_estado_atual)(task_id)
+            yield dados
+            if dados['state'] in ESTADOS_FINAIS:
+                pendentes.discard(task_id)
+
+        inicio = time.monotonic()
+        while pendentes and time.monotonic() - inicio < DURACAO_MAXIMA:
+            mensagem = await pubsub.get_message(ignore_subscribe_messages=True, timeout=INTERVALO_HEARTBEAT)
+            if mensagem is None:
+                yield None
+                continue
+
+            canal = mensagem['channel'].decode() if isinstance(mensagem['channel'], bytes) else mensagem['channel']
+            task_id = canais.get(canal)
+            if task_id is None:
+                continue
+
+            meta = json.loads(mensagem['data'])
+            dados = _evento(task_id, meta.get('status'), meta.get('result'))
+            yield dados
+            if dados['state'] in ESTADOS_FINAIS:
+                pendentes.discard(task_id)
+    finally:
+        await pubsub.aclose()
+        await cliente.aclose()
+
+
+async def stream_eventos_tarefas(task_ids):
+    """Gera eventos SSE para cada mudança de estado das tarefas até todas terminarem."""
+    async for dados in _estados_tarefas(task_ids):
+        yield ": heartbeat\n\n" if dados is None else formatar_sse(dados)
+    yield formatar_sse({}, 'end')
+
+
+async def stream_resposta_tarefa(task_id):
+    """
+    Eventos SSE 'token' com o trecho da resposta que ainda não foi enviado, a cada
+    atualização da tarefa (consultar_rag_task); 'erro' se ela falhar e, no fim, 'end'.
+    """
+    enviada = ''
+    async for dados in _estados_tarefas([task_id]):
+        if dados is None:
+            yield ": heartbeat\n\n"
+            continue
+        resposta = dados.get('resposta') or ''
+        if len(resposta) > len(enviada) and resposta.startswith(enviada):
+            yield formatar_sse({'texto': resposta[len(enviada):]}, 'token')
+            enviada = resposta
+        if dados['state'] == 'FAILURE':
+            yield formatar_sse({'error': dados['error_message']}, 'erro')
+    yield formatar_sse({}, 'end')
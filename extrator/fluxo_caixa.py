@@ -0,0 +1,134 @@
+"""
+Aging das parcelas em aberto e projeção do fluxo de caixa.
+
+O banco devolve o saldo pendente já agregado por (tipo, data de vencimento) numa única
+consulta; as faixas de aging e os períodos da projeção são calculados sobre esses arrays
+com NumPy (digitize/bincount), sem laço em Python por parcela.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+from .repositories.fluxo_caixa_repository import FluxoCaixaRepository
+
+# (rótulo, menor e maior número de dias até o vencimento); negativo = vencido
+FAIXAS_AGING = (
+    ('Vencido há mais de 90 dias', None, -91),
+    ('Vencido de 61 a 90 dias', -90, -61),
+    ('Vencido de 31 a 60 dias', -60, -31),
+    ('Vencido de 1 a 30 dias', -30, -1),
+    ('A vencer em 0 a 30 dias', 0, 30),
+    ('A vencer em 31 a 60 dias', 31, 60),
+    ('A vencer em 61 a 90 dias', 61, 90),
+    ('A vencer em mais de 90 dias', 91, None),
+)
+# Limites inferiores das faixas (exceto a primeira), no formato de np.digitize
+LIMITES_AGING = np.array([inicio for _, inicio, _ in FAIXAS_AGING[1:]])
+
+GRANULARIDADES = ('dia', 'semana')
+HORIZONTE_PADRAO = 90
+HORIZONTE_MAXIMO = 730
+
+
+@dataclass
+class SaldosPendentes:
+    """Colunas do resultado de FluxoCaixaRepository.saldos_pendentes_por_vencimento."""
+    pagar: np.ndarray
+    vencimentos: np.ndarray
+    valores: np.ndarray
+    quantidades: np.ndarray
+
+    @classmethod
+    def carregar(cls, repo=None):
+        linhas = (repo or FluxoCaixaRepository()).saldos_pendentes_por_vencimento()
+        if not linhas:
+            return cls(np.zeros(0, dtype=bool), np.zeros(0, dtype='datetime64[D]'), np.zeros(0), np.zeros(0, dtype=np.int64))
+        tipos, vencimentos, valores, quantidades = zip(*linhas)
+        return cls(
+            pagar=np.array(tipos) == 'PAGAR',
+            # O SQLite pode devolver a data como texto ISO; datetime64 aceita os dois
+            vencimentos=np.array([str(v) for v in vencimentos], dtype='datetime64[D]'),
+            valores=np.array(valores, dtype=float),
+            quantidades=np.array(quantidades, dtype=np.int64),
+        )
+
+
+def _somar_por(indices, tamanho, pesos, mascara):
+    return np.bincount(indices[mascara], weights=pesos[mascara], minlength=tamanho)
+
+
+def calcular_aging(saldos, data_base):
+    """Saldo e quantidade de parcelas a pagar e a receber em cada faixa de FAIXAS_AGING."""
+    dias = (saldos.vencimentos - np.datetime64(data_base, 'D')).astype(np.int64)
+    faixas = np.digitize(dias, LIMITES_AGING)
+    tamanho = len(FAIXAS_AGING)
+
+    a_pagar = _somar_por(faixas, tamanho, saldos.valores, saldos.pagar)
+    a_receber = _somar_por(faixas, tamanho, saldos.valores, ~saldos.pagar)
+    qtd_pagar = _somar_por(faixas, tamanho, saldos.quantidades, saldos.pagar)
+    qtd_receber = _somar_por(faixas, tamanho, saldos.quantidades, ~saldos.pagar)
+
+    return [
+        {
+            'faixa': rotulo, 'dias_de': inicio, 'dias_ate': fim,
+            'pagar': round(float(a_pagar[i]), 2), 'parcelas_pagar': int(qtd_pagar[i]),
+            'receber': round(float(a_receber[i]), 2), 'parcelas_receber': int(qtd_receber[i]),
+        }
+        for i, (rotulo, inicio, fim) in enumerate(FAIXAS_AGING)
+    ]
+
+
+def projetar_fluxo(saldos, data_base, dias=HORIZONTE_PADRAO, granularidade='dia'):
+    """
+    Entradas (a receber) e saídas (a pagar) previstas por dia ou semana, de `data_base` até
+    `dias` depois, com o saldo do período e o acumulado. Parcelas já vencidas não entram nos
+    períodos; ficam em `atrasado`, porque não há data prevista para o pagamento.
+    """
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida: {granularidade}")
+    inicio = np.datetime64(data_base, 'D')
+    fim = inicio + dias
+    passo = 1 if granularidade == 'dia' else 7
+    if granularidade == 'semana':
+        # Semanas começando na segunda-feira (1970-01-01 foi uma quinta)
+        inicio = inicio - (inicio.astype(np.int64) + 3) % 7
+
+    no_horizonte = (saldos.vencimentos >= np.datetime64(data_base, 'D')) & (saldos.vencimentos <= fim)
+    periodos = (saldos.vencimentos - inicio).astype(np.int64) // passo
+    tamanho = int((fim - inicio).astype(np.int64) // passo) + 1
+
+    saidas = _somar_por(periodos, tamanho, saldos.valores, no_horizonte & saldos.pagar)
+    entradas = _somar_por(periodos, tamanho, saldos.valores, no_horizonte & ~saldos.pagar)
+    acumulado = np.cumsum(entradas - saidas)
+
+    vencidos = saldos.vencimentos < np.datetime64(data_base, 'D')
+    inicio_data = inicio.astype(date)
+    return {
+        'atrasado': {
+            'entradas': round(float(saldos.valores[vencidos & ~saldos.pagar].sum()), 2),
+            'saidas': round(float(saldos.valores[vencidos & saldos.pagar].sum()), 2),
+        },
+        'periodos': [
+            {
+                'inicio': (inicio_data + timedelta(days=i * passo)).isoformat(),
+                'entradas': round(float(entradas[i]), 2),
+                'saidas': round(float(saidas[i]), 2),
+                'saldo': round(float(entradas[i] - saidas[i]), 2),
+                'acumulado': round(float(acumulado[i]), 2),
+            }
+            for i in range(tamanho)
+        ],
+    }
+
+
+def relatorio_fluxo_caixa(data_base=None, dias=HORIZONTE_PADRAO, granularidade='dia', repo=None):
+    data_base = data_base or date.today()
+    saldos = SaldosPendentes.carregar(repo)
+    return {
+        'data_base': data_base.isoformat(),
+        'granularidade': granularidade,
+        'dias': dias,
+        'aging': calcular_aging(saldos, data_base),
+        'fluxo': projetar_fluxo(saldos, data_base, dias, granularidade),
+    }
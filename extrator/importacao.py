@@ -0,0 +1,249 @@
+"""
+Importação em massa de movimentos históricos (contas a pagar/receber) a partir de CSV ou JSON Lines.
+
+O arquivo é lido em streaming e carregado em lotes. Cada lote resolve Pessoas (por
+documento) e Classificações (por descrição) em mapas em memória, cria as que faltam
+e carrega MovimentoContas, ParcelasContas e os vínculos de classificação com COPY
+(PostgreSQL) ou INSERT multi-linha. Cada lote é uma transação, junto com o checkpoint:
+uma importação interrompida recomeça do primeiro lote não confirmado.
+
+Formatos aceitos:
+  - JSON Lines: um movimento por linha, com as parcelas aninhadas
+        {"tipo": "PAGAR", "numeronotafiscal": "123", "dataemissao": "2021-03-10", "descricao": "...",
+         "fornecedor_cliente": {"documento": "...", "razaosocial": "..."},
+         "faturado": {"documento": "...", "razaosocial": "..."},
+         "classificacoes": ["Manutenção"],
+         "parcelas": [{"identificacao": "1/2", "datavencimento": "2021-04-10", "valorparcela": 150.0, "valorpago": 0}]}
+  - CSV: uma parcela por linha; linhas consecutivas com o mesmo tipo, nota e documento
+    formam um movimento. Colunas: tipo, numeronotafiscal, dataemissao, descricao,
+    documento_fornecedor_cliente, razaosocial_fornecedor_cliente, documento_faturado,
+    razaosocial_faturado, classificacoes (separadas por '|'), identificacao,
+    datavencimento, valorparcela, valorpago.
+"""
+import csv
+import hashlib
+import itertools
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .repositories.importacao_repository import ImportacaoRepository
+
+TAMANHO_LOTE_PADRAO = 5000
+TIPO_PESSOA_POR_MOVIMENTO = {'PAGAR': 'FORNECEDOR', 'RECEBER': 'CLIENTE'}
+TIPO_CLASSIFICACAO_POR_MOVIMENTO = {'PAGAR': 'DESPESA', 'RECEBER': 'RECEITA'}
+
+
+class ErroImportacao(Exception):
+    pass
+
+
+def hash_arquivo(caminho):
+    """Identifica o arquivo pelo conteúdo: renomear não perde o checkpoint, alterar sim."""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _data(valor):
+    valor = str(valor).strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ErroImportacao(f"Data inválida: {valor!r}")
+
+
+def _valor(valor):
+    if valor in (None, ''):
+        return Decimal('0')
+    texto = str(valor).strip()
+    if ',' in texto:
+        # Formato brasileiro: 1.234,56
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(texto).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ErroImportacao(f"Valor inválido: {valor!r}")
+
+
+def _normalizar(bruto, posicao):
+    """Valida e converte um movimento lido do arquivo; `posicao` é usada nas mensagens de erro."""
+    try:
+        tipo = str(bruto['tipo']).strip().upper()
+        if tipo not in TIPO_PESSOA_POR_MOVIMENTO:
+            raise ErroImportacao(f"Tipo inválido: {tipo!r}")
+
+        contraparte = bruto['fornecedor_cliente']
+        faturado = bruto.get('faturado') or contraparte
+        if not contraparte.get('documento'):
+            raise ErroImportacao("Documento do fornecedor/cliente ausente")
+
+        parcelas = []
+        for parcela in bruto['parcelas']:
+            valor_parcela = _valor(parcela['valorparcela'])
+            valor_pago = _valor(parcela.get('valorpago'))
+            saldo = valor_parcela - valor_pago
+            parcelas.append({
+                'identificacao': parcela.get('identificacao') or f"{len(parcelas) + 1}/{len(bruto['parcelas'])}",
+                'datavencimento': _data(parcela['datavencimento']),
+                'valorparcela': valor_parcela,
+                'valorpago': valor_pago,
+                'valorsaldo': saldo,
+                'statusparcela': parcela.get('statusparcela') or ('PAGO' if saldo <= 0 else 'PENDENTE'),
+            })
+        if not parcelas:
+            raise ErroImportacao("Movimento sem parcelas")
+
+        return {
+            'tipo': tipo,
+            'numeronotafiscal': str(bruto['numeronotafiscal']).strip(),
+            'dataemissao': _data(bruto['dataemissao']),
+            'descricao': (bruto.get('descricao') or '')[:300] or None,
+            'status': bruto.get('status') or ('PAGO' if all(p['statusparcela'] == 'PAGO' for p in parcelas) else 'PENDENTE'),
+            'fornecedor_cliente': {'documento': str(contraparte['documento']).strip(),
+                                   'razaosocial': contraparte.get('razaosocial') or contraparte['documento']},
+            'faturado': {'documento': str(faturado['documento']).strip(),
+                         'razaosocial': faturado.get('razaosocial') or faturado['documento']},
+            'classificacoes': [c.strip() for c in bruto.get('classificacoes') or [] if c and c.strip()],
+            'parcelas': parcelas,
+        }
+    except ErroImportacao as e:
+        raise ErroImportacao(f"Registro {posicao}: {e}")
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ErroImportacao(f"Registro {posicao}: campo ausente ou inválido ({e})")
+
+
+def _ler_jsonl(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        for numero, linha in enumerate(arquivo, start=1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError as e:
+                raise ErroImportacao(f"Linha {numero}: JSON inválido ({e})")
+            yield registro
+
+
+def _ler_csv(caminho, delimitador):
+    with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+        linhas = csv.DictReader(arquivo, delimiter=delimitador)
+        chave = lambda l: (l['tipo'], l['numeronotafiscal'], l['documento_fornecedor_cliente'])
+        for _, grupo in itertools.groupby(linhas, key=chave):
+            grupo = list(grupo)
+            primeira = grupo[0]
+            yield {
+                'tipo': primeira['tipo'],
+                'numeronotafiscal': primeira['numeronotafiscal'],
+                'dataemissao': primeira['dataemissao'],
+                'descricao': primeira.get('descricao'),
+                'fornecedor_cliente': {'documento': primeira['documento_fornecedor_cliente'],
+                                       'razaosocial': primeira.get('razaosocial_fornecedor_cliente')},
+                'faturado': {'documento': primeira.get('documento_faturado'),
+                             'razaosocial': primeira.get('razaosocial_faturado')} if primeira.get('documento_faturado') else None,
+                'classificacoes': (primeira.get('classificacoes') or '').split('|'),
+                'parcelas': [{'identificacao': l.get('identificacao'), 'datavencimento': l['datavencimento'],
+                              'valorparcela': l['valorparcela'], 'valorpago': l.get('valorpago')} for l in grupo],
+            }
+
+
+def ler_registros(caminho, formato=None, delimitador=','):
+    """Gera os movimentos do arquivo, um a um. O formato é deduzido da extensão se omitido."""
+    formato = formato or ('csv' if str(caminho).lower().endswith('.csv') else 'jsonl')
+    if formato == 'csv':
+        return _ler_csv(caminho, delimitador)
+    if formato == 'jsonl':
+        return _ler_jsonl(caminho)
+    raise ErroImportacao(f"Formato não suportado: {formato}")
+
+
+def em_lotes(iteravel, tamanho):
+    iterador = iter(iteravel)
+    while lote := list(itertools.islice(iterador, tamanho)):
+        yield lote
+
+
+class ImportadorMovimentos:
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE_PADRAO, repo=None):
+        self.tamanho_lote = tamanho_lote
+        self.repo = repo or ImportacaoRepository()
+        self.pessoas = None
+        self.classificacoes = None
+
+    def importar(self, caminho, formato=None, delimitador=',', recomecar=False, ao_confirmar_lote=None):
+        """
+        Importa o arquivo a partir do último checkpoint. `ao_confirmar_lote(total)` é
+        chamado após cada commit. Retorna (registros_importados, registros_pulados).
+        """
+        chave = hash_arquivo(caminho)
+        if recomecar:
+            self.repo.apagar_checkpoint(chave)
+
+        ja_importados, concluido = self.repo.ler_checkpoint(chave)
+        if concluido:
+            return 0, ja_importados
+
+        self.pessoas = self.repo.mapa_pessoas()
+        self.classificacoes = self.repo.mapa_classificacoes()
+
+        registros = itertools.islice(ler_registros(caminho, formato, delimitador), ja_importados, None)
+        total = ja_importados
+        for lote in em_lotes(registros, self.tamanho_lote):
+            normalizados = [_normalizar(bruto, total + i + 1) for i, bruto in enumerate(lote)]
+            with transaction.atomic():
+                self._carregar_lote(normalizados)
+                total += len(lote)
+                self.repo.salvar_checkpoint(chave, str(caminho), total)
+            if ao_confirmar_lote:
+                ao_confirmar_lote(total)
+
+        self.repo.salvar_checkpoint(chave, str(caminho), total, concluido=True)
+        return total - ja_importados, ja_importados
+
+    def _resolver_cadastros(self, registros):
+        novas_pessoas = {}
+        novas_classificacoes = {}
+        for registro in registros:
+            papeis = ((registro['fornecedor_cliente'], TIPO_PESSOA_POR_MOVIMENTO[registro['tipo']]),
+                      (registro['faturado'], 'FATURADO'))
+            for pessoa, tipo in papeis:
+                if pessoa['documento'] not in self.pessoas:
+                    novas_pessoas.setdefault(pessoa['documento'], (tipo, pessoa['razaosocial'][:150], pessoa['documento']))
+            for descricao in registro['classificacoes']:
+                if descricao not in self.classificacoes:
+                    novas_classificacoes.setdefault(descricao, (TIPO_CLASSIFICACAO_POR_MOVIMENTO[registro['tipo']], descricao))
+
+        self.pessoas.update(self.repo.inserir_pessoas(list(novas_pessoas.values())))
+        self.classificacoes.update(self.repo.inserir_classificacoes(list(novas_classificacoes.values())))
+
+    def _carregar_lote(self, registros):
+        self._resolver_cadastros(registros)
+        ids = self.repo.reservar_ids_movimento(len(registros))
+
+        movimentos, parcelas, vinculos = [], [], []
+        for movimento_id, registro in zip(ids, registros):
+            movimentos.append((
+                movimento_id, registro['tipo'], registro['numeronotafiscal'], registro['dataemissao'],
+                registro['descricao'], sum(p['valorparcela'] for p in registro['parcelas']), registro['status'],
+                self.pessoas[registro['fornecedor_cliente']['documento']], self.pessoas[registro['faturado']['documento']],
+            ))
+            for p in registro['parcelas']:
+                parcelas.append((p['identificacao'], p['datavencimento'], p['valorparcela'], p['valorpago'],
+                                 p['valorsaldo'], p['statusparcela'], movimento_id))
+            for class_id in dict.fromkeys(self.classificacoes[d] for d in registro['classificacoes']):
+                vinculos.append((movimento_id, class_id))
+
+        self.repo.copiar('MovimentoContas', ['id', 'tipo', 'numeronotafiscal', 'dataemissao', 'descricao', 'valortotal',
+                                             'status', 'Pessoas_idFornecedorCliente', 'Pessoas_idFaturado'], movimentos)
+        self.repo.copiar('ParcelasContas', ['identificacao', 'datavencimento', 'valorparcela', 'valorpago', 'valorsaldo',
+                                            'statusparcela', 'MovimentoContas_idMovimentoContas'], parcelas)
+        self.repo.copiar('MovimentoContas_has_Classificacao',
+                         ['MovimentoContas_idMovimentoContas', 'Classificacao_idClassificacao'], vinculos)
+        self.repo.marcar_dados_alterados()
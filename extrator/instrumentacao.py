@@ -0,0 +1,88 @@
+"""
+Contagem e tempo das consultas dos repositórios por requisição ou tarefa do Celery.
+
+BaseRepository registra cada execução na coleta ativa (uma ContextVar, iniciada pelo
+InstrumentacaoConsultasMiddleware e pelos sinais task_prerun/task_postrun). Consultas
+acima de CONSULTA_LENTA_MS vão para o log 'extrator.consultas'; no fim da coleta, o
+resumo aponta a mesma consulta executada muitas vezes, o sinal típico de um N+1.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+logger = logging.getLogger('extrator.consultas')
+
+_coleta_atual = contextvars.ContextVar('coleta_consultas', default=None)
+
+
+def _texto(query):
+    return ' '.join(query.split())
+
+
+@dataclass
+class EstatisticasConsultas:
+    quantidade: int = 0
+    tempo_ms: float = 0.0
+    lentas: int = 0
+    por_consulta: Counter = field(default_factory=Counter)
+    # A validação no banco roda numa thread do ThreadPoolExecutor, com a mesma coleta
+    _trava: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def registrar(self, query, duracao_ms, lenta):
+        with self._trava:
+            self.quantidade += 1
+            self.tempo_ms += duracao_ms
+            self.lentas += lenta
+            self.por_consulta[_texto(query)] += 1
+
+    def repetidas(self, minimo):
+        return [(query, vezes) for query, vezes in self.por_consulta.most_common() if vezes >= minimo]
+
+
+def iniciar_coleta():
+    """Começa uma coleta no contexto atual; devolve o token para encerrar_coleta."""
+    return _coleta_atual.set(EstatisticasConsultas())
+
+
+def encerrar_coleta(token, origem):
+    estatisticas = _coleta_atual.get()
+    _coleta_atual.reset(token)
+    if estatisticas is not None:
+        registrar_resumo(origem, estatisticas)
+    return estatisticas
+
+
+def coleta_atual():
+    return _coleta_atual.get()
+
+
+@contextmanager
+def medir_consulta(query):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        lenta = duracao_ms >= settings.CONSULTA_LENTA_MS
+        if lenta:
+            logger.warning('Consulta lenta (%.1f ms): %s', duracao_ms, _texto(query)[:500])
+        estatisticas = _coleta_atual.get()
+        if estatisticas is not None:
+            estatisticas.registrar(query, duracao_ms, lenta)
+
+
+def registrar_resumo(origem, estatisticas):
+    repetidas = estatisticas.repetidas(settings.CONSULTA_REPETIDA_ALERTA)
+    resumo = f'{origem}: {estatisticas.quantidade} consulta(s) em {estatisticas.tempo_ms:.1f} ms'
+    if estatisticas.quantidade < settings.CONSULTAS_POR_REQUISICAO_ALERTA and not repetidas:
+        logger.debug(resumo)
+        return
+    logger.warning(resumo)
+    for query, vezes in repetidas:
+        logger.warning('  executada %dx (possível N+1): %s', vezes, query[:300])
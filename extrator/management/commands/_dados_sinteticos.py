@@ -0,0 +1,74 @@
+"""
+Geração de massa de dados sintética para os comandos de benchmark e verificação de planos.
+Os dados são carregados pelos caminhos da importação em massa e devem ser gerados dentro
+de uma transação que o comando desfaz no final.
+"""
+import random
+from datetime import date, timedelta
+
+from extrator.repositories.importacao_repository import ImportacaoRepository
+
+SILABAS = ['agro', 'ban', 'cam', 'dis', 'fer', 'gra', 'lar', 'mon', 'nor', 'pan', 'ria', 'sul', 'tec', 'val', 'ver', 'zon']
+SUFIXOS = ['LTDA', 'S.A.', 'ME', 'EIRELI', 'COMERCIO', 'INDUSTRIA', 'TRANSPORTES', 'AGRICOLA']
+LOTE_GERACAO = 50000
+
+
+class GeradorDadosSinteticos:
+
+    def __init__(self, seed=42, proporcao_pendentes=0.05):
+        self.aleatorio = random.Random(seed)
+        self.proporcao_pendentes = proporcao_pendentes
+        self.repo = ImportacaoRepository()
+        self.pessoa_ids = []
+        self.classificacao_ids = []
+
+    def nome(self):
+        partes = [self.aleatorio.choice(SILABAS) + self.aleatorio.choice(SILABAS) for _ in range(2)]
+        return f"{' '.join(partes).upper()} {self.aleatorio.choice(SUFIXOS)}"
+
+    def _status(self):
+        # Base histórica: a maior parte já foi paga/recebida
+        return 'PENDENTE' if self.aleatorio.random() < self.proporcao_pendentes else 'PAGO'
+
+    def gerar_pessoas(self, quantidade):
+        pessoas = [('FORNECEDOR', self.nome(), f'BENCH{i:09d}') for i in range(max(quantidade, 10))]
+        for inicio in range(0, len(pessoas), LOTE_GERACAO):
+            self.repo.inserir_pessoas(pessoas[inicio:inicio + LOTE_GERACAO])
+        self.pessoa_ids = [linha[0] for linha in self.repo._execute_query(
+            """SELECT id FROM "Pessoas" WHERE documento LIKE 'BENCH%%'""", fetch="all")]
+
+    def gerar_classificacoes(self, quantidade=20):
+        classificacoes = [('DESPESA', f'BENCH CLASSIFICACAO {i}') for i in range(quantidade)]
+        self.classificacao_ids = list(self.repo.inserir_classificacoes(classificacoes).values())
+
+    def gerar_movimentos(self, quantidade, parcelas_por_movimento=0):
+        """Movimentos (e, opcionalmente, parcelas e um vínculo de classificação por movimento)."""
+        base = date(2018, 1, 1)
+        colunas = ['id', 'tipo', 'numeronotafiscal', 'dataemissao', 'descricao', 'valortotal', 'status',
+                   'Pessoas_idFornecedorCliente', 'Pessoas_idFaturado']
+        while quantidade > 0:
+            lote = min(quantidade, LOTE_GERACAO)
+            ids = self.repo.reservar_ids_movimento(lote)
+            movimentos, parcelas, vinculos = [], [], []
+            for movimento_id in ids:
+                emissao = base + timedelta(days=self.aleatorio.randint(0, 2500))
+                status = self._status()
+                valor = round(self.aleatorio.uniform(50, 50000), 2)
+                movimentos.append((
+                    movimento_id, self.aleatorio.choice(['PAGAR', 'RECEBER']), str(self.aleatorio.randint(1, 999999)),
+                    emissao, 'benchmark', valor, status,
+                    self.aleatorio.choice(self.pessoa_ids), self.aleatorio.choice(self.pessoa_ids),
+                ))
+                for i in range(parcelas_por_movimento):
+                    pago = 0 if status == 'PENDENTE' else valor
+                    parcelas.append((f'{i + 1}/{parcelas_por_movimento}', emissao + timedelta(days=30 * (i + 1)),
+                                     valor, pago, valor - pago, status, movimento_id))
+                if self.classificacao_ids:
+                    vinculos.append((movimento_id, self.aleatorio.choice(self.classificacao_ids)))
+
+            self.repo.copiar('MovimentoContas', colunas, movimentos)
+            self.repo.copiar('ParcelasContas', ['identificacao', 'datavencimento', 'valorparcela', 'valorpago',
+                                                'valorsaldo', 'statusparcela', 'MovimentoContas_idMovimentoContas'], parcelas)
+            self.repo.copiar('MovimentoContas_has_Classificacao',
+                             ['MovimentoContas_idMovimentoContas', 'Classificacao_idClassificacao'], vinculos)
+            quantidade -= lote
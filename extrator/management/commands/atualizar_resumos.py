@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from extrator.repositories.resumo_financeiro_repository import ResumoFinanceiroRepository
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as views materializadas de resumo financeiro consultadas pelos agentes de RAG'
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        if ResumoFinanceiroRepository().atualizar():
+            decorrido = time.perf_counter() - inicio
+            self.stdout.write(self.style.SUCCESS(f'Resumos financeiros atualizados em {decorrido:.1f} s.'))
+        else:
+            self.stdout.write('Banco não é PostgreSQL: os resumos são views comuns e já estão sempre atualizados.')
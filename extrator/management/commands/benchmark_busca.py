@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from extrator.repositories.movimento_repository import MovimentoRepository
+from extrator.repositories.pessoa_repository import PessoaRepository
+from ._dados_sinteticos import GeradorDadosSinteticos, SILABAS
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mede a latência da busca por trecho (ILIKE) em movimentos e pessoas com 10k, 100k e 1M linhas (nada é gravado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Quantidades de movimentos a medir (cumulativas).')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Buscas por termo.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        gerador = GeradorDadosSinteticos(options['seed'])
+        self.repo = gerador.repo
+        postgres = connection.vendor == 'postgresql'
+        if not postgres:
+            self.stdout.write(self.style.WARNING('Banco não é PostgreSQL: sem pg_trgm, a busca mede apenas a varredura.'))
+
+        try:
+            with transaction.atomic():
+                gerador.gerar_pessoas(max(options['tamanhos']) // 20)
+                gerados = 0
+                for tamanho in sorted(options['tamanhos']):
+                    gerador.gerar_movimentos(tamanho - gerados)
+                    gerados = tamanho
+                    if postgres:
+                        self.repo._execute_query('ANALYZE "MovimentoContas"')
+                        self.repo._execute_query('ANALYZE "Pessoas"')
+
+                    termos = [gerador.nome()[:6], gerador.aleatorio.choice(SILABAS) + gerador.aleatorio.choice(SILABAS), '4821']
+                    com_indice = self._medir(termos, options['repeticoes'])
+                    rotulo = 'com índice' if postgres else 'busca'
+                    linha = f'{tamanho:>9} movimentos: {rotulo} {self._resumo(com_indice)}'
+                    if postgres:
+                        sem_indice = self._medir(termos, options['repeticoes'], desligar_indices=True)
+                        linha += f' | sem índice {self._resumo(sem_indice)}'
+                    self.stdout.write(linha)
+                raise _Rollback()
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark concluído; dados sintéticos descartados.'))
+
+    def _medir(self, termos, repeticoes, desligar_indices=False):
+        if desligar_indices:
+            self.repo._execute_query('SET LOCAL enable_bitmapscan = off')
+            self.repo._execute_query('SET LOCAL enable_indexscan = off')
+        movimentos, pessoas = MovimentoRepository(), PessoaRepository()
+        tempos = []
+        try:
+            for termo in termos:
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    movimentos.list_movements_page(termo)
+                    pessoas.list_active_page(termo)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            if desligar_indices:
+                self.repo._execute_query('SET LOCAL enable_bitmapscan = on')
+                self.repo._execute_query('SET LOCAL enable_indexscan = on')
+        return tempos
+
+    def _resumo(self, tempos):
+        tempos = sorted(tempos)
+        return f'mediana {statistics.median(tempos):.1f} ms, p95 {tempos[int(0.95 * (len(tempos) - 1))]:.1f} ms'
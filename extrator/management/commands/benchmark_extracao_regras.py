@@ -0,0 +1,42 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agents.agent_extrator.extrator_regras import extrair_danfe, LIMIAR_CONFIANCA
+
+
+class Command(BaseCommand):
+    help = 'Mede quantos PDFs de um diretório são extraídos pelas regras da DANFE, sem chamar o Gemini'
+
+    def add_arguments(self, parser):
+        parser.add_argument('diretorio', help='Pasta com os PDFs de notas fiscais.')
+        parser.add_argument('--limiar', type=float, default=LIMIAR_CONFIANCA,
+                            help='Confiança mínima para dispensar o LLM.')
+
+    def handle(self, *args, **options):
+        arquivos = sorted(Path(options['diretorio']).glob('**/*.pdf'))
+        if not arquivos:
+            raise CommandError('Nenhum PDF encontrado no diretório informado.')
+
+        atendidos = 0
+        tempos = []
+        for arquivo in arquivos:
+            inicio = time.perf_counter()
+            try:
+                _, confianca = extrair_danfe(arquivo.read_bytes())
+            except Exception as e:
+                confianca = 0.0
+                self.stdout.write(self.style.WARNING(f'{arquivo.name}: erro ({e})'))
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+            if confianca >= options['limiar']:
+                atendidos += 1
+            self.stdout.write(f'{arquivo.name}: confiança {confianca:.2f}')
+
+        total = len(arquivos)
+        tempos.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{atendidos}/{total} documentos ({100 * atendidos / total:.1f}%) atendidos sem chamada de rede. '
+            f'Tempo médio: {sum(tempos) / total:.1f} ms | p95: {tempos[int(0.95 * (total - 1))]:.1f} ms'
+        ))
@@ -0,0 +1,53 @@
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from extrator.fluxo_caixa import relatorio_fluxo_caixa
+from ._dados_sinteticos import GeradorDadosSinteticos
+
+META_MS = 200
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mede a latência do aging e da projeção de fluxo de caixa sobre parcelas sintéticas (nada é gravado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parcelas', type=int, default=1000000, help='Parcelas sintéticas (duas por movimento).')
+        parser.add_argument('--pendentes', type=float, default=0.05, help='Proporção de parcelas em aberto.')
+        parser.add_argument('--repeticoes', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        gerador = GeradorDadosSinteticos(options['seed'], proporcao_pendentes=options['pendentes'])
+        # Data-base no meio do intervalo gerado, para haver parcelas vencidas e a vencer
+        data_base = date(2022, 6, 1)
+
+        try:
+            with transaction.atomic():
+                gerador.gerar_pessoas(1000)
+                gerador.gerar_movimentos(options['parcelas'] // 2, parcelas_por_movimento=2)
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+                for granularidade in ('dia', 'semana'):
+                    tempos = []
+                    for _ in range(options['repeticoes']):
+                        inicio = time.perf_counter()
+                        relatorio_fluxo_caixa(data_base, dias=180, granularidade=granularidade)
+                        tempos.append((time.perf_counter() - inicio) * 1000)
+                    tempos.sort()
+                    p95 = tempos[int(0.95 * (len(tempos) - 1))]
+                    estilo = self.style.SUCCESS if p95 < META_MS else self.style.WARNING
+                    self.stdout.write(estilo(f'{options["parcelas"]} parcelas, por {granularidade}: '
+                                             f'mediana {statistics.median(tempos):.1f} ms, p95 {p95:.1f} ms (meta {META_MS} ms)'))
+                raise _Rollback()
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark concluído; dados sintéticos descartados.'))
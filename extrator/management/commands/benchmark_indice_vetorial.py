@@ -0,0 +1,71 @@
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from agents.agent_rag.indice_vetorial import IndiceExato, IndiceIVF, normalizar
+
+
+def _dados_sinteticos(aleatorio, quantidade, dimensao, grupos):
+    """Perguntas sintéticas agrupadas por assunto: centro do grupo + ruído do mesmo tamanho."""
+    centros = aleatorio.standard_normal((grupos, dimensao), dtype=np.float32)
+    vetores = centros[aleatorio.integers(0, grupos, quantidade)]
+    vetores += aleatorio.standard_normal((quantidade, dimensao), dtype=np.float32)
+    return normalizar(vetores)
+
+
+def _percentil_95(tempos):
+    tempos = sorted(tempos)
+    return tempos[int(0.95 * (len(tempos) - 1))]
+
+
+class Command(BaseCommand):
+    help = 'Mede recall@k e latência da busca exata e do IVF (por número de sondas) com 1k, 10k e 100k vetores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--dimensao', type=int, default=768, help='Dimensão dos embeddings (embedding-001: 768).')
+        parser.add_argument('--consultas', type=int, default=200)
+        parser.add_argument('--k', type=int, default=3, help='Exemplos recuperados por pergunta.')
+        parser.add_argument('--sondas', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        aleatorio = np.random.default_rng(options['seed'])
+        k = options['k']
+
+        for tamanho in options['tamanhos']:
+            vetores = _dados_sinteticos(aleatorio, tamanho, options['dimensao'], grupos=max(10, tamanho // 100))
+            # Consultas: perguntas do corpus reescritas (o vetor original com ruído)
+            origens = aleatorio.integers(0, tamanho, options['consultas'])
+            consultas = vetores[origens] + 0.05 * aleatorio.standard_normal((len(origens), options['dimensao']), dtype=np.float32)
+
+            exato = IndiceExato(vetores, normalizados=True)
+            inicio = time.perf_counter()
+            ivf = IndiceIVF(vetores, normalizados=True, seed=options['seed'])
+            construcao = time.perf_counter() - inicio
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{tamanho} vetores x {options["dimensao"]} dimensões '
+                f'(IVF: {ivf.centroides.shape[0]} listas, construído em {construcao:.1f} s)'))
+
+            tempos, esperados = [], []
+            for consulta in consultas:
+                inicio = time.perf_counter()
+                indices, _ = exato.buscar(consulta, k)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                esperados.append(set(indices.tolist()))
+            self.stdout.write(f'  exato        mediana {statistics.median(tempos):7.2f} ms | p95 {_percentil_95(tempos):7.2f} ms | recall@{k} 1.000')
+
+            for sondas in options['sondas']:
+                if sondas > ivf.centroides.shape[0]:
+                    continue
+                tempos, acertos = [], 0
+                for consulta, esperado in zip(consultas, esperados):
+                    inicio = time.perf_counter()
+                    indices, _ = ivf.buscar(consulta, k, sondas=sondas)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                    acertos += len(esperado & set(indices.tolist()))
+                recall = acertos / (len(esperados) * k)
+                self.stdout.write(f'  ivf {sondas:>3} sondas mediana {statistics.median(tempos):7.2f} ms | '
+                                  f'p95 {_percentil_95(tempos):7.2f} ms | recall@{k} {recall:.3f}')
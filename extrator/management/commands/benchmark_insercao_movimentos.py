@@ -0,0 +1,81 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from extrator.repositories.classificacao_repository import ClassificacaoRepository
+from extrator.repositories.movimento_repository import MovimentoRepository
+from extrator.repositories.pessoa_repository import PessoaRepository
+
+
+class _Rollback(Exception):
+    pass
+
+
+class MovimentoRepositoryLinhaALinha(MovimentoRepository):
+    """Comportamento anterior (um INSERT por parcela e por vínculo), mantido só para comparação."""
+
+    def _inserir_filhos(self, movimento_id, parcelas, classificacao_ids):
+        query_m2m = 'INSERT INTO "MovimentoContas_has_Classificacao" ("MovimentoContas_idMovimentoContas", "Classificacao_idClassificacao") VALUES (%s, %s)'
+        for class_id in classificacao_ids:
+            self._execute_query(query_m2m, [movimento_id, class_id])
+
+        query_par = """
+            INSERT INTO "ParcelasContas"
+            (identificacao, datavencimento, valorparcela, valorpago, valorsaldo, statusparcela, "MovimentoContas_idMovimentoContas")
+            VALUES (%s, %s, %s, 0.0, %s, 'PENDENTE', %s)
+        """
+        for parcela in parcelas:
+            self._execute_query(query_par, [*parcela, movimento_id])
+
+
+class Command(BaseCommand):
+    help = 'Compara a latência por nota de create_completo com INSERTs linha a linha e em lote (nada é gravado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notas', type=int, default=50, help='Notas lançadas por rodada.')
+        parser.add_argument('--parcelas', type=int, default=48, help='Parcelas por nota.')
+        parser.add_argument('--classificacoes', type=int, default=3, help='Classificações por nota.')
+
+    def handle(self, *args, **options):
+        resultados = {}
+        try:
+            with transaction.atomic():
+                fornecedor_id = PessoaRepository().create('FORNECEDOR', {'razao_social': 'Benchmark Fornecedor', 'cnpj': '00000000000000'})
+                faturado_id = PessoaRepository().create('FATURADO', {'nome_completo': 'Benchmark Faturado', 'cpf/cnpj': '00000000000'})
+                classificacao_ids = [ClassificacaoRepository().create('DESPESA', f'BENCHMARK {i}')
+                                     for i in range(options['classificacoes'])]
+
+                for nome, repo in (('linha a linha', MovimentoRepositoryLinhaALinha()), ('em lote', MovimentoRepository())):
+                    resultados[nome] = self._medir(repo, options, fornecedor_id, faturado_id, classificacao_ids)
+
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        for nome, tempos in resultados.items():
+            tempos.sort()
+            self.stdout.write(
+                f'{nome:>14}: média {statistics.mean(tempos):.2f} ms | mediana {statistics.median(tempos):.2f} ms | '
+                f'p95 {tempos[int(0.95 * (len(tempos) - 1))]:.2f} ms'
+            )
+        ganho = statistics.mean(resultados['linha a linha']) / statistics.mean(resultados['em lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['notas']} notas com {options['parcelas']} parcelas e {options['classificacoes']} classificações: "
+            f'{ganho:.1f}x mais rápido em lote.'
+        ))
+
+    def _medir(self, repo, options, fornecedor_id, faturado_id, classificacao_ids):
+        hoje = date.today()
+        parcelas = [{'data_vencimento': (hoje + timedelta(days=30 * (i + 1))).isoformat(), 'valor_total': 100.0}
+                    for i in range(options['parcelas'])]
+        dados = {'numero_nota_fiscal': 'BENCH', 'data_emissao': hoje.isoformat(), 'descricao_produtos': ['Benchmark']}
+
+        tempos = []
+        for _ in range(options['notas']):
+            inicio = time.perf_counter()
+            repo.create_completo(dados, parcelas, fornecedor_id, faturado_id, classificacao_ids)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return tempos
@@ -0,0 +1,22 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agents.agent_rag.consultor_embeddings import AgentConsultorEmbeddings
+
+
+class Command(BaseCommand):
+    help = ('Gera (ou atualiza) o índice em disco dos embeddings do CORPUS_EXEMPLOS, para que a '
+            'primeira pergunta ao RAG com embeddings não pague a geração. Só textos novos vão para a API.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--api-key', default=os.getenv('GEMINI_API_KEY'), help='Padrão: GEMINI_API_KEY.')
+
+    def handle(self, *args, **options):
+        if not options['api_key']:
+            raise CommandError('Informe --api-key ou defina GEMINI_API_KEY.')
+        agente = AgentConsultorEmbeddings(api_key=options['api_key'])
+        if len(agente.indice) == 0:
+            raise CommandError('Não foi possível gerar os embeddings do corpus.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice pronto: {len(agente.indice)} exemplos ({type(agente.indice).__name__}).'))
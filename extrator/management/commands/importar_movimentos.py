@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from extrator.importacao import ImportadorMovimentos, ErroImportacao, TAMANHO_LOTE_PADRAO
+from extrator.repositories.resumo_financeiro_repository import ResumoFinanceiroRepository
+
+
+class Command(BaseCommand):
+    help = 'Importa movimentos históricos (a pagar/receber) de um CSV ou JSON Lines, em lotes e com checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Arquivo .csv ou .jsonl exportado do sistema anterior.')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Padrão: deduzido pela extensão.')
+        parser.add_argument('--delimitador', default=',', help='Delimitador do CSV.')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_PADRAO, help='Movimentos por transação.')
+        parser.add_argument('--recomecar', action='store_true',
+                            help='Ignora o checkpoint e importa o arquivo desde o início.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+
+        def progresso(total):
+            decorrido = time.perf_counter() - inicio
+            self.stdout.write(f'- {total} movimentos confirmados ({decorrido:.1f} s)')
+
+        importador = ImportadorMovimentos(tamanho_lote=options['lote'])
+        try:
+            importados, pulados = importador.importar(
+                options['arquivo'],
+                formato=options['formato'],
+                delimitador=options['delimitador'],
+                recomecar=options['recomecar'],
+                ao_confirmar_lote=progresso,
+            )
+        except (ErroImportacao, OSError) as e:
+            raise CommandError(f'Importação interrompida: {e}. Rode novamente para continuar do último lote confirmado.')
+
+        # Uma única atualização dos resumos no final, em vez de uma por lote
+        if importados and ResumoFinanceiroRepository().atualizar():
+            self.stdout.write('Resumos financeiros atualizados.')
+
+        if pulados:
+            self.stdout.write(f'{pulados} movimento(s) já importado(s) anteriormente foram pulados.')
+        decorrido = time.perf_counter() - inicio
+        taxa = importados / decorrido if decorrido else 0
+        self.stdout.write(self.style.SUCCESS(f'{importados} movimento(s) importado(s) em {decorrido:.1f} s ({taxa:.0f}/s).'))
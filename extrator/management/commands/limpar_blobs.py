@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from extrator.blob_store import remover_blobs_antigos
+
+
+class Command(BaseCommand):
+    help = 'Remove os PDFs enviados que não são acessados há algum tempo (disco local e, se ativo, banco)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=24, help='Idade mínima (em horas) para remoção.')
+
+    def handle(self, *args, **options):
+        removidos = remover_blobs_antigos(max_idade_horas=options['horas'])
+        self.stdout.write(self.style.SUCCESS(f'{removidos} arquivo(s) removido(s).'))
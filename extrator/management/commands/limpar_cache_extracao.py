@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from extrator.repositories.extracao_cache_repository import ExtracaoCacheRepository
+from extrator.tasks import versao_cache_extracao
+
+
+class Command(BaseCommand):
+    help = 'Invalida o cache de extrações (por padrão, apenas as entradas de versões antigas dos prompts ou de dias anteriores)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Remove todas as entradas do cache.')
+        parser.add_argument('--hash', help='Remove apenas as entradas de um PDF (SHA-256).')
+
+    def handle(self, *args, **options):
+        repo = ExtracaoCacheRepository()
+
+        if options['hash']:
+            removidos = repo.delete_by_hash(options['hash'])
+        elif options['todas']:
+            removidos = repo.delete_all()
+        else:
+            removidos = repo.delete_outdated(versao_cache_extracao())
+
+        self.stdout.write(self.style.SUCCESS(f'{removidos} entrada(s) removida(s) do cache de extrações.'))
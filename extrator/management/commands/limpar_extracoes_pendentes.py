@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from extrator.repositories.extracao_pendente_repository import ExtracaoPendenteRepository
+
+
+class Command(BaseCommand):
+    help = 'Remove as extrações concluídas que nunca foram confirmadas como lançamento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=None,
+                            help='Idade mínima (em horas) para remoção. Padrão: EXTRACAO_PENDENTE_TTL_HORAS.')
+
+    def handle(self, *args, **options):
+        removidos = ExtracaoPendenteRepository().delete_expired(options['horas'])
+        self.stdout.write(self.style.SUCCESS(f'{removidos} extração(ões) pendente(s) removida(s).'))
@@ -0,0 +1,98 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from agents.agent_rag.corpus_exemplos import CORPUS_EXEMPLOS
+from extrator.repositories.resumo_financeiro_repository import VIEWS_RESUMO
+from ._dados_sinteticos import GeradorDadosSinteticos
+
+# Tabelas que crescem com o uso; Classificacao é pequena e uma varredura nela é normal
+TABELAS_GRANDES = {'Pessoas', 'MovimentoContas', 'ParcelasContas', 'MovimentoContas_has_Classificacao'}
+
+# Perguntas que agregam boa parte de uma tabela: para elas a varredura é o plano correto
+VARREDURA_ESPERADA = {
+    "Quantos fornecedores eu tenho cadastrados?",
+    "Liste o nome e o documento de todos os clientes ativos.",
+    "Quantos movimentos (notas) foram registrados no total?",
+    "Existem pessoas cadastradas como 'INATIVO'?",
+    "Qual o maior valor de parcela única registrado?",
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _varreduras_postgres(query):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+        plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+
+    varreduras, pendentes = [], [plano[0]['Plan']]
+    while pendentes:
+        no = pendentes.pop()
+        if no['Node Type'] == 'Seq Scan':
+            varreduras.append(no['Relation Name'])
+        pendentes.extend(no.get('Plans', []))
+    return varreduras
+
+
+def _varreduras_sqlite(query):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}")
+        detalhes = [linha[3] for linha in cursor.fetchall()]
+    # "SCAN tabela" lê a tabela inteira; "SEARCH ... USING INDEX" e "SCAN ... USING INDEX" não
+    varreduras = []
+    for detalhe in detalhes:
+        partes = detalhe.split()
+        if partes[0] == 'SCAN' and 'INDEX' not in detalhe:
+            varreduras.append(partes[1].strip('"'))
+    return varreduras
+
+
+class Command(BaseCommand):
+    help = ('Verifica com EXPLAIN que as consultas do CORPUS_EXEMPLOS usam índices numa base grande '
+            '(dados sintéticos, descartados no final). Falha se alguma passar a varrer uma tabela grande.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movimentos', type=int, default=200000, help='Movimentos sintéticos a gerar.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        postgres = connection.vendor == 'postgresql'
+        varreduras_de = _varreduras_postgres if postgres else _varreduras_sqlite
+        falhas = []
+
+        try:
+            with transaction.atomic():
+                gerador = GeradorDadosSinteticos(options['seed'])
+                gerador.gerar_pessoas(options['movimentos'] // 20)
+                gerador.gerar_classificacoes()
+                gerador.gerar_movimentos(options['movimentos'], parcelas_por_movimento=2)
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+                for exemplo in CORPUS_EXEMPLOS:
+                    pergunta = exemplo['pergunta']
+                    if not postgres and any(f'"{view}"' in exemplo['query'] for view in VIEWS_RESUMO):
+                        # No SQLite os resumos são views comuns: o plano agrega as tabelas originais
+                        self.stdout.write(f'[resumo]    {pergunta} (view materializada só no PostgreSQL)')
+                        continue
+                    varreduras = sorted(set(varreduras_de(exemplo['query'].rstrip().rstrip(';'))) & TABELAS_GRANDES)
+                    if not varreduras:
+                        self.stdout.write(self.style.SUCCESS(f'[índice]    {pergunta}'))
+                    elif pergunta in VARREDURA_ESPERADA:
+                        self.stdout.write(f'[varredura] {pergunta} ({", ".join(varreduras)}; esperado)')
+                    else:
+                        falhas.append(pergunta)
+                        self.stdout.write(self.style.ERROR(f'[varredura] {pergunta} ({", ".join(varreduras)})'))
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        if falhas:
+            raise CommandError(f'{len(falhas)} consulta(s) do corpus sem índice adequado.')
+        self.stdout.write(self.style.SUCCESS('Todas as consultas seletivas do corpus usam índices.'))
@@ -0,0 +1,72 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .instrumentacao import iniciar_coleta, encerrar_coleta
+
+
+class WhiteNoiseAssincronoMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise com caminho assíncrono. O original só é síncrono: no topo da pilha, ele
+    obrigaria o Django a rodar todo o restante (inclusive as views assíncronas) em
+    async_to_sync, numa thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class InstrumentacaoConsultasMiddleware:
+    """
+    Conta e cronometra as consultas dos repositórios em cada requisição (veja extrator.instrumentacao).
+    Funciona nos dois modos: as views assíncronas (streams SSE, chat de RAG) não são
+    convertidas para síncronas numa thread por causa deste middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = iniciar_coleta()
+        try:
+            response = self.get_response(request)
+        finally:
+            estatisticas = encerrar_coleta(token, f'{request.method} {request.path}')
+        return self._anotar(response, estatisticas)
+
+    async def __acall__(self, request):
+        # As consultas feitas via sync_to_async herdam o contexto e entram nesta mesma coleta
+        token = iniciar_coleta()
+        try:
+            response = await self.get_response(request)
+        finally:
+            estatisticas = encerrar_coleta(token, f'{request.method} {request.path}')
+        return self._anotar(response, estatisticas)
+
+    def _anotar(self, response, estatisticas):
+        response['X-Consultas'] = str(estatisticas.quantidade)
+        response['X-Tempo-Consultas-Ms'] = f'{estatisticas.tempo_ms:.1f}'
+        return response
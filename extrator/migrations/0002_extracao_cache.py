@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extrator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtracaoCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash_pdf', models.CharField(max_length=64)),
+                ('versao', models.CharField(max_length=100)),
+                ('extracted_data', models.TextField()),
+                ('risk_analysis', models.TextField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'ExtracaoCache',
+                'unique_together': {('hash_pdf', 'versao')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extrator', '0002_extracao_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtracaoPendente',
+            fields=[
+                ('task_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('resultado', models.TextField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'ExtracaoPendente',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extrator', '0003_extracao_pendente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoCheckpoint',
+            fields=[
+                ('chave', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('arquivo', models.CharField(max_length=500)),
+                ('registros', models.IntegerField(default=0)),
+                ('concluido', models.BooleanField(default=False)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'ImportacaoCheckpoint',
+            },
+        ),
+    ]
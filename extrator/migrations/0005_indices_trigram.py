@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Índices GIN com pg_trgm: atendem ILIKE '%termo%' (busca por trecho) sem varrer a tabela
+INDICES_TRIGRAM = [
+    ('idx_pessoas_razaosocial_trgm', 'Pessoas', 'razaosocial'),
+    ('idx_pessoas_documento_trgm', 'Pessoas', 'documento'),
+    ('idx_movimento_numeronf_trgm', 'MovimentoContas', 'numeronotafiscal'),
+    ('idx_classificacao_descricao_trgm', 'Classificacao', 'descricao'),
+]
+
+
+def criar_indices(apps, schema_editor):
+    # No SQLite (desenvolvimento) não há pg_trgm: as buscas seguem com LIKE sem índice
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for nome, tabela, coluna in INDICES_TRIGRAM:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {nome} ON "{tabela}" USING gin ("{coluna}" gin_trgm_ops)'
+        )
+
+
+def remover_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nome, _, _ in INDICES_TRIGRAM:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {nome}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; a tabela segue aceitando escritas
+    atomic = False
+
+    dependencies = [
+        ('extrator', '0004_importacao_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, remover_indices),
+    ]
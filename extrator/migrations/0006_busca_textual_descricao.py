@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def criar_busca_textual(apps, schema_editor):
+    # No SQLite a busca por produto recai em LIKE por palavra (MovimentoRepository.search_produtos_page)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Coluna gerada: o PostgreSQL a recalcula em todo INSERT/UPDATE de descricao, inclusive COPY
+    schema_editor.execute("""
+        ALTER TABLE "MovimentoContas" ADD COLUMN IF NOT EXISTS descricao_busca tsvector
+        GENERATED ALWAYS AS (to_tsvector('portuguese', coalesce(descricao, ''))) STORED
+    """)
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_movimento_descricao_busca ON "MovimentoContas" USING gin (descricao_busca)'
+    )
+
+
+def remover_busca_textual(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS idx_movimento_descricao_busca')
+    schema_editor.execute('ALTER TABLE "MovimentoContas" DROP COLUMN IF EXISTS descricao_busca')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('extrator', '0005_indices_trigram'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_busca_textual, remover_busca_textual),
+    ]
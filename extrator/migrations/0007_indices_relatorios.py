@@ -0,0 +1,41 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+INDICES = [
+    ('movimentocontas', models.Index(django.db.models.functions.text.Upper('tipo'), django.db.models.functions.text.Upper('status'), name='idx_movimento_tipo_status')),
+    ('movimentocontas', models.Index(django.db.models.functions.text.Upper('numeronotafiscal'), name='idx_movimento_numeronf_upper')),
+    ('movimentocontas', models.Index(fields=['dataemissao', 'id'], name='idx_movimento_dataemissao')),
+    ('movimentocontashasclassificacao', models.Index(fields=['classificacao', 'movimentocontas'], name='idx_classificacao_movimentos')),
+    ('parcelascontas', models.Index(django.db.models.functions.text.Upper('statusparcela'), models.F('datavencimento'), name='idx_parcela_status_vencimento')),
+    ('pessoas', models.Index(django.db.models.functions.text.Upper('razaosocial'), name='idx_pessoas_razaosocial_upper')),
+]
+
+
+def _opcoes(schema_editor):
+    # No PostgreSQL os índices são criados sem bloquear escritas nas tabelas já populadas
+    return {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+
+
+def criar_indices(apps, schema_editor):
+    for model_name, indice in INDICES:
+        schema_editor.add_index(apps.get_model('extrator', model_name), indice, **_opcoes(schema_editor))
+
+
+def remover_indices(apps, schema_editor):
+    for model_name, indice in INDICES:
+        schema_editor.remove_index(apps.get_model('extrator', model_name), indice, **_opcoes(schema_editor))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('extrator', '0006_busca_textual_descricao'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(criar_indices, remover_indices)],
+            state_operations=[migrations.AddIndex(model_name=model_name, index=indice) for model_name, indice in INDICES],
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+# Agregados por mês, tipo, status, classificação e contraparte consultados pelos agentes de RAG.
+# No PostgreSQL são views materializadas (atualizadas por extrator.tasks.atualizar_resumos_financeiros_task);
+# no SQLite, views comuns com as mesmas colunas.
+RESUMOS = {
+    'ResumoMovimentos': ("""
+        SELECT {mes_emissao} AS mes, UPPER(mc.tipo) AS tipo, UPPER(mc.status) AS status,
+               p.id AS pessoa_id, p.razaosocial AS pessoa,
+               COUNT(*) AS quantidade, SUM(mc.valortotal) AS valor_total
+        FROM "MovimentoContas" mc
+        JOIN "Pessoas" p ON p.id = mc."Pessoas_idFornecedorCliente"
+        GROUP BY 1, 2, 3, 4, 5
+    """, 'mes, tipo, status, pessoa_id'),
+    'ResumoClassificacoes': ("""
+        SELECT {mes_emissao} AS mes, UPPER(mc.tipo) AS tipo, UPPER(mc.status) AS status,
+               c.id AS classificacao_id, c.descricao AS classificacao,
+               COUNT(*) AS quantidade, SUM(mc.valortotal) AS valor_total
+        FROM "MovimentoContas" mc
+        JOIN "MovimentoContas_has_Classificacao" mcc ON mcc."MovimentoContas_idMovimentoContas" = mc.id
+        JOIN "Classificacao" c ON c.id = mcc."Classificacao_idClassificacao"
+        GROUP BY 1, 2, 3, 4, 5
+    """, 'mes, tipo, status, classificacao_id'),
+    'ResumoVencimentos': ("""
+        SELECT {mes_vencimento} AS mes, UPPER(mc.tipo) AS tipo, UPPER(pc.statusparcela) AS statusparcela,
+               COUNT(*) AS quantidade, SUM(pc.valorparcela) AS valor_parcelas,
+               SUM(pc.valorpago) AS valor_pago, SUM(pc.valorsaldo) AS valor_saldo
+        FROM "ParcelasContas" pc
+        JOIN "MovimentoContas" mc ON mc.id = pc."MovimentoContas_idMovimentoContas"
+        GROUP BY 1, 2, 3
+    """, 'mes, tipo, statusparcela'),
+}
+
+MES = {
+    'postgresql': {'mes_emissao': "date_trunc('month', mc.dataemissao)::date",
+                   'mes_vencimento': "date_trunc('month', pc.datavencimento)::date"},
+    'sqlite': {'mes_emissao': "date(mc.dataemissao, 'start of month')",
+               'mes_vencimento': "date(pc.datavencimento, 'start of month')"},
+}
+
+
+def criar_resumos(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    postgres = vendor == 'postgresql'
+    for nome, (select, chave) in RESUMOS.items():
+        select = select.format(**MES['postgresql' if postgres else 'sqlite'])
+        if postgres:
+            schema_editor.execute(f'CREATE MATERIALIZED VIEW "{nome}" AS {select}')
+            # Índice único: permite REFRESH ... CONCURRENTLY sem bloquear as leituras
+            schema_editor.execute(f'CREATE UNIQUE INDEX "idx_{nome.lower()}_chave" ON "{nome}" ({chave})')
+        else:
+            schema_editor.execute(f'CREATE VIEW "{nome}" AS {select}')
+
+
+def remover_resumos(apps, schema_editor):
+    tipo = 'MATERIALIZED VIEW' if schema_editor.connection.vendor == 'postgresql' else 'VIEW'
+    for nome in RESUMOS:
+        schema_editor.execute(f'DROP {tipo} IF EXISTS "{nome}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extrator', '0007_indices_relatorios'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_resumos, remover_resumos),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extrator', '0008_resumos_financeiros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoDados',
+            fields=[
+                ('nome', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('versao', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'VersaoDados',
+            },
+        ),
+    ]
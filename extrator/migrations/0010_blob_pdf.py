@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extrator', '0009_versao_dados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobPdf',
+            fields=[
+                ('referencia', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('conteudo', models.BinaryField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'BlobPdf',
+            },
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Upper
 
 
 class Pessoas(models.Model):
@@ -11,6 +13,10 @@ class Pessoas(models.Model):
 
     class Meta:
         db_table = 'Pessoas'
+        indexes = [
+            # O corpus do RAG compara nomes com UPPER(razaosocial) = UPPER(...)
+            models.Index(Upper('razaosocial'), name='idx_pessoas_razaosocial_upper'),
+        ]
 
 
 class Classificacao(models.Model):
@@ -37,6 +43,13 @@ class MovimentoContas(models.Model):
 
     class Meta:
         db_table = 'MovimentoContas'
+        indexes = [
+            # Expressões iguais às do corpus do RAG (UPPER(tipo) = 'PAGAR' AND UPPER(status) = ...)
+            models.Index(Upper('tipo'), Upper('status'), name='idx_movimento_tipo_status'),
+            models.Index(Upper('numeronotafiscal'), name='idx_movimento_numeronf_upper'),
+            # Filtros por período e a paginação por data (keyset com id como desempate)
+            models.Index(fields=['dataemissao', 'id'], name='idx_movimento_dataemissao'),
+        ]
 
 
 class ParcelasContas(models.Model):
@@ -50,6 +63,9 @@ class ParcelasContas(models.Model):
 
     class Meta:
         db_table = 'ParcelasContas'
+        indexes = [
+            models.Index(Upper('statusparcela'), F('datavencimento'), name='idx_parcela_status_vencimento'),
+        ]
 
 
 class MovimentoContasHasClassificacao(models.Model):
@@ -59,3 +75,65 @@ class MovimentoContasHasClassificacao(models.Model):
     class Meta:
         db_table = 'MovimentoContas_has_Classificacao'
         unique_together = (('movimentocontas', 'classificacao'),)
+        indexes = [
+            # Busca reversa (movimentos de uma classificação) servida só pelo índice
+            models.Index(fields=['classificacao', 'movimentocontas'], name='idx_classificacao_movimentos'),
+        ]
+
+
+class ExtracaoCache(models.Model):
+    hash_pdf = models.CharField(max_length=64)
+    versao = models.CharField(max_length=100)
+    extracted_data = models.TextField()
+    risk_analysis = models.TextField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'ExtracaoCache'
+        unique_together = (('hash_pdf', 'versao'),)
+
+
+class ExtracaoPendente(models.Model):
+    task_id = models.CharField(max_length=255, primary_key=True)
+    resultado = models.TextField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'ExtracaoPendente'
+
+
+class BlobPdf(models.Model):
+    """
+    Cópia no banco dos PDFs enviados, para workers que não compartilham o disco do
+    servidor web (ex: serviços separados no Render). Veja extrator/blob_store.py.
+    """
+    referencia = models.CharField(max_length=64, primary_key=True)
+    conteudo = models.BinaryField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'BlobPdf'
+
+
+class ImportacaoCheckpoint(models.Model):
+    chave = models.CharField(max_length=64, primary_key=True)
+    arquivo = models.CharField(max_length=500)
+    registros = models.IntegerField(default=0)
+    concluido = models.BooleanField(default=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'ImportacaoCheckpoint'
+
+
+class VersaoDados(models.Model):
+    """
+    Contador incrementado na mesma transação de cada escrita em movimentos, pessoas e
+    classificações. O cache de respostas do RAG usa o valor na chave: uma escrita torna
+    as respostas anteriores inalcançáveis em todos os processos.
+    """
+    nome = models.CharField(max_length=50, primary_key=True)
+    versao = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'VersaoDados'
@@ -0,0 +1,69 @@
+"""
+Paginação por keyset (cursor) para as listagens.
+
+Em vez de OFFSET, cada página começa depois da chave (valor da coluna de ordenação, id)
+da última linha da página anterior. O custo de uma página não cresce com a posição
+dela na tabela. O cursor vai na URL como base64 do JSON dessa chave.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+
+TAMANHO_PAGINA_PADRAO = 50
+TAMANHOS_PAGINA = (25, 50, 100, 200)
+# Até aqui o total é contado de verdade; acima disso, no PostgreSQL, vale a estimativa do planner
+LIMITE_CONTAGEM_EXATA = 10000
+
+
+def _serializar(valor):
+    if isinstance(valor, (date, Decimal)):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(chave):
+    texto = json.dumps([_serializar(v) for v in chave], separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Chave [valor, id] do cursor, ou None se ausente ou adulterado (volta para a primeira página)."""
+    if not cursor:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        chave = json.loads(texto)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(chave, list) or len(chave) != 2:
+        return None
+    return chave
+
+
+def tamanho_pagina(valor):
+    """Tamanho de página pedido na URL, restrito às opções oferecidas na tela."""
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        return TAMANHO_PAGINA_PADRAO
+    return valor if valor in TAMANHOS_PAGINA else TAMANHO_PAGINA_PADRAO
+
+
+@dataclass
+class Pagina:
+    itens: list = field(default_factory=list)
+    cursor_proximo: str = None
+    cursor_anterior: str = None
+    total: int = None
+    total_aproximado: bool = False
+
+    @property
+    def tem_proxima(self):
+        return self.cursor_proximo is not None
+
+    @property
+    def tem_anterior(self):
+        return self.cursor_anterior is not None
@@ -1,17 +1,187 @@
+import itertools
+import json
+import re
+
+from django.conf import settings
 from django.db import connection
 
+from ..instrumentacao import medir_consulta
+from ..paginacao import Pagina, codificar_cursor, decodificar_cursor, TAMANHO_PAGINA_PADRAO, LIMITE_CONTAGEM_EXATA
+
+# Linhas por INSERT multi-linha; mantém o total de parâmetros abaixo do limite do SQLite (999)
+TAMANHO_LOTE_INSERCAO = 100
+# Comandos por ida ao banco em _execute_batch no PostgreSQL
+TAMANHO_PAGINA_BATCH = 100
+# Linha de "VersaoDados" incrementada a cada escrita nos dados financeiros (veja _dados_alterados)
+VERSAO_DADOS_FINANCEIROS = 'dados_financeiros'
+
+
 class BaseRepository:
 
+    def _resultado(self, cursor, fetch):
+        if fetch == 'one':
+            return cursor.fetchone()
+        if fetch == 'all':
+            return cursor.fetchall()
+        if fetch == 'rowcount':
+            return cursor.rowcount
+        if fetch == 'valor':
+            # Primeira coluna da primeira linha, ex: o id de um INSERT ... RETURNING id
+            linha = cursor.fetchone()
+            return linha[0] if linha else None
+        return None
+
     def _execute_query(self, query, params=None, fetch=None):
-        with connection.cursor() as cursor:
+        """`fetch`: 'one', 'all', 'rowcount', 'valor' ou None (sem retorno)."""
+        with connection.cursor() as cursor, medir_consulta(query):
             cursor.execute(query, params or [])
-            if fetch == 'one':
-                return cursor.fetchone()
-            if fetch == 'all':
-                return cursor.fetchall()
-            if 'RETURNING' in query.upper():
-                return cursor.fetchone()[0] if cursor.rowcount > 0 else None
-            return None
+            return self._resultado(cursor, fetch)
+
+    def _execute_batch(self, query, lista_params):
+        """
+        Executa o mesmo comando para cada conjunto de parâmetros. No PostgreSQL os comandos
+        vão em páginas de TAMANHO_PAGINA_BATCH por ida ao banco (psycopg2 execute_batch).
+        """
+        lista_params = list(lista_params)
+        if not lista_params:
+            return
+        with connection.cursor() as cursor, medir_consulta(query):
+            if connection.vendor == 'postgresql':
+                from psycopg2.extras import execute_batch
+                execute_batch(cursor.cursor, query, lista_params, page_size=TAMANHO_PAGINA_BATCH)
+            else:
+                cursor.executemany(query, lista_params)
+
+    def _execute_prepared(self, nome, query, params=None, fetch=None):
+        """
+        Consulta frequente como prepared statement nomeado no PostgreSQL: o PREPARE roda
+        uma vez por conexão e as execuções seguintes pulam o parse e o planejamento.
+        Em outros bancos, ou com REPOSITORIO_PREPARED_STATEMENTS desligado (pgbouncer em
+        modo transaction), equivale a _execute_query.
+        """
+        if connection.vendor != 'postgresql' or not settings.REPOSITORIO_PREPARED_STATEMENTS:
+            return self._execute_query(query, params, fetch)
+
+        params = list(params or [])
+        connection.ensure_connection()
+        conexao, preparados = getattr(connection, '_repositorio_preparados', (None, set()))
+        if conexao is not connection.connection:
+            preparados = set()
+            connection._repositorio_preparados = (connection.connection, preparados)
+
+        with connection.cursor() as cursor:
+            if nome not in preparados:
+                cursor.execute(f"PREPARE {nome} AS {self._sql_prepare(query)}")
+                preparados.add(nome)
+
+            argumentos = f"({', '.join(['%s'] * len(params))})" if params else ''
+            with medir_consulta(query):
+                cursor.execute(f"EXECUTE {nome}{argumentos}", params)
+                return self._resultado(cursor, fetch)
+
+    @staticmethod
+    def _sql_prepare(query):
+        """
+        Texto da consulta para o PREPARE: cada %s vira $1, $2, ... e o escape %% volta a
+        ser um % literal (o PREPARE é enviado sem parâmetros, fora da formatação do driver).
+        """
+        posicoes = itertools.count(1)
+        return re.sub(r'%%|%s', lambda m: '%' if m.group() == '%%' else f'${next(posicoes)}', query)
+
+    def _insert_many(self, query_insert, placeholder_linha, linhas):
+        """
+        Insere várias linhas com INSERT ... VALUES (...), (...), em lotes e num único cursor.
+        `placeholder_linha` é o trecho de uma linha, ex: '(%s, %s, 0.0)'.
+        """
+        if not linhas:
+            return 0
+        total = 0
+        with connection.cursor() as cursor, medir_consulta(f"{query_insert} VALUES {placeholder_linha}, ..."):
+            for inicio in range(0, len(linhas), TAMANHO_LOTE_INSERCAO):
+                lote = linhas[inicio:inicio + TAMANHO_LOTE_INSERCAO]
+                valores = ', '.join([placeholder_linha] * len(lote))
+                cursor.execute(f"{query_insert} VALUES {valores}", [param for linha in lote for param in linha])
+                total += cursor.rowcount
+        return total
+
+    def _paginar(self, query_base, ordem, chave_da_linha, filtros=None, params=None,
+                 apos=None, antes=None, limite=TAMANHO_PAGINA_PADRAO, contar=False):
+        """
+        Uma página de `query_base` (um SELECT sem WHERE/ORDER BY) por keyset.
+        `ordem` é (coluna, coluna_id, descendente); a ordenação usa o id como desempate.
+        `chave_da_linha(linha)` devolve (valor_da_coluna, id) para montar os cursores.
+        `apos` avança a partir de um cursor_proximo; `antes` volta a partir de um cursor_anterior.
+        Com `contar`, preenche o total de linhas do filtro (veja _contar).
+        """
+        coluna, coluna_id, descendente = ordem
+        condicoes = list(filtros or [])
+        params = list(params or [])
+        total, total_aproximado = self._contar(query_base, condicoes, params) if contar else (None, False)
+
+        chave = decodificar_cursor(antes) or decodificar_cursor(apos)
+        voltando = chave is not None and decodificar_cursor(antes) is not None
+        # Voltando, a consulta percorre a ordem inversa e a página é desinvertida no final
+        decrescente = descendente != voltando
+        if chave is not None:
+            condicoes.append(f"({coluna}, {coluna_id}) {'<' if decrescente else '>'} (%s, %s)")
+            params.extend(chave)
+
+        direcao = 'DESC' if decrescente else 'ASC'
+        where = f"WHERE {' AND '.join(f'({c})' for c in condicoes)}" if condicoes else ''
+        query = f"""
+            {query_base}
+            {where}
+            ORDER BY {coluna} {direcao}, {coluna_id} {direcao}
+            LIMIT %s
+        """
+        linhas = self._execute_query(query, params + [limite + 1], fetch="all")
+        ha_mais = len(linhas) > limite
+        linhas = linhas[:limite]
+        if voltando:
+            linhas.reverse()
+
+        tem_proxima = voltando or ha_mais
+        tem_anterior = ha_mais if voltando else chave is not None
+        return Pagina(
+            itens=linhas,
+            cursor_proximo=codificar_cursor(chave_da_linha(linhas[-1])) if linhas and tem_proxima else None,
+            cursor_anterior=codificar_cursor(chave_da_linha(linhas[0])) if linhas and tem_anterior else None,
+            total=total,
+            total_aproximado=total_aproximado,
+        )
+
+    def _contar(self, query_base, filtros=None, params=None):
+        """
+        Total de linhas de `query_base` com os filtros, como (total, aproximado).
+        A contagem exata para em LIMITE_CONTAGEM_EXATA; acima disso usa a estimativa
+        do planner no PostgreSQL (um COUNT(*) em 80k+ linhas a cada página não compensa).
+        """
+        params = list(params or [])
+        where = f"WHERE {' AND '.join(f'({c})' for c in filtros)}" if filtros else ''
+        consulta = f"{query_base} {where}"
+
+        query = f"SELECT COUNT(*) FROM ({consulta} LIMIT %s) AS limitada"
+        total = self._execute_query(query, params + [LIMITE_CONTAGEM_EXATA + 1], fetch="one")[0]
+        if total <= LIMITE_CONTAGEM_EXATA:
+            return total, False
+
+        if connection.vendor == 'postgresql':
+            plano = self._execute_query(f"EXPLAIN (FORMAT JSON) {consulta}", params, fetch="one")[0]
+            if isinstance(plano, str):
+                plano = json.loads(plano)
+            return max(int(plano[0]['Plan']['Plan Rows']), total), True
+        return total, True
+
+    def _dados_alterados(self):
+        """
+        Incrementa a versão dos dados financeiros na transação da escrita. As respostas em
+        cache do RAG guardam a versão com que foram geradas e deixam de valer.
+        """
+        query = """
+            INSERT INTO "VersaoDados" (nome, versao) VALUES (%s, 1)
+            ON CONFLICT (nome) DO UPDATE SET versao = "VersaoDados".versao + 1
+        """
+        self._execute_query(query, [VERSAO_DADOS_FINANCEIROS])
 
     def _get_ilike_operator(self):
         """
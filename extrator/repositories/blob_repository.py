@@ -0,0 +1,27 @@
+from django.utils import timezone
+
+from .base_repository import BaseRepository
+
+
+class BlobRepository(BaseRepository):
+    """PDFs enviados guardados no banco, pela referência (SHA-256) do blob_store."""
+
+    def exists(self, referencia):
+        query = """SELECT 1 FROM "BlobPdf" WHERE referencia = %s"""
+        return self._execute_query(query, [referencia], fetch="one") is not None
+
+    def save(self, referencia, conteudo):
+        query = """
+            INSERT INTO "BlobPdf" (referencia, conteudo, criado_em) VALUES (%s, %s, %s)
+            ON CONFLICT (referencia) DO NOTHING
+        """
+        self._execute_query(query, [referencia, conteudo, timezone.now()])
+
+    def find(self, referencia):
+        query = """SELECT conteudo FROM "BlobPdf" WHERE referencia = %s"""
+        result = self._execute_query(query, [referencia], fetch="one")
+        return bytes(result[0]) if result else None
+
+    def delete_older_than(self, limite):
+        query = """DELETE FROM "BlobPdf" WHERE criado_em < %s"""
+        return self._execute_query(query, [limite], fetch="rowcount")
@@ -5,24 +5,26 @@ class ClassificacaoRepository(BaseRepository):
 
     def find_by_descricao(self, descricao):
         query = """SELECT id FROM "Classificacao" WHERE descricao = %s AND tipo = 'DESPESA'"""
-        result = self._execute_query(query, [descricao], fetch='one')
+        result = self._execute_prepared('classificacao_despesa_por_descricao', query, [descricao], fetch='one')
         return result[0] if result else None
 
+    def find_ids_by_descricoes(self, descricoes):
+        """{descricao: id} das classificações de despesa encontradas, numa única consulta."""
+        descricoes = list(dict.fromkeys(descricoes))
+        if not descricoes:
+            return {}
+        placeholders = ', '.join(['%s'] * len(descricoes))
+        query = f"""SELECT descricao, id FROM "Classificacao" WHERE descricao IN ({placeholders}) AND tipo = 'DESPESA'"""
+        return dict(self._execute_query(query, descricoes, fetch='all'))
+
     def create(self, tipo, descricao):
         query = """
             INSERT INTO "Classificacao" (tipo, descricao, status) 
             VALUES (%s, %s, 'ATIVO') RETURNING id
         """
-        return self._execute_query(query, [tipo, descricao])
-
-    def list_all(self, order_by='descricao'):
-        order_sql = self._get_order_clause(order_by)
-        query = f"""
-            SELECT id, descricao, tipo, status 
-            FROM "Classificacao" 
-            ORDER BY {order_sql}
-        """
-        return self._execute_query(query, fetch="all")
+        classificacao_id = self._execute_query(query, [tipo, descricao], fetch="valor")
+        self._dados_alterados()
+        return classificacao_id
 
     def find_by_id(self, pk):
         query = """
@@ -36,6 +38,7 @@ class ClassificacaoRepository(BaseRepository):
             UPDATE "Classificacao" SET tipo=%s, descricao=%s WHERE id=%s
         """
         self._execute_query(query, [tipo, descricao, pk])
+        self._dados_alterados()
 
     def toggle_status(self, pk):
         query = """
@@ -44,6 +47,7 @@ class ClassificacaoRepository(BaseRepository):
             WHERE id = %s
         """
         self._execute_query(query, [pk])
+        self._dados_alterados()
 
     def list_active_receitas(self):
         query = """
@@ -52,25 +56,29 @@ class ClassificacaoRepository(BaseRepository):
         """
         return self._execute_query(query, fetch="all")
 
-    def _get_order_clause(self, order_param):
-        """Traduz ordenação da URL para SQL seguro."""
-        mapeamento = {
-            'descricao': 'descricao ASC',
-            '-descricao': 'descricao DESC',
-            'tipo': 'tipo ASC',
-            '-tipo': 'tipo DESC',
-            'status': 'status ASC',
-            '-status': 'status DESC'
-        }
-        return mapeamento.get(order_param, 'descricao ASC')
-    
-    def search(self, termo, order_by='descricao'):
-        order_sql = self._get_order_clause(order_by)
-        query = f"""
-            SELECT id, descricao, tipo, status 
-            FROM "Classificacao" 
-            WHERE descricao ILIKE %s
-            ORDER BY {order_sql}
-        """
-        param = f"%{termo}%"
-        return self._execute_query(query, [param], fetch="all")
\ No newline at end of file
+    # Parâmetro de ordenação da URL -> (coluna SQL, posição da coluna na linha)
+    ORDENACOES = {
+        'descricao': ('descricao', 1),
+        'tipo': ('tipo', 2),
+        'status': ('status', 3),
+    }
+
+    def list_page(self, termo=None, order_by='descricao', apos=None, antes=None, limite=None, contar=False):
+        """Uma página das classificações, opcionalmente filtradas pela descrição."""
+        campo = order_by.lstrip('-')
+        if campo not in self.ORDENACOES:
+            campo, order_by = 'descricao', 'descricao'
+        coluna, posicao = self.ORDENACOES[campo]
+
+        filtros, params = [], []
+        if termo:
+            filtros.append(f"descricao {self._get_ilike_operator()} %s")
+            params = [f"%{termo}%"]
+
+        extras = {'limite': limite} if limite else {}
+        return self._paginar(
+            'SELECT id, descricao, tipo, status FROM "Classificacao"',
+            (coluna, 'id', order_by.startswith('-')),
+            lambda linha: (linha[posicao], linha[0]),
+            filtros=filtros, params=params, apos=apos, antes=antes, contar=contar, **extras
+        )
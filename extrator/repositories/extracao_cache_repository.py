@@ -0,0 +1,40 @@
+import json
+from .base_repository import BaseRepository
+
+
+class ExtracaoCacheRepository(BaseRepository):
+
+    def find(self, hash_pdf, versao):
+        query = """
+            SELECT extracted_data, risk_analysis FROM "ExtracaoCache"
+            WHERE hash_pdf = %s AND versao = %s
+        """
+        result = self._execute_query(query, [hash_pdf, versao], fetch="one")
+        if not result:
+            return None
+        return {'extracted_data': json.loads(result[0]), 'risk_analysis': json.loads(result[1])}
+
+    def save(self, hash_pdf, versao, extracted_data, risk_analysis):
+        query = """
+            INSERT INTO "ExtracaoCache" (hash_pdf, versao, extracted_data, risk_analysis, criado_em)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (hash_pdf, versao) DO NOTHING
+        """
+        self._execute_query(query, [
+            hash_pdf,
+            versao,
+            json.dumps(extracted_data, ensure_ascii=False),
+            json.dumps(risk_analysis, ensure_ascii=False)
+        ])
+
+    def delete_by_hash(self, hash_pdf):
+        query = """DELETE FROM "ExtracaoCache" WHERE hash_pdf = %s"""
+        return self._execute_query(query, [hash_pdf], fetch="rowcount")
+
+    def delete_outdated(self, versao_atual):
+        """Remove as entradas geradas por versões antigas de prompt/modelo."""
+        query = """DELETE FROM "ExtracaoCache" WHERE versao <> %s"""
+        return self._execute_query(query, [versao_atual], fetch="rowcount")
+
+    def delete_all(self):
+        return self._execute_query('DELETE FROM "ExtracaoCache"', fetch="rowcount")
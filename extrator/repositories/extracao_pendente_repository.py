@@ -0,0 +1,42 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .base_repository import BaseRepository
+
+
+class ExtracaoPendenteRepository(BaseRepository):
+    """
+    Resultados de extração aguardando a confirmação do usuário, por id da tarefa.
+    A sessão guarda apenas o id; o JSON completo fica aqui.
+    """
+
+    def _limite_validade(self, horas=None):
+        horas = settings.EXTRACAO_PENDENTE_TTL_HORAS if horas is None else horas
+        return timezone.now() - timedelta(hours=horas)
+
+    def save(self, task_id, resultado):
+        query = """
+            INSERT INTO "ExtracaoPendente" (task_id, resultado, criado_em)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (task_id) DO UPDATE SET resultado = EXCLUDED.resultado, criado_em = EXCLUDED.criado_em
+        """
+        self._execute_query(query, [task_id, json.dumps(resultado, ensure_ascii=False), timezone.now()])
+
+    def find(self, task_id):
+        query = """
+            SELECT resultado FROM "ExtracaoPendente"
+            WHERE task_id = %s AND criado_em >= %s
+        """
+        result = self._execute_query(query, [task_id, self._limite_validade()], fetch="one")
+        return json.loads(result[0]) if result else None
+
+    def delete(self, task_id):
+        query = """DELETE FROM "ExtracaoPendente" WHERE task_id = %s"""
+        return self._execute_query(query, [task_id], fetch="rowcount")
+
+    def delete_expired(self, horas=None):
+        query = """DELETE FROM "ExtracaoPendente" WHERE criado_em < %s"""
+        return self._execute_query(query, [self._limite_validade(horas)], fetch="rowcount")
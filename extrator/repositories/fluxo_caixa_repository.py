@@ -0,0 +1,19 @@
+from .base_repository import BaseRepository
+
+
+class FluxoCaixaRepository(BaseRepository):
+
+    def saldos_pendentes_por_vencimento(self):
+        """
+        Saldo em aberto das parcelas pendentes agregado por (tipo do movimento, data de vencimento).
+        Uma linha por dia com vencimentos, não por parcela: o aging e a projeção são calculados
+        sobre esse resultado, que fica pequeno mesmo com milhões de parcelas.
+        """
+        query = """
+            SELECT UPPER(mc.tipo), pc.datavencimento, COALESCE(SUM(pc.valorsaldo), 0), COUNT(*)
+            FROM "ParcelasContas" pc
+            JOIN "MovimentoContas" mc ON mc.id = pc."MovimentoContas_idMovimentoContas"
+            WHERE UPPER(pc.statusparcela) = 'PENDENTE'
+            GROUP BY UPPER(mc.tipo), pc.datavencimento
+        """
+        return self._execute_query(query, fetch="all")
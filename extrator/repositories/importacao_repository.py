@@ -0,0 +1,91 @@
+import csv
+import io
+
+from django.db import connection
+from django.utils import timezone
+
+from ..instrumentacao import medir_consulta
+from .base_repository import BaseRepository, TAMANHO_LOTE_INSERCAO
+
+
+class ImportacaoRepository(BaseRepository):
+    """Carga em massa de movimentos históricos: COPY no PostgreSQL, INSERT multi-linha nos demais bancos."""
+
+    def mapa_pessoas(self):
+        return dict(self._execute_query('SELECT documento, id FROM "Pessoas"', fetch="all"))
+
+    def mapa_classificacoes(self):
+        return dict(self._execute_query('SELECT descricao, id FROM "Classificacao"', fetch="all"))
+
+    def inserir_pessoas(self, pessoas):
+        """`pessoas`: lista de (tipo, razaosocial, documento). Retorna {documento: id} das inseridas."""
+        if not pessoas:
+            return {}
+        self._insert_many('INSERT INTO "Pessoas" (tipo, razaosocial, documento, status)', "(%s, %s, %s, 'ATIVO')", pessoas)
+        return self._ids_por_chave('"Pessoas"', 'documento', [p[2] for p in pessoas])
+
+    def inserir_classificacoes(self, classificacoes):
+        """`classificacoes`: lista de (tipo, descricao). Retorna {descricao: id} das inseridas."""
+        if not classificacoes:
+            return {}
+        self._insert_many('INSERT INTO "Classificacao" (tipo, descricao, status)', "(%s, %s, 'ATIVO')", classificacoes)
+        return self._ids_por_chave('"Classificacao"', 'descricao', [c[1] for c in classificacoes])
+
+    def _ids_por_chave(self, tabela, coluna, valores):
+        ids = {}
+        for inicio in range(0, len(valores), TAMANHO_LOTE_INSERCAO):
+            lote = valores[inicio:inicio + TAMANHO_LOTE_INSERCAO]
+            placeholders = ', '.join(['%s'] * len(lote))
+            query = f'SELECT {coluna}, id FROM {tabela} WHERE {coluna} IN ({placeholders})'
+            ids.update(self._execute_query(query, lote, fetch="all"))
+        return ids
+
+    def reservar_ids_movimento(self, quantidade):
+        """
+        Ids explícitos para os movimentos do lote, para que parcelas e vínculos sejam
+        carregados sem depender da ordem de um RETURNING em INSERT multi-linha.
+        """
+        if connection.vendor == 'postgresql':
+            query = """SELECT nextval(pg_get_serial_sequence('"MovimentoContas"', 'id')) FROM generate_series(1, %s)"""
+            return [linha[0] for linha in self._execute_query(query, [quantidade], fetch="all")]
+        # SQLite: um único escritor por vez, o MAX(id) não muda dentro da transação de importação
+        ultimo = self._execute_query('SELECT COALESCE(MAX(id), 0) FROM "MovimentoContas"', fetch="one")[0]
+        return list(range(ultimo + 1, ultimo + 1 + quantidade))
+
+    def copiar(self, tabela, colunas, linhas):
+        """Carrega as linhas com COPY FROM STDIN (PostgreSQL) ou INSERT multi-linha."""
+        if not linhas:
+            return
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(linhas)
+            buffer.seek(0)
+            lista_colunas = ', '.join(f'"{c}"' for c in colunas)
+            comando = f'COPY "{tabela}" ({lista_colunas}) FROM STDIN WITH (FORMAT csv)'
+            with connection.cursor() as cursor, medir_consulta(comando):
+                cursor.copy_expert(comando, buffer)
+            return
+        lista_colunas = ', '.join(f'"{c}"' for c in colunas)
+        placeholder = '(' + ', '.join(['%s'] * len(colunas)) + ')'
+        self._insert_many(f'INSERT INTO "{tabela}" ({lista_colunas})', placeholder, linhas)
+
+    def marcar_dados_alterados(self):
+        """Uma vez por lote, na transação do lote (veja BaseRepository._dados_alterados)."""
+        self._dados_alterados()
+
+    def ler_checkpoint(self, chave):
+        query = 'SELECT registros, concluido FROM "ImportacaoCheckpoint" WHERE chave = %s'
+        result = self._execute_query(query, [chave], fetch="one")
+        return (result[0], bool(result[1])) if result else (0, False)
+
+    def salvar_checkpoint(self, chave, arquivo, registros, concluido=False):
+        query = """
+            INSERT INTO "ImportacaoCheckpoint" (chave, arquivo, registros, concluido, atualizado_em)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (chave) DO UPDATE SET
+                registros = EXCLUDED.registros, concluido = EXCLUDED.concluido, atualizado_em = EXCLUDED.atualizado_em
+        """
+        self._execute_query(query, [chave, arquivo, registros, concluido, timezone.now()])
+
+    def apagar_checkpoint(self, chave):
+        return self._execute_query('DELETE FROM "ImportacaoCheckpoint" WHERE chave = %s', [chave], fetch="rowcount")
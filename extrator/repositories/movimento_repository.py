@@ -1,4 +1,4 @@
-from django.db import transaction
+from django.db import connection, transaction
 from .base_repository import BaseRepository
 
 
@@ -19,25 +19,14 @@ class MovimentoRepository(BaseRepository):
             'PENDENTE',
             fornecedor_id,
             faturado_id
-        ])
+        ], fetch="valor")
 
-        query_m2m = 'INSERT INTO "MovimentoContas_has_Classificacao" ("MovimentoContas_idMovimentoContas", "Classificacao_idClassificacao") VALUES (%s, %s)'
-        for class_id in classificacao_ids:
-            self._execute_query(query_m2m, [movimento_id, class_id])
-
-        query_par = """
-            INSERT INTO "ParcelasContas"
-            (identificacao, datavencimento, valorparcela, valorpago, valorsaldo, statusparcela, "MovimentoContas_idMovimentoContas")
-            VALUES (%s, %s, %s, 0.0, %s, 'PENDENTE', %s)
-        """
-        for i, p_data in enumerate(parcelas_data):
-            self._execute_query(query_par, [
-                f"{i + 1}/{len(parcelas_data)}",
-                p_data['data_vencimento'],
-                p_data['valor_total'],
-                p_data['valor_total'],
-                movimento_id
-            ])
+        parcelas = [
+            (f"{i + 1}/{len(parcelas_data)}", p_data['data_vencimento'], p_data['valor_total'], p_data['valor_total'])
+            for i, p_data in enumerate(parcelas_data)
+        ]
+        self._inserir_filhos(movimento_id, parcelas, classificacao_ids)
+        self._dados_alterados()
 
         return movimento_id
 
@@ -56,59 +45,110 @@ class MovimentoRepository(BaseRepository):
             total_parcelas,
             cliente_id,
             cliente_id
-        ])
+        ], fetch="valor")
 
-        query_m2m = 'INSERT INTO "MovimentoContas_has_Classificacao" ("MovimentoContas_idMovimentoContas", "Classificacao_idClassificacao") VALUES (%s, %s)'
-        for class_id in classificacoes_ids:
-            self._execute_query(query_m2m, [movimento_id, class_id])
-
-        query_par = """
-                INSERT INTO "ParcelasContas"
-                (identificacao, datavencimento, valorparcela, valorpago, valorsaldo, statusparcela, "MovimentoContas_idMovimentoContas")
-                VALUES (%s, %s, %s, 0.0, %s, 'PENDENTE', %s)
-            """
-        for p_data in parcelas_data:
-            self._execute_query(query_par, [
-                p_data['identificacao'],
-                p_data['datavencimento'],
-                p_data['valorparcela'],
-                p_data['valorparcela'],
-                movimento_id
-            ])
+        parcelas = [
+            (p_data['identificacao'], p_data['datavencimento'], p_data['valorparcela'], p_data['valorparcela'])
+            for p_data in parcelas_data
+        ]
+        self._inserir_filhos(movimento_id, parcelas, classificacoes_ids)
+        self._dados_alterados()
 
         return movimento_id
 
-    def list_all_movements(self, order_by='-dataemissao'):
-        order_sql = self._get_order_clause(order_by)
-        query = f"""
-            {self._build_base_query()}
-            ORDER BY {order_sql}
+    def _inserir_filhos(self, movimento_id, parcelas, classificacao_ids):
+        """
+        Parcelas (identificacao, vencimento, valor, saldo) e vínculos de classificação
+        em INSERTs multi-linha: uma ida ao banco por tabela, não uma por linha.
+        """
+        self._insert_many(
+            'INSERT INTO "MovimentoContas_has_Classificacao" ("MovimentoContas_idMovimentoContas", "Classificacao_idClassificacao")',
+            '(%s, %s)',
+            [(movimento_id, class_id) for class_id in classificacao_ids]
+        )
+        self._insert_many(
+            """INSERT INTO "ParcelasContas"
+            (identificacao, datavencimento, valorparcela, valorpago, valorsaldo, statusparcela, "MovimentoContas_idMovimentoContas")""",
+            "(%s, %s, %s, 0.0, %s, 'PENDENTE', %s)",
+            [(*parcela, movimento_id) for parcela in parcelas]
+        )
+
+    # Parâmetro de ordenação da URL -> (coluna SQL, posição da coluna na linha de _build_base_query)
+    ORDENACOES = {
+        'dataemissao': ('mc.dataemissao', 1),
+        'numeronotafiscal': ('mc.numeronotafiscal', 2),
+        'tipo': ('mc.tipo', 3),
+        'fornecedor_cliente': ('p_fc.razaosocial', 4),
+        'faturado': ('p_f.razaosocial', 5),
+        'valortotal': ('mc.valortotal', 6),
+        'status': ('mc.status', 7),
+    }
+
+    def list_movements_page(self, termo=None, order_by='-dataemissao', apos=None, antes=None, limite=None):
+        """
+        Uma página de movimentos (todos ou filtrados por Nº Nota, Fornecedor/Cliente ou Faturado),
+        paginada por keyset na coluna de ordenação com o id como desempate.
+        """
+        campo = order_by.lstrip('-')
+        if campo not in self.ORDENACOES:
+            # Padrão: Data de emissão decrescente (mais recente primeiro)
+            campo, order_by = 'dataemissao', '-dataemissao'
+        coluna, posicao = self.ORDENACOES[campo]
+
+        filtros, params = [], []
+        if termo:
+            # Os nomes são filtrados em "Pessoas" antes do join: assim cada trecho do OR usa um
+            # índice (trigram em numeronotafiscal/razaosocial, FKs do movimento) em vez de varrer o join
+            operador = self._get_ilike_operator()
+            filtros.append(f"""
+                mc.numeronotafiscal {operador} %s
+                OR mc."Pessoas_idFornecedorCliente" IN (SELECT id FROM "Pessoas" WHERE razaosocial {operador} %s)
+                OR mc."Pessoas_idFaturado" IN (SELECT id FROM "Pessoas" WHERE razaosocial {operador} %s)
+            """)
+            params = [f"%{termo}%"] * 3
+
+        extras = {'limite': limite} if limite else {}
+        return self._paginar(
+            self._build_base_query(),
+            (coluna, 'mc.id', order_by.startswith('-')),
+            lambda linha: (linha[posicao], linha[0]),
+            filtros=filtros, params=params, apos=apos, antes=antes, **extras
+        )
+
+    def search_produtos_page(self, consulta, apos=None, antes=None, limite=None):
+        """
+        Busca textual na descrição dos produtos (ex: "glifosato", "diesel S10"), ordenada por
+        relevância. No PostgreSQL usa a coluna tsvector em português (com radicalização) e o
+        índice GIN; nos demais bancos, cada palavra da consulta vira um LIKE.
+        Cada linha traz as colunas de _build_base_query, a descrição e a relevância.
         """
-        return self._execute_query(query, fetch="all")
-
-    def _get_order_clause(self, order_param):
-        """Traduz ordenação da URL para SQL seguro, considerando os aliases das tabelas."""
-        mapeamento = {
-            'dataemissao': 'mc.dataemissao ASC',
-            '-dataemissao': 'mc.dataemissao DESC',
-            'numeronotafiscal': 'mc.numeronotafiscal ASC',
-            '-numeronotafiscal': 'mc.numeronotafiscal DESC',
-            'tipo': 'mc.tipo ASC',
-            '-tipo': 'mc.tipo DESC',
-            'fornecedor_cliente': 'p_fc.razaosocial ASC',
-            '-fornecedor_cliente': 'p_fc.razaosocial DESC',
-            'faturado': 'p_f.razaosocial ASC',
-            '-faturado': 'p_f.razaosocial DESC',
-            'valortotal': 'mc.valortotal ASC',
-            '-valortotal': 'mc.valortotal DESC',
-            'status': 'mc.status ASC',
-            '-status': 'mc.status DESC'
-        }
-        # Padrão: Data de emissão decrescente (mais recente primeiro)
-        return mapeamento.get(order_param, 'mc.dataemissao DESC')
-    
-    def _build_base_query(self):
-        return """
+        extras = {'limite': limite} if limite else {}
+        if connection.vendor == 'postgresql':
+            # Relevância arredondada em numeric: o valor volta exato no cursor do keyset
+            colunas = "mc.descricao, round(ts_rank_cd(mc.descricao_busca, websearch_to_tsquery('portuguese', %s))::numeric, 6) AS relevancia"
+            query_base = f"""
+                SELECT * FROM (
+                    {self._build_base_query(colunas)}
+                    WHERE mc.descricao_busca @@ websearch_to_tsquery('portuguese', %s)
+                ) AS resultado
+            """
+            return self._paginar(
+                query_base, ('relevancia', 'id', True), lambda linha: (linha[9], linha[0]),
+                params=[consulta, consulta], apos=apos, antes=antes, **extras
+            )
+
+        operador = self._get_ilike_operator()
+        palavras = consulta.split()
+        return self._paginar(
+            self._build_base_query("mc.descricao, NULL AS relevancia"),
+            ('mc.dataemissao', 'mc.id', True), lambda linha: (linha[1], linha[0]),
+            filtros=[f"mc.descricao {operador} %s"] * len(palavras), params=[f"%{p}%" for p in palavras],
+            apos=apos, antes=antes, **extras
+        )
+
+    def _build_base_query(self, colunas_extras=None):
+        extras = f",\n                {colunas_extras}" if colunas_extras else ""
+        return f"""
             SELECT
                 mc.id,
                 mc.dataemissao,
@@ -117,22 +157,8 @@ class MovimentoRepository(BaseRepository):
                 p_fc.razaosocial AS fornecedor_cliente,
                 p_f.razaosocial AS faturado,
                 mc.valortotal,
-                mc.status
+                mc.status{extras}
             FROM "MovimentoContas" mc
             JOIN "Pessoas" p_fc ON mc."Pessoas_idFornecedorCliente" = p_fc.id
             JOIN "Pessoas" p_f ON mc."Pessoas_idFaturado" = p_f.id
         """
-        
-    def search_movements(self, termo, order_by='-dataemissao'):
-        """Busca por Nº Nota, Nome do Fornecedor/Cliente ou Nome do Faturado."""
-        order_sql = self._get_order_clause(order_by)
-        query = f"""
-            {self._build_base_query()}
-            WHERE 
-                mc.numeronotafiscal ILIKE %s OR
-                p_fc.razaosocial ILIKE %s OR
-                p_f.razaosocial ILIKE %s
-            ORDER BY {order_sql}
-        """
-        param = f"%{termo}%"
-        return self._execute_query(query, [param, param, param], fetch="all")
\ No newline at end of file
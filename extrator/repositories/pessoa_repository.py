@@ -4,7 +4,7 @@ class PessoaRepository(BaseRepository):
 
     def find_by_documento(self, documento):
         query = """SELECT id FROM "Pessoas" WHERE documento = %s"""
-        result = self._execute_query(query, [documento], fetch="one")
+        result = self._execute_prepared('pessoa_por_documento', query, [documento], fetch="one")
         return result[0] if result else None
 
     def create(self, tipo, detail):
@@ -18,7 +18,9 @@ class PessoaRepository(BaseRepository):
             detail.get('fantasia'),
             detail.get('documento') or detail.get('cnpj') or detail.get('cpf/cnpj')
         ]
-        return self._execute_query(query, params)
+        pessoa_id = self._execute_query(query, params, fetch="valor")
+        self._dados_alterados()
+        return pessoa_id
 
     def find_by_id(self, pk):
         query = """
@@ -34,6 +36,7 @@ class PessoaRepository(BaseRepository):
         """
         params = [tipo, razaosocial, fantasia, documento, pk]
         self._execute_query(query, params)
+        self._dados_alterados()
 
     def toggle_status(self, pk):
         query = """
@@ -42,6 +45,7 @@ class PessoaRepository(BaseRepository):
             WHERE id = %s
         """
         self._execute_query(query, [pk])
+        self._dados_alterados()
 
     def list_active_clients(self):
         query = """
@@ -52,42 +56,31 @@ class PessoaRepository(BaseRepository):
 
     # --- NOVOS MÉTODOS DA ETAPA 4 ---
 
-    def _get_order_clause(self, order_param):
-        mapeamento = {
-            'razaosocial': 'razaosocial ASC',
-            '-razaosocial': 'razaosocial DESC',
-            'documento': 'documento ASC',
-            '-documento': 'documento DESC',
-            'tipo': 'tipo ASC',
-            '-tipo': 'tipo DESC',
-            'status': 'status ASC',
-            '-status': 'status DESC'
-        }
-        return mapeamento.get(order_param, 'razaosocial ASC')
+    # Parâmetro de ordenação da URL -> (coluna SQL, posição da coluna na linha)
+    ORDENACOES = {
+        'razaosocial': ('razaosocial', 1),
+        'documento': ('documento', 2),
+        'tipo': ('tipo', 3),
+        'status': ('status', 4),
+    }
 
-    def list_all_active(self, order_by='razaosocial'):
-        order_sql = self._get_order_clause(order_by)
-        query = f"""
-            SELECT id, razaosocial, documento, tipo, status 
-            FROM "Pessoas" 
-            WHERE status = 'ATIVO' 
-            ORDER BY {order_sql}
-        """
-        return self._execute_query(query, fetch="all")
+    def list_active_page(self, termo=None, order_by='razaosocial', apos=None, antes=None, limite=None, contar=False):
+        """Uma página das pessoas ativas, opcionalmente filtradas por nome ou documento."""
+        campo = order_by.lstrip('-')
+        if campo not in self.ORDENACOES:
+            campo, order_by = 'razaosocial', 'razaosocial'
+        coluna, posicao = self.ORDENACOES[campo]
 
-    def search_active(self, termo, order_by='razaosocial'):
-        order_sql = self._get_order_clause(order_by)
-        op = self._get_ilike_operator()
-        query = f"""
-            SELECT id, razaosocial, documento, tipo, status 
-            FROM "Pessoas" 
-            WHERE (razaosocial {op} %s OR documento {op} %s)
-            AND status = 'ATIVO'
-            ORDER BY {order_sql}
-        """
-        param = f"%{termo}%"
-        return self._execute_query(query, [param, param], fetch="all")
-    
-    def list_all(self):
-        # Mantido apenas para compatibilidade se algo ainda chamar, mas o ideal é usar list_all_active na view
-        return self.list_all_active()
\ No newline at end of file
+        filtros, params = ["status = 'ATIVO'"], []
+        if termo:
+            op = self._get_ilike_operator()
+            filtros.append(f"razaosocial {op} %s OR documento {op} %s")
+            params = [f"%{termo}%"] * 2
+
+        extras = {'limite': limite} if limite else {}
+        return self._paginar(
+            'SELECT id, razaosocial, documento, tipo, status FROM "Pessoas"',
+            (coluna, 'id', order_by.startswith('-')),
+            lambda linha: (linha[posicao], linha[0]),
+            filtros=filtros, params=params, apos=apos, antes=antes, contar=contar, **extras
+        )
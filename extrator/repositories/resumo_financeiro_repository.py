@@ -0,0 +1,23 @@
+from django.db import connection
+
+from .base_repository import BaseRepository
+
+VIEWS_RESUMO = ('ResumoMovimentos', 'ResumoClassificacoes', 'ResumoVencimentos')
+
+
+class ResumoFinanceiroRepository(BaseRepository):
+    """Views de resumo (migração 0008) consultadas pelos agentes de RAG para totais e agregados."""
+
+    def atualizar(self):
+        """
+        Recalcula as views materializadas sem bloquear as leituras em andamento.
+        No SQLite as views são comuns e estão sempre atualizadas.
+        """
+        if connection.vendor != 'postgresql':
+            return False
+        for nome in VIEWS_RESUMO:
+            self._execute_query(f'REFRESH MATERIALIZED VIEW CONCURRENTLY "{nome}"')
+        # Respostas do RAG geradas entre a escrita e este REFRESH usaram os resumos antigos
+        # e foram guardadas com a versão nova: incrementar de novo as invalida
+        self._dados_alterados()
+        return True
@@ -1,68 +1,275 @@
-from celery import shared_task, states
+import contextvars
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from celery import shared_task, states, chain
 from celery.exceptions import Ignore
+from celery.signals import task_prerun, task_postrun
+from kombu.exceptions import OperationalError
 from agents.agent_extrator.processador_pdf import AgentExtrator
+from agents.agent_extrator.extrator_regras import extrair_danfe, LIMIAR_CONFIANCA
+from agents.agent_extrator.parser_paralelo import extrair_texto_paralelo
 from agents.agent_fraud_analysis.analyzer import AgentFraudCompliance
+from agents.agent_rag.consultor_simples import AgentConsultorSimples
+from agents.agent_rag.consultor_embeddings import AgentConsultorEmbeddings
 from .repositories.pessoa_repository import PessoaRepository
 from .repositories.classificacao_repository import ClassificacaoRepository
+from .repositories.extracao_cache_repository import ExtracaoCacheRepository
+from .repositories.extracao_pendente_repository import ExtracaoPendenteRepository
+from .repositories.resumo_financeiro_repository import ResumoFinanceiroRepository
+from .blob_store import abrir_blob, garantir_local
+from .instrumentacao import iniciar_coleta, encerrar_coleta
 
 
-import base64
-from celery import shared_task, states
-from celery.exceptions import Ignore
-from agents.agent_extrator.processador_pdf import AgentExtrator
-from agents.agent_fraud_analysis.analyzer import AgentFraudCompliance
-from .repositories.pessoa_repository import PessoaRepository
-from .repositories.classificacao_repository import ClassificacaoRepository
+_coletas_por_tarefa = {}
+
+
+@task_prerun.connect
+def _iniciar_coleta_consultas(task_id=None, **kwargs):
+    _coletas_por_tarefa[task_id] = iniciar_coleta()
+
+
+@task_postrun.connect
+def _encerrar_coleta_consultas(task_id=None, task=None, **kwargs):
+    token = _coletas_por_tarefa.pop(task_id, None)
+    if token is not None:
+        encerrar_coleta(token, f'tarefa {task.name}[{task_id}]')
+
+
+def versao_cache_extracao():
+    """
+    Versão de prompt/modelo dos dois agentes. Qualquer mudança invalida o cache.
+    O prompt da análise de risco usa a data de hoje (emissão futura é suspeita), então a
+    data também entra na versão: o parecer em cache vale só para o dia em que foi gerado.
+    """
+    hoje = datetime.now().strftime("%Y-%m-%d")
+    return (f"extrator:{AgentExtrator.MODELO}:v{AgentExtrator.VERSAO_PROMPT}|"
+            f"risco:{AgentFraudCompliance.MODELO}:v{AgentFraudCompliance.VERSAO_PROMPT}:{hoje}")
+
+
+def _validar_no_banco(dados_extraidos):
+    """Etapa de validação: só depende do JSON extraído, não da análise de risco."""
+    pessoa_repo = PessoaRepository()
+    classificacao_repo = ClassificacaoRepository()
+
+    fornecedor_id = pessoa_repo.find_by_documento(dados_extraidos['fornecedor']['cnpj'])
+    faturado_id = pessoa_repo.find_by_documento(dados_extraidos['faturado']['cpf/cnpj'])
+
+    # Uma consulta para todas as classificações da nota, em vez de uma por descrição
+    ids_por_descricao = classificacao_repo.find_ids_by_descricoes(dados_extraidos['classificacoes_despesa'])
+    classificacoes_validadas = []
+    for desc in dados_extraidos['classificacoes_despesa']:
+        class_id = ids_por_descricao.get(desc)
+        classificacoes_validadas.append({
+                                            'status': 'EXISTE', 'id': class_id, 'detail': {'descricao': desc}
+                                        } if class_id else {
+            'status': 'NÃO EXISTE', 'id': None, 'detail': {'descricao': desc}
+        })
+
+    return {
+        'fornecedor': {'status': 'EXISTE', 'id': fornecedor_id,
+                       'detail': dados_extraidos['fornecedor']} if fornecedor_id else {'status': 'NÃO EXISTE',
+                                                                                       'id': None,
+                                                                                       'detail': dados_extraidos[
+                                                                                           'fornecedor']},
+        'faturado': {'status': 'EXISTE', 'id': faturado_id,
+                     'detail': dados_extraidos['faturado']} if faturado_id else {'status': 'NÃO EXISTE', 'id': None,
+                                                                                 'detail': dados_extraidos[
+                                                                                     'faturado']},
+        'classificacoes': classificacoes_validadas,
+    }
+
+
+def _validar_no_banco_em_thread(dados_extraidos):
+    # Cada thread recebe sua própria conexão do Django; fecha ao terminar para não vazar
+    try:
+        return _validar_no_banco(dados_extraidos)
+    finally:
+        connection.close()
+
+
+def _cronometrar(tempos, etapa, func, *args):
+    inicio = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        tempos[etapa] = round((time.perf_counter() - inicio) * 1000, 1)
+
+
+@shared_task
+def parsear_pdf_task(pdf_ref):
+    """
+    Etapa de CPU (fila 'pdf'): cache, regras da DANFE e leitura do texto do PDF.
+    Nunca levanta exceção: o erro segue no resultado para a etapa seguinte da cadeia
+    marcar a falha na tarefa que o frontend acompanha.
+    """
+    tempos = {}
+    try:
+        # A referência do blob é o SHA-256 do PDF: uploads repetidos reaproveitam o resultado
+        em_cache = _cronometrar(tempos, 'cache', ExtracaoCacheRepository().find, pdf_ref, versao_cache_extracao())
+        if em_cache:
+            return {'pdf_ref': pdf_ref, 'em_cache': em_cache, 'timings': tempos}
+
+        # O PDF é lido do disco local via mmap, sem trafegar pelo broker (baixado do banco se preciso)
+        with abrir_blob(pdf_ref) as pdf_stream:
+            try:
+                dados_regras, confianca = _cronometrar(tempos, 'regras', extrair_danfe, pdf_stream)
+            except Exception:
+                # Layout inesperado nas regras não derruba o documento: segue para o Gemini
+                dados_regras, confianca = None, 0
+        if confianca >= LIMIAR_CONFIANCA:
+            return {'pdf_ref': pdf_ref, 'dados_regras': dados_regras, 'timings': tempos}
+
+        texto, info_leitura = _cronometrar(tempos, 'leitura_pdf', extrair_texto_paralelo,
+                                           garantir_local(pdf_ref))
+        return {'pdf_ref': pdf_ref, 'texto': texto, 'info_leitura': info_leitura, 'timings': tempos}
+    except Exception as e:
+        return {'pdf_ref': pdf_ref, 'erro': str(e), 'timings': tempos}
+
 
 @shared_task(bind=True)
-def processar_pdf_task(self, pdf_content_b64, api_key):
+def processar_pdf_task(self, documento, api_key):
+    """
+    Etapa de rede (fila 'llm'), recebe o resultado de parsear_pdf_task. Grafo de etapas:
+        [parse] -> extração (regras ou Gemini) -> { análise de risco || validação no banco }
+    A validação roda em paralelo com a segunda chamada ao Gemini.
+    O tempo de cada etapa (ms) vai no meta de PROGRESS e no resultado, em 'timings'.
+    """
+    tempos = dict(documento.get('timings', {}))
+    inicio_total = time.perf_counter()
     try:
-        # Decodifica Base64 para bytes
-        pdf_content_bytes = base64.b64decode(pdf_content_b64)
-
-        self.update_state(state='PROGRESS', meta={'status': 'Agente 1 (Gemini) está extraindo os dados...'})
-        agente_extrator = AgentExtrator(api_key=api_key)
-        dados_extraidos = agente_extrator.executar(pdf_content_bytes)
-
-        self.update_state(state='PROGRESS', meta={'status': 'Agente 2 (Gemini) está auditando os riscos...'})
-        agente_analista = AgentFraudCompliance(dados_extraidos, api_key=api_key)
-        analise_risco = agente_analista.analisar()
-
-        self.update_state(state='PROGRESS', meta={'status': 'Validando com o banco de dados...'})
-        pessoa_repo = PessoaRepository()
-        classificacao_repo = ClassificacaoRepository()
-
-        fornecedor_id = pessoa_repo.find_by_documento(dados_extraidos['fornecedor']['cnpj'])
-        faturado_id = pessoa_repo.find_by_documento(dados_extraidos['faturado']['cpf/cnpj'])
-
-        classificacoes_validadas = []
-        for desc in dados_extraidos['classificacoes_despesa']:
-            class_id = classificacao_repo.find_by_descricao(desc)
-            classificacoes_validadas.append({
-                                                'status': 'EXISTE', 'id': class_id, 'detail': {'descricao': desc}
-                                            } if class_id else {
-                'status': 'NÃO EXISTE', 'id': None, 'detail': {'descricao': desc}
-            })
-
-        validacao_db = {
-            'fornecedor': {'status': 'EXISTE', 'id': fornecedor_id,
-                           'detail': dados_extraidos['fornecedor']} if fornecedor_id else {'status': 'NÃO EXISTE',
-                                                                                           'id': None,
-                                                                                           'detail': dados_extraidos[
-                                                                                               'fornecedor']},
-            'faturado': {'status': 'EXISTE', 'id': faturado_id,
-                         'detail': dados_extraidos['faturado']} if faturado_id else {'status': 'NÃO EXISTE', 'id': None,
-                                                                                     'detail': dados_extraidos[
-                                                                                         'faturado']},
-            'classificacoes': classificacoes_validadas,
-        }
+        if documento.get('erro'):
+            raise Exception(f"Falha ao ler o PDF: {documento['erro']}")
+
+        pdf_ref = documento['pdf_ref']
+        em_cache = documento.get('em_cache')
+
+        if em_cache:
+            origem_extracao = 'cache'
+            dados_extraidos = em_cache['extracted_data']
+            analise_risco = em_cache['risk_analysis']
+
+            self.update_state(state='PROGRESS', meta={'status': 'Validando com o banco de dados...', 'timings': tempos})
+            validacao_db = _cronometrar(tempos, 'validacao', _validar_no_banco, dados_extraidos)
+        else:
+            if documento.get('dados_regras') is not None:
+                origem_extracao = 'regras'
+                dados_extraidos = documento['dados_regras']
+            else:
+                self.update_state(state='PROGRESS', meta={'status': 'Agente 1 (Gemini) está extraindo os dados...', 'timings': tempos})
+                agente_extrator = AgentExtrator(api_key=api_key)
+                dados_extraidos = _cronometrar(tempos, 'extracao', agente_extrator.extrair_com_llm, documento['texto'])
+                origem_extracao = agente_extrator.origem
+
+            self.update_state(state='PROGRESS', meta={'status': 'Agente 2 (Gemini) está auditando os riscos e validando com o banco...', 'timings': tempos})
+            agente_analista = AgentFraudCompliance(dados_extraidos, api_key=api_key)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futuro_risco = executor.submit(_cronometrar, tempos, 'analise_risco', agente_analista.analisar)
+                # Com o contexto copiado, as consultas da thread entram na coleta da tarefa
+                futuro_validacao = executor.submit(contextvars.copy_context().run, _cronometrar, tempos, 'validacao',
+                                                   _validar_no_banco_em_thread, dados_extraidos)
+                analise_risco = futuro_risco.result()
+                validacao_db = futuro_validacao.result()
+
+            # Análises que falharam não são guardadas, para serem refeitas no próximo envio
+            if not str(analise_risco.get('summary', '')).startswith(AgentFraudCompliance.PREFIXO_ERRO):
+                ExtracaoCacheRepository().save(pdf_ref, versao_cache_extracao(), dados_extraidos, analise_risco)
+
+        tempos['total'] = round((time.perf_counter() - inicio_total) * 1000, 1)
 
-        return {
+        resultado = {
             'extracted_data': dados_extraidos,
             'risk_analysis': analise_risco,
-            'validation_results': validacao_db
+            'validation_results': validacao_db,
+            'cache_hit': bool(em_cache),
+            'extraction_source': origem_extracao,
+            'timings': tempos
         }
+        # Fica disponível para confirmar_lancamento_view pelo id da tarefa (a sessão guarda só o id)
+        ExtracaoPendenteRepository().save(self.request.id, resultado)
+        return resultado
+    except Exception as e:
+        self.update_state(state=states.FAILURE, meta={'exc_type': type(e).__name__, 'exc_message': str(e),
+                                                      'status': f'Falha no processamento: {str(e)}',
+                                                      'timings': tempos})
+        raise Ignore()
+
+
+def pipeline_processamento_pdf(pdf_ref, api_key):
+    """
+    Cadeia parse (CPU, fila 'pdf') -> LLM (rede, fila 'llm'). O id da tarefa acompanhada
+    pelo frontend é o da última etapa, que é o retornado pelo apply_async da cadeia.
+    """
+    return chain(parsear_pdf_task.s(pdf_ref), processar_pdf_task.s(api_key))
+
+
+AGENTES_RAG = {
+    'simples': AgentConsultorSimples,
+    'embeddings': AgentConsultorEmbeddings,
+}
+# Intervalo mínimo (s) entre publicações da resposta parcial: cada uma é uma escrita no Redis
+INTERVALO_RESPOSTA_PARCIAL = 0.25
+
+
+@shared_task(bind=True)
+def consultar_rag_task(self, tipo_agente, pergunta, api_key):
+    """
+    Pergunta ao chat de RAG fora do processo web (fila 'rag'). A resposta parcial vai no
+    meta de PROGRESS, em 'resposta', à medida que o modelo a gera; o resultado é {'resposta': ...}.
+    """
+    try:
+        self.update_state(state='PROGRESS', meta={'status': 'Consultando o banco de dados...'})
+        agente = AGENTES_RAG[tipo_agente](api_key=api_key)
+
+        partes = []
+        ultima_publicacao = time.monotonic()
+        for parte in agente.executar_stream(pergunta):
+            partes.append(parte)
+            if time.monotonic() - ultima_publicacao >= INTERVALO_RESPOSTA_PARCIAL:
+                self.update_state(state='PROGRESS', meta={'status': 'Gerando a resposta...', 'resposta': ''.join(partes)})
+                ultima_publicacao = time.monotonic()
+        return {'resposta': ''.join(partes)}
     except Exception as e:
         self.update_state(state=states.FAILURE, meta={'exc_type': type(e).__name__, 'exc_message': str(e),
-                                                      'status': f'Falha no processamento: {str(e)}'})
+                                                      'status': f'Falha na consulta: {str(e)}'})
         raise Ignore()
+
+
+# Lançamentos próximos (um lote de PDFs, vários cadastros seguidos) geram uma única atualização
+ATRASO_ATUALIZACAO_RESUMOS = 30
+CHAVE_ATUALIZACAO_RESUMOS = 'resumos-financeiros:agendado'
+
+
+@shared_task
+def atualizar_resumos_financeiros_task():
+    # Libera o agendamento antes do REFRESH: uma escrita confirmada durante a atualização
+    # agenda outra, em vez de ficar de fora desta e de nenhuma seguinte
+    try:
+        redis.from_url(settings.CELERY_RESULT_BACKEND).delete(CHAVE_ATUALIZACAO_RESUMOS)
+    except redis.RedisError:
+        pass
+    return ResumoFinanceiroRepository().atualizar()
+
+
+def agendar_atualizacao_resumos():
+    """
+    Agenda, após o commit da transação atual, a atualização das views materializadas de
+    resumo. Só uma atualização fica na fila por vez; as escritas que chegam enquanto ela
+    espera entram no mesmo REFRESH. Sem Redis, os resumos ficam defasados até a próxima
+    escrita ou até o comando atualizar_resumos.
+    """
+    if connection.vendor != 'postgresql':
+        return
+
+    def _agendar():
+        try:
+            cliente = redis.from_url(settings.CELERY_RESULT_BACKEND)
+            if cliente.set(CHAVE_ATUALIZACAO_RESUMOS, 1, nx=True, ex=ATRASO_ATUALIZACAO_RESUMOS * 10):
+                atualizar_resumos_financeiros_task.apply_async(countdown=ATRASO_ATUALIZACAO_RESUMOS)
+        except (redis.RedisError, OperationalError):
+            pass
+
+    transaction.on_commit(_agendar)
@@ -1,3 +1,83 @@
-from django.test import TestCase
+import fitz
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from agents.agent_extrator.extrator_regras import LIMIAR_CONFIANCA, _data_iso, _valor_float, extrair_danfe
+
+
+def _danfe_pdf(data_emissao='15/01/2024', duplicatas=(('15/02/2024', '750,00'), ('15/03/2024', '750,00'))):
+    """Monta uma DANFE mínima (rótulo em cima, valor embaixo), com ou sem o quadro FATURA."""
+    linhas = [
+        (40, 40, 'RECEBEMOS DE AGRO INSUMOS LTDA OS PRODUTOS CONSTANTES DA NOTA FISCAL'),
+        (40, 70, 'AGRO INSUMOS LTDA'),
+        (40, 82, 'CNPJ: 12.345.678/0001-90'),
+        (400, 70, 'Nº 000.123.456'),
+        (40, 120, 'DESTINATÁRIO / REMETENTE'),
+        (40, 140, 'NOME / RAZÃO SOCIAL'),
+        (40, 152, 'FAZENDA BOA VISTA'),
+        (300, 140, 'CNPJ / CPF'),
+        (300, 152, '98.765.432/0001-10'),
+        (450, 140, 'DATA DA EMISSÃO'),
+        (450, 152, data_emissao),
+    ]
+    if duplicatas is not None:
+        linhas.append((40, 190, 'FATURA / DUPLICATA'))
+        for indice, (vencimento, valor) in enumerate(duplicatas):
+            linhas.append((40 + 150 * indice, 202, f'{indice + 1:03d} {vencimento} R$ {valor}'))
+    linhas += [
+        (40, 240, 'CÁLCULO DO IMPOSTO'),
+        (400, 260, 'VALOR TOTAL DA NOTA'),
+        (400, 272, '1.500,00'),
+        (40, 310, 'DESCRIÇÃO DO PRODUTO / SERVIÇO'),
+        (300, 310, 'QUANT.'),
+        (40, 324, 'ADUBO NPK 10-10-10'),
+        (300, 324, '30'),
+        (40, 380, 'DADOS ADICIONAIS'),
+    ]
+    with fitz.open() as documento:
+        pagina = documento.new_page()
+        for x, y, texto in linhas:
+            pagina.insert_text((x, y), texto, fontsize=8)
+        return documento.tobytes()
+
+
+class ExtratorRegrasTests(SimpleTestCase):
+
+    def test_layout_padrao(self):
+        dados, confianca = extrair_danfe(_danfe_pdf())
+
+        self.assertGreaterEqual(confianca, LIMIAR_CONFIANCA)
+        self.assertEqual(dados['fornecedor']['razao_social'], 'AGRO INSUMOS LTDA')
+        self.assertEqual(dados['fornecedor']['cnpj'], '12.345.678/0001-90')
+        self.assertEqual(dados['faturado']['nome_completo'], 'FAZENDA BOA VISTA')
+        self.assertEqual(dados['faturado']['cpf/cnpj'], '98.765.432/0001-10')
+        self.assertEqual(dados['numero_nota_fiscal'], '123456')
+        self.assertEqual(dados['data_emissao'], '2024-01-15')
+        self.assertEqual(dados['descricao_produtos'], ['ADUBO NPK 10-10-10'])
+        self.assertEqual(dados['classificacoes_despesa'], ['INSUMOS AGRÍCOLAS'])
+        self.assertEqual(dados['parcelas'], [
+            {'data_vencimento': '2024-02-15', 'valor_total': 750.0},
+            {'data_vencimento': '2024-03-15', 'valor_total': 750.0},
+        ])
+
+    def test_sem_fatura_vira_parcela_unica_a_vista(self):
+        dados, confianca = extrair_danfe(_danfe_pdf(duplicatas=None))
+
+        self.assertGreaterEqual(confianca, LIMIAR_CONFIANCA)
+        self.assertEqual(dados['parcelas'], [{'data_vencimento': '2024-01-15', 'valor_total': 1500.0}])
+
+    def test_data_de_emissao_invalida_baixa_a_confianca(self):
+        dados, confianca = extrair_danfe(_danfe_pdf(data_emissao='31/02/2024'))
+
+        self.assertIsNone(dados['data_emissao'])
+        self.assertLess(confianca, LIMIAR_CONFIANCA)
+
+    def test_duplicata_invalida_baixa_a_confianca(self):
+        dados, confianca = extrair_danfe(_danfe_pdf(duplicatas=(('15/02/2024', '750,00'), ('31/13/2024', '750,00'))))
+
+        self.assertEqual(dados['parcelas'], [{'data_vencimento': '2024-02-15', 'valor_total': 750.0}])
+        self.assertLess(confianca, LIMIAR_CONFIANCA)
+
+    def test_conversoes_invalidas_retornam_none(self):
+        self.assertIsNone(_data_iso('31/02/2024'))
+        self.assertIsNone(_valor_float('1.2.3,4,5'))
+        self.assertEqual(_valor_float('1.234,56'), 1234.56)
@@ -5,11 +5,17 @@ urlpatterns = [
     path('', views.upload_view, name='upload_view'),
     path('processar/', views.processar_pdf_view, name='processar_pdf'),
     path('task_status/<str:task_id>/', views.task_status_view, name='task_status'),
+    path('processar-lote/', views.processar_lote_view, name='processar_lote'),
+    path('batch_status/<str:batch_id>/', views.batch_status_view, name='batch_status'),
+    path('task_events/<str:task_id>/', views.task_events_view, name='task_events'),
+    path('batch_events/<str:batch_id>/', views.batch_events_view, name='batch_events'),
     path('confirmar-lancamento/', views.confirmar_lancamento_view, name='confirmar_lancamento'),
     path('consulta/simples/', views.rag_simples_view, name='rag_simples_view'),
     path('processar-consulta/simples/', views.processar_rag_simples_view, name='processar_rag_simples'),
+    path('processar-consulta/simples/stream/', views.processar_rag_simples_stream_view, name='processar_rag_simples_stream'),
     path('consulta/embeddings/', views.rag_embeddings_view, name='rag_embeddings_view'),
     path('processar-consulta/embeddings/', views.processar_rag_embeddings_view, name='processar_rag_embeddings'),
+    path('processar-consulta/embeddings/stream/', views.processar_rag_embeddings_stream_view, name='processar_rag_embeddings_stream'),
     path('configurar-api/', views.config_api_view, name='config_api'),
   ##path('sistema/criar-admin-secreto/', views.criar_admin_view, name='criar_admin_trigger'),
   ##path('sistema/popular-banco-secreto/', views.popular_banco_view, name='popular_banco_trigger'), # URL utilizada para popular o banco de dados para testes.
@@ -25,5 +31,8 @@ urlpatterns = [
     path('classificacoes/<int:pk>/status/', views.classificacao_toggle_status_view, name='classificacao_toggle_status'),
 
     path('contas-a-receber/nova/', views.movimento_receber_create_view, name='movimento_receber_create'),
-    path('movimentos/', views.movimento_list_view, name='movimento_list')
+    path('movimentos/', views.movimento_list_view, name='movimento_list'),
+
+    path('relatorios/fluxo-caixa/', views.fluxo_caixa_view, name='fluxo_caixa'),
+    path('api/fluxo-caixa/', views.fluxo_caixa_api_view, name='fluxo_caixa_api'),
 ]
\ No newline at end of file
@@ -1,20 +1,28 @@
 import json
-import base64
+import zipfile
+from datetime import date
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib import messages
 from django.shortcuts import render, redirect
 from django.urls import reverse
-from celery.result import AsyncResult
+from celery import group, states
+from celery.result import AsyncResult, GroupResult
+from asgiref.sync import sync_to_async
 from django.core.management import call_command
 from django.contrib.auth.models import User
 
 from agents.agent_rag.consultor_simples import AgentConsultorSimples
 from agents.agent_rag.consultor_embeddings import AgentConsultorEmbeddings
-from .tasks import processar_pdf_task
+from .tasks import pipeline_processamento_pdf, agendar_atualizacao_resumos, consultar_rag_task
+from .blob_store import salvar_blob
+from .eventos import stream_eventos_tarefas, stream_resposta_tarefa
+from .paginacao import tamanho_pagina, TAMANHOS_PAGINA
+from .fluxo_caixa import relatorio_fluxo_caixa, GRANULARIDADES, HORIZONTE_PADRAO, HORIZONTE_MAXIMO
 from .repositories.pessoa_repository import PessoaRepository
 from .repositories.classificacao_repository import ClassificacaoRepository
 from .repositories.movimento_repository import MovimentoRepository
+from .repositories.extracao_pendente_repository import ExtracaoPendenteRepository
 
 
 def upload_view(request):
@@ -30,17 +38,125 @@ def processar_pdf_view(request):
         pdf_file = request.FILES.get('pdf_file')
         if not pdf_file:
             return JsonResponse({'error': 'Nenhum arquivo enviado.'}, status=400)
-        
-        pdf_content_bytes = pdf_file.read()
-        
-        pdf_content_b64 = base64.b64encode(pdf_content_bytes).decode('utf-8')
-        
-        task = processar_pdf_task.delay(pdf_content_b64, user_api_key)
+
+        # O PDF é gravado uma vez no disco; a tarefa recebe apenas a referência (hash)
+        pdf_ref = salvar_blob(pdf_file)
+
+        task = pipeline_processamento_pdf(pdf_ref, user_api_key).apply_async()
         
         return JsonResponse({'task_id': task.id})
     return JsonResponse({'error': 'Método inválido.'}, status=405)
 
 
+LIMITE_ARQUIVOS_LOTE = 1000
+
+
+def _coletar_pdfs_do_upload(arquivos):
+    """
+    Expande os arquivos enviados em uma lista de (nome, referência do blob).
+    Aceita PDFs avulsos e arquivos ZIP contendo PDFs (demais entradas são ignoradas).
+    O limite do lote é conferido pelo índice dos ZIPs, antes de qualquer gravação.
+    """
+    zips = {}
+    total = 0
+    try:
+        for arquivo in arquivos:
+            nome = arquivo.name or ''
+            if nome.lower().endswith('.zip'):
+                try:
+                    zf = zipfile.ZipFile(arquivo)
+                except zipfile.BadZipFile:
+                    raise ValueError(f"Arquivo ZIP inválido: {nome}")
+                entradas = [info for info in zf.infolist()
+                            if not info.is_dir() and info.filename.lower().endswith('.pdf')]
+                zips[id(arquivo)] = (zf, entradas)
+                total += len(entradas)
+            else:
+                total += 1
+        if total > LIMITE_ARQUIVOS_LOTE:
+            raise ValueError(f'O lote excede o limite de {LIMITE_ARQUIVOS_LOTE} documentos.')
+
+        pdfs = []
+        for arquivo in arquivos:
+            if id(arquivo) not in zips:
+                pdfs.append((arquivo.name or '', salvar_blob(arquivo)))
+                continue
+            zf, entradas = zips[id(arquivo)]
+            for info in entradas:
+                with zf.open(info) as entrada:
+                    pdfs.append((info.filename.rsplit('/', 1)[-1], salvar_blob(entrada)))
+        return pdfs
+    finally:
+        for zf, _ in zips.values():
+            zf.close()
+
+
+def processar_lote_view(request):
+    if request.method == 'POST':
+        user_api_key = request.session.get('user_api_key')
+        if not user_api_key:
+            return JsonResponse({'error': 'Chave de API não configurada. Vá em Configurações.'}, status=403)
+
+        arquivos = request.FILES.getlist('pdf_files')
+        if not arquivos:
+            return JsonResponse({'error': 'Nenhum arquivo enviado.'}, status=400)
+
+        try:
+            pdfs = _coletar_pdfs_do_upload(arquivos)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        if not pdfs:
+            return JsonResponse({'error': 'Nenhum PDF encontrado nos arquivos enviados.'}, status=400)
+
+        # Fan-out: uma tarefa por nota fiscal, distribuídas entre os workers disponíveis
+        lote = group(pipeline_processamento_pdf(pdf_ref, user_api_key) for _, pdf_ref in pdfs)
+        group_result = lote.apply_async()
+        group_result.save()
+
+        tarefas = [
+            {'task_id': task.id, 'filename': nome}
+            for (nome, _), task in zip(pdfs, group_result.results)
+        ]
+        return JsonResponse({'batch_id': group_result.id, 'tasks': tarefas})
+    return JsonResponse({'error': 'Método inválido.'}, status=405)
+
+
+def batch_status_view(request, batch_id):
+    group_result = GroupResult.restore(batch_id)
+    if group_result is None:
+        return JsonResponse({'error': 'Lote não encontrado ou expirado.'}, status=404)
+
+    contagem = {'PENDING': 0, 'PROGRESS': 0, 'SUCCESS': 0, 'FAILURE': 0, 'REVOKED': 0}
+    tarefas = []
+    concluidas = 0
+    for task_result in group_result.results:
+        state = task_result.state
+        contagem[state] = contagem.get(state, 0) + 1
+        # SUCCESS, FAILURE e REVOKED: a tarefa não muda mais de estado
+        concluidas += state in states.READY_STATES
+
+        status = ''
+        if state == 'PROGRESS' and isinstance(task_result.info, dict):
+            status = task_result.info.get('status', 'Processando...')
+        elif state == 'FAILURE':
+            info = task_result.info
+            status = info.get('exc_message', 'Erro desconhecido.') if isinstance(info, dict) else str(info)
+
+        tarefas.append({'task_id': task_result.id, 'state': state, 'status': status})
+
+    total = len(tarefas)
+
+    return JsonResponse({
+        'batch_id': batch_id,
+        'total': total,
+        'completed': concluidas,
+        'counts': contagem,
+        'finished': concluidas == total,
+        'tasks': tarefas
+    })
+
+
 def task_status_view(request, task_id):
     task_result = AsyncResult(task_id)
 
@@ -57,10 +173,16 @@ def task_status_view(request, task_id):
     elif task_result.state == 'PROGRESS':
         info = task_result.info if isinstance(task_result.info, dict) else {}
         response_data['status'] = info.get('status', 'Processando...')
+        response_data['timings'] = info.get('timings')
+        response_data['resposta'] = info.get('resposta')
 
     elif task_result.state == 'SUCCESS':
         response_data['result'] = task_result.result
-        request.session['full_result'] = task_result.result
+        # Só o id vai para a sessão; o resultado completo está em ExtracaoPendente.
+        # Tarefas do chat de RAG também passam por aqui e não têm lançamento a confirmar
+        eh_extracao = isinstance(task_result.result, dict) and 'extracted_data' in task_result.result
+        if eh_extracao and request.session.get('pending_task_id') != task_id:
+            request.session['pending_task_id'] = task_id
 
     elif task_result.state == 'FAILURE':
         if isinstance(task_result.info, Exception):
@@ -76,9 +198,35 @@ def task_status_view(request, task_id):
     return JsonResponse(response_data)
 
 
+def _resposta_sse(task_ids):
+    return _stream_sse(stream_eventos_tarefas(task_ids))
+
+
+def _stream_sse(eventos):
+    response = StreamingHttpResponse(eventos, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def task_events_view(request, task_id):
+    """Stream SSE com o progresso da tarefa; substitui o polling de task_status_view."""
+    return _resposta_sse([task_id])
+
+
+async def batch_events_view(request, batch_id):
+    """Stream SSE com o progresso de todas as tarefas de um lote, em uma única conexão."""
+    group_result = await sync_to_async(GroupResult.restore)(batch_id)
+    if group_result is None:
+        return JsonResponse({'error': 'Lote não encontrado ou expirado.'}, status=404)
+    return _resposta_sse([task_result.id for task_result in group_result.results])
+
+
 def confirmar_lancamento_view(request):
     if request.method == 'POST':
-        full_result = request.session.get('full_result')
+        task_id = request.session.get('pending_task_id')
+        pendente_repo = ExtracaoPendenteRepository()
+        full_result = pendente_repo.find(task_id) if task_id else None
         if not full_result:
             return JsonResponse({'error': 'Sessão expirada ou inválida.'}, status=400)
 
@@ -113,7 +261,10 @@ def confirmar_lancamento_view(request):
                 mov_id = mov_repo.create_completo(dados, dados['parcelas'], fornecedor_id, faturado_id, classificacao_ids)
                 items_criados.append(f"Movimento Financeiro #{mov_id} lançado com sucesso.")
 
-            del request.session['full_result']
+                pendente_repo.delete(task_id)
+                agendar_atualizacao_resumos()
+
+            del request.session['pending_task_id']
             return JsonResponse({'success': True, 'message': f"Lançamento #{mov_id} realizado!", 'created_items': items_criados})
         
         except Exception as e:
@@ -172,6 +323,35 @@ def processar_rag_embeddings_view(request):
     return JsonResponse({'error': 'Método inválido.'}, status=405)
 
 
+async def _processar_rag_stream(request, tipo_agente):
+    """
+    Resposta do agente como SSE ('token' a cada pedaço, depois 'end'), sem esperar o texto
+    inteiro. A consulta roda em consultar_rag_task (fila 'rag'); a view só repassa o progresso
+    publicado no Redis, sem ocupar uma thread do servidor enquanto o Gemini responde.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método inválido.'}, status=405)
+    try:
+        pergunta = json.loads(request.body).get('pergunta')
+    except ValueError:
+        return JsonResponse({'error': 'Requisição inválida.'}, status=400)
+
+    user_api_key = await request.session.aget('user_api_key')
+    if not user_api_key:
+        return JsonResponse({'error': 'Chave API não configurada. Vá em Configurações.'}, status=403)
+
+    task = await sync_to_async(consultar_rag_task.delay)(tipo_agente, pergunta, user_api_key)
+    return _stream_sse(stream_resposta_tarefa(task.id))
+
+
+async def processar_rag_simples_stream_view(request):
+    return await _processar_rag_stream(request, 'simples')
+
+
+async def processar_rag_embeddings_stream_view(request):
+    return await _processar_rag_stream(request, 'embeddings')
+
+
 # --- Configuração de API ---
 
 def config_api_view(request):
@@ -190,23 +370,37 @@ def config_api_view(request):
 
 # --- Views de CRUD (Pessoas, Movimentos, etc) ---
 
+def _parametros_paginacao(request):
+    """Cursor e tamanho de página vindos da URL, no formato dos métodos *_page dos repositórios."""
+    return {
+        'apos': request.GET.get('apos'),
+        'antes': request.GET.get('antes'),
+        'limite': tamanho_pagina(request.GET.get('por_pagina')),
+    }
+
+
 def pessoa_list_view(request):
     repo = PessoaRepository()
-    pessoas_raw = []
+    pagina = None
     
     termo_busca = request.GET.get('busca', '')
     modo = request.GET.get('modo', '')
     ordenar_por = request.GET.get('ordenar', 'razaosocial')
+    paginacao = _parametros_paginacao(request)
 
     if modo == 'todos':
-        pessoas_raw = repo.list_all_active(order_by=ordenar_por)
+        pagina = repo.list_active_page(order_by=ordenar_por, contar=True, **paginacao)
     elif termo_busca:
-        pessoas_raw = repo.search_active(termo_busca, order_by=ordenar_por)
+        pagina = repo.list_active_page(termo_busca, order_by=ordenar_por, contar=True, **paginacao)
     
-    pessoas = [{'id': p[0], 'razaosocial': p[1], 'documento': p[2], 'tipo': p[3], 'status': p[4]} for p in pessoas_raw]
+    pessoas = [{'id': p[0], 'razaosocial': p[1], 'documento': p[2], 'tipo': p[3], 'status': p[4]}
+               for p in (pagina.itens if pagina else [])]
     
     return render(request, 'pessoa_list.html', {
         'pessoas': pessoas, 
+        'pagina': pagina,
+        'por_pagina': paginacao['limite'],
+        'tamanhos_pagina': TAMANHOS_PAGINA,
         'busca_atual': termo_busca,
         'modo_atual': modo,
         'ordenar_atual': ordenar_por
@@ -218,6 +412,8 @@ def pessoa_form_view(request, pk=None):
         if pk:
             repo.update(pk, request.POST['tipo'], request.POST['razaosocial'], request.POST['fantasia'],
                         request.POST['documento'])
+            # Os resumos guardam a razão social: uma edição precisa chegar a eles
+            agendar_atualizacao_resumos()
         else:
             detail = {'tipo': request.POST['tipo'], 'razaosocial': request.POST['razaosocial'],
                       'fantasia': request.POST['fantasia'], 'documento': request.POST['documento']}
@@ -234,25 +430,31 @@ def pessoa_form_view(request, pk=None):
 def pessoa_toggle_status_view(request, pk):
     repo = PessoaRepository()
     repo.toggle_status(pk)
+    agendar_atualizacao_resumos()
     return redirect('pessoa_list')
 
 def classificacao_list_view(request):
     repo = ClassificacaoRepository()
-    classificacoes_raw = []
+    pagina = None
     
     termo_busca = request.GET.get('busca', '')
     modo = request.GET.get('modo', '')
     ordenar_por = request.GET.get('ordenar', 'descricao')
+    paginacao = _parametros_paginacao(request)
 
     if modo == 'todos':
-        classificacoes_raw = repo.list_all(order_by=ordenar_por)
+        pagina = repo.list_page(order_by=ordenar_por, contar=True, **paginacao)
     elif termo_busca:
-        classificacoes_raw = repo.search(termo_busca, order_by=ordenar_por)
+        pagina = repo.list_page(termo_busca, order_by=ordenar_por, contar=True, **paginacao)
     
-    classificacoes = [{'id': c[0], 'descricao': c[1], 'tipo': c[2], 'status': c[3]} for c in classificacoes_raw]
+    classificacoes = [{'id': c[0], 'descricao': c[1], 'tipo': c[2], 'status': c[3]}
+                      for c in (pagina.itens if pagina else [])]
     
     return render(request, 'classificacao_list.html', {
         'classificacoes': classificacoes,
+        'pagina': pagina,
+        'por_pagina': paginacao['limite'],
+        'tamanhos_pagina': TAMANHOS_PAGINA,
         'busca_atual': termo_busca,
         'modo_atual': modo,
         'ordenar_atual': ordenar_por
@@ -263,6 +465,8 @@ def classificacao_form_view(request, pk=None):
     if request.method == 'POST':
         if pk:
             repo.update(pk, request.POST['tipo'], request.POST['descricao'])
+            # Os resumos guardam a descrição: uma edição precisa chegar a eles
+            agendar_atualizacao_resumos()
         else:
             repo.create(request.POST['tipo'], request.POST['descricao'])
         return redirect('classificacao_list')
@@ -276,6 +480,7 @@ def classificacao_form_view(request, pk=None):
 def classificacao_toggle_status_view(request, pk):
     repo = ClassificacaoRepository()
     repo.toggle_status(pk)
+    agendar_atualizacao_resumos()
     return redirect('classificacao_list')
 
 def movimento_receber_create_view(request):
@@ -307,6 +512,7 @@ def movimento_receber_create_view(request):
             cliente_nome = cliente_obj[2] if cliente_obj else "Cliente não encontrado"
 
             mov_repo.create_recebimento(movimento_data, parcelas_data, cliente_id, classificacoes_ids)
+            agendar_atualizacao_resumos()
 
             messages.success(request,
                              f"<strong>Sucesso!</strong> Conta a Receber para <strong>{cliente_nome}</strong> (R$ {total_parcelas:.2f}) cadastrada.")
@@ -326,31 +532,75 @@ def movimento_receber_create_view(request):
 
 def movimento_list_view(request):
     repo = MovimentoRepository()
-    movimentos_raw = []
+    pagina = None
     
     termo_busca = request.GET.get('busca', '')
+    produto = request.GET.get('produto', '').strip()
     modo = request.GET.get('modo', '')
     ordenar_por = request.GET.get('ordenar', '-dataemissao')
+    paginacao = _parametros_paginacao(request)
 
-    if modo == 'todos':
-        movimentos_raw = repo.list_all_movements(order_by=ordenar_por)
+    if produto:
+        # Busca textual na descrição dos produtos, ordenada por relevância
+        pagina = repo.search_produtos_page(produto, **paginacao)
+    elif modo == 'todos':
+        pagina = repo.list_movements_page(order_by=ordenar_por, **paginacao)
     elif termo_busca:
-        movimentos_raw = repo.search_movements(termo_busca, order_by=ordenar_por)
+        pagina = repo.list_movements_page(termo_busca, order_by=ordenar_por, **paginacao)
     
     movimentos = [
         {
             'id': m[0], 'dataemissao': m[1], 'numeronotafiscal': m[2],
             'tipo': m[3], 'fornecedor_cliente': m[4], 'faturado': m[5],
-            'valortotal': m[6], 'status': m[7]
-        } for m in movimentos_raw
+            'valortotal': m[6], 'status': m[7],
+            'descricao': m[8] if len(m) > 8 else None
+        } for m in (pagina.itens if pagina else [])
     ]
     
     return render(request, 'movimento_list.html', {
         'movimentos': movimentos,
+        'pagina': pagina,
+        'por_pagina': paginacao['limite'],
+        'tamanhos_pagina': TAMANHOS_PAGINA,
         'busca_atual': termo_busca,
+        'produto_atual': produto,
         'modo_atual': modo,
         'ordenar_atual': ordenar_por
     })
+
+
+def _parametros_fluxo_caixa(request):
+    """Data-base, horizonte e granularidade da URL; ValueError se algum for inválido."""
+    data_base = request.GET.get('data_base')
+    granularidade = request.GET.get('granularidade', 'dia')
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade deve ser uma de: {', '.join(GRANULARIDADES)}.")
+    return {
+        'data_base': date.fromisoformat(data_base) if data_base else date.today(),
+        'dias': min(max(int(request.GET.get('dias') or HORIZONTE_PADRAO), 1), HORIZONTE_MAXIMO),
+        'granularidade': granularidade,
+    }
+
+
+def fluxo_caixa_view(request):
+    try:
+        parametros = _parametros_fluxo_caixa(request)
+    except ValueError as e:
+        messages.error(request, f"Parâmetros inválidos: {e}")
+        parametros = {'data_base': date.today(), 'dias': HORIZONTE_PADRAO, 'granularidade': 'dia'}
+
+    return render(request, 'fluxo_caixa.html', {
+        'relatorio': relatorio_fluxo_caixa(**parametros),
+        'granularidades': GRANULARIDADES,
+    })
+
+
+def fluxo_caixa_api_view(request):
+    try:
+        parametros = _parametros_fluxo_caixa(request)
+    except ValueError as e:
+        return JsonResponse({'error': f'Parâmetros inválidos: {e}'}, status=400)
+    return JsonResponse(relatorio_fluxo_caixa(**parametros))
     
 ##def criar_admin_view(request):
 ##   """
@@ -9,8 +9,21 @@ python manage.py migrate
 echo "Iniciando Celery Worker em Background..."
 # O '&' no final faz ele rodar em segundo plano
 # Usamos --concurrency=1 para gastar pouca memória do servidor grátis
-celery -A core worker --loglevel=info --concurrency=1 &
+# Este worker consome a fila padrão e a de chamadas ao LLM (rede)
+celery -A core worker --loglevel=info --concurrency=1 -Q celery,llm -n llm@%h &
+
+echo "Iniciando Celery Worker de leitura de PDF em Background..."
+# Fila de CPU em worker próprio: um PDF grande não segura as chamadas ao LLM.
+# Pool de threads porque os filhos do prefork são daemônicos e não podem criar o
+# pool de processos do parser (a leitura cairia para sequencial)
+celery -A core worker --loglevel=info --pool=threads --concurrency=1 -Q pdf -n pdf@%h &
+
+echo "Iniciando Celery Worker do chat (RAG) em Background..."
+# As perguntas do chat passam quase todo o tempo esperando o Gemini: um pool de threads atende
+# várias ao mesmo tempo em um único processo, sem o custo de memória de mais workers prefork
+celery -A core worker --loglevel=info --pool=threads --concurrency=4 -Q rag -n rag@%h &
 
 echo "Iniciando Gunicorn (Servidor Web)..."
 # O Render injeta a variável PORT automaticamente
-gunicorn core.wsgi:application --bind 0.0.0.0:$PORT
\ No newline at end of file
+# Worker ASGI (uvicorn): necessário para os streams de progresso (SSE) não prenderem o servidor
+gunicorn core.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:$PORT
\ No newline at end of file